@@ -0,0 +1,133 @@
+# app/archive.py — Move old completed requests out of the live tables
+#
+# Completed requests are history: nobody works them again, but every dashboard page, guest list
+# and search scans past them. archive() moves requests completed (last updated) more than
+# ARCHIVE_AFTER_DAYS ago, with their activity, into servicerequest_archive and
+# requestactivity_archive. Each batch of ARCHIVE_BATCH_SIZE requests is its own short
+# transaction (copy, uncount, delete), so the write lock is only held for one batch at a time
+# and live status updates interleave between batches. Views read the live tables only, unless
+# asked to include history (?history=1).
+#
+# HOW TO USE:
+#   python -m app.archive                                   # configured age and batch size
+#   python -m app.archive --days 30 --batch-size 1000 --pause-ms 50
+#   python -m app.archive --dry-run                         # count what would move
+#   make archive
+import argparse
+import time
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import Connection, Engine, bindparam, delete, func, insert, select
+
+from app.changes import record_archived_changes
+from app.config import settings
+from app.counters import record_archived
+from app.models import (
+    ArchivedRequestActivity,
+    ArchivedServiceRequest,
+    RequestActivity,
+    RequestStatus,
+    ServiceRequest,
+)
+
+_requests = ServiceRequest.__table__
+_activities = RequestActivity.__table__
+_REQUEST_COLUMNS = [c.name for c in _requests.columns]
+_ACTIVITY_COLUMNS = [c.name for c in _activities.columns]
+
+
+def _eligible(cutoff: datetime):
+    # Completed before cutoff. SQLite gives new rows max(rowid) + 1, so the request with the
+    # largest id and the one owning the newest activity stay live: deleting them would let new
+    # rows reuse ids that are already in the archive.
+    newest_activity_owner = select(_activities.c.request_id).where(
+        _activities.c.id == select(func.max(_activities.c.id)).scalar_subquery()
+    )
+    return (
+        _requests.c.status == RequestStatus.completed,
+        _requests.c.updated_at < cutoff,
+        _requests.c.id < select(func.max(_requests.c.id)).scalar_subquery(),
+        _requests.c.id.not_in(newest_activity_owner),
+    )
+
+
+def archive_batch(conn: Connection, request_ids: list[int], archived_at: datetime) -> int:
+    # Copy requests and their activity to the archive tables, uncount them and log them as
+    # archived, then delete them (the FTS delete trigger drops them from search). Returns the
+    # number of activities moved.
+    archive_table = ArchivedServiceRequest.__table__
+    stamp = bindparam("archived_at", archived_at, type_=archive_table.c.archived_at.type)
+    requests = select(*(_requests.c[name] for name in _REQUEST_COLUMNS), stamp).where(
+        _requests.c.id.in_(request_ids)
+    )
+    conn.execute(insert(archive_table).from_select([*_REQUEST_COLUMNS, "archived_at"], requests))
+    activities = select(*(_activities.c[name] for name in _ACTIVITY_COLUMNS)).where(
+        _activities.c.request_id.in_(request_ids)
+    )
+    activity_table = ArchivedRequestActivity.__table__
+    moved = conn.execute(insert(activity_table).from_select(_ACTIVITY_COLUMNS, activities)).rowcount
+    record_archived(conn, request_ids)
+    record_archived_changes(conn, request_ids, archived_at)
+    conn.execute(delete(_activities).where(_activities.c.request_id.in_(request_ids)))
+    conn.execute(delete(_requests).where(_requests.c.id.in_(request_ids)))
+    return moved
+
+
+def archive(
+    engine: Engine,
+    older_than: timedelta | None = None,
+    batch_size: int | None = None,
+    pause: float = 0.0,
+    now: datetime | None = None,
+) -> dict[str, int]:
+    # Archive every eligible request, batch_size per transaction, sleeping pause seconds between
+    # batches. Returns rows moved per table.
+    now = now or datetime.now(UTC)
+    cutoff = now - (older_than if older_than is not None else timedelta(days=settings.archive_after_days))
+    batch_size = batch_size or settings.archive_batch_size
+    moved = {"requests": 0, "activities": 0}
+    while True:
+        with engine.begin() as conn:
+            request_ids = list(
+                conn.execute(
+                    select(_requests.c.id).where(*_eligible(cutoff)).order_by(_requests.c.id).limit(batch_size)
+                ).scalars()
+            )
+            if not request_ids:
+                return moved
+            moved["activities"] += archive_batch(conn, request_ids, now)
+            moved["requests"] += len(request_ids)
+        if pause:
+            time.sleep(pause)
+
+
+def count_eligible(engine: Engine, older_than: timedelta) -> int:
+    with engine.connect() as conn:
+        cutoff = datetime.now(UTC) - older_than
+        return conn.execute(select(func.count()).select_from(_requests).where(*_eligible(cutoff))).scalar_one()
+
+
+def main() -> None:
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Move old completed requests to the archive tables")
+    parser.add_argument("--days", type=float, default=settings.archive_after_days,
+                        help="archive requests completed more than this many days ago")
+    parser.add_argument("--batch-size", type=int, default=settings.archive_batch_size)
+    parser.add_argument("--pause-ms", type=float, default=0.0, help="sleep between batches (lets writers in)")
+    parser.add_argument("--dry-run", action="store_true", help="only count eligible requests")
+    args = parser.parse_args()
+
+    engine.echo = False
+    older_than = timedelta(days=args.days)
+    if args.dry_run:
+        print(f"{count_eligible(engine, older_than):,} requests would be archived.")
+        return
+    started = time.perf_counter()
+    moved = archive(engine, older_than, args.batch_size, args.pause_ms / 1000)
+    elapsed = time.perf_counter() - started
+    print(f"Archived {moved['requests']:,} requests and {moved['activities']:,} activities in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
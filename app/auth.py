@@ -1,44 +1,133 @@
 # app/auth.py — Authentication helpers (lookup + FastAPI dependencies)
-from fastapi import Depends, Request
-from sqlmodel import Session, select
+import threading
+import time
+from collections import OrderedDict
+from typing import TypeVar
 
-from app.database import get_session
-from app.models import Guest, StaffUser
+from fastapi import Depends, HTTPException, Request, WebSocket, WebSocketException, status
+from sqlalchemy import event
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
+from app.config import settings
+from app.database import async_session_factory, get_session
+from app.metrics import Counter, register
+from app.models import Guest, StaffUser, normalize_last_name
 
-def lookup_staff(
-    session: Session, employee_id: str, last_name: str
+Principal = TypeVar("Principal", Guest, StaffUser)
+
+PRINCIPAL_CACHE_LOOKUPS = register(
+    Counter("gm_principal_cache_lookups_total", "Principal cache lookups by kind and result (hit/miss).")
+)
+
+
+class PrincipalCache:
+    # In-process TTL + LRU cache of logged-in Guest / StaffUser records keyed by (model, id), so
+    # polls and page loads resolve their principal without a query. Entries are detached copies
+    # shared between requests: treat them as read-only. Invalidated on logout and by ORM
+    # updates/deletes of the record (see _invalidate_principal); the TTL bounds staleness from
+    # writes this process cannot see (other workers, Core UPDATE statements).
+    def __init__(self, max_entries: int, ttl_seconds: float) -> None:
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, int], tuple[float, Guest | StaffUser]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model: type[Principal], record_id: int) -> Principal | None:
+        key = (model.__name__, record_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                record = entry[1]
+            else:
+                self._entries.pop(key, None)
+                record = None
+        PRINCIPAL_CACHE_LOOKUPS.inc(kind=model.__name__, result="hit" if record else "miss")
+        return record
+
+    def put(self, record: Guest | StaffUser) -> None:
+        if self.ttl_seconds <= 0:
+            return
+        model = type(record)
+        copy = model(**record.model_dump())
+        with self._lock:
+            key = (model.__name__, record.id)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, copy)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, model: type[Guest | StaffUser], record_id: int) -> None:
+        with self._lock:
+            self._entries.pop((model.__name__, record_id), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+principal_cache = PrincipalCache(settings.principal_cache_size, settings.principal_cache_ttl_seconds)
+
+
+def _invalidate_principal(mapper, connection, target: Guest | StaffUser) -> None:
+    principal_cache.invalidate(type(target), target.id)
+
+
+for _model in (Guest, StaffUser):
+    event.listen(_model, "after_update", _invalidate_principal)
+    event.listen(_model, "after_delete", _invalidate_principal)
+
+
+async def _load_principal(session: AsyncSession, model: type[Principal], record_id: int) -> Principal | None:
+    # Cached record, or load it and cache it. Missing records are not cached.
+    record = principal_cache.get(model, record_id)
+    if record is None:
+        record = await session.get(model, record_id)
+        if record is not None:
+            principal_cache.put(record)
+    return record
+
+
+async def lookup_staff(
+    session: AsyncSession, employee_id: str, last_name: str
 ) -> StaffUser | None:
     # Find staff by employee_id and last_name (case-insensitive). Returns None if not found.
-    return session.exec(
+    # Compares the indexed last_name_lower column, not ILIKE (which no index can serve).
+    result = await session.exec(
         select(StaffUser).where(
             StaffUser.employee_id == employee_id,
-            StaffUser.last_name.ilike(last_name),
+            StaffUser.last_name_lower == normalize_last_name(last_name),
         )
-    ).first()
+    )
+    return result.first()
 
 
-def lookup_guest(
-    session: Session, confirmation_code: str, last_name: str
+async def lookup_guest(
+    session: AsyncSession, confirmation_code: str, last_name: str
 ) -> Guest | None:
     # Find guest by confirmation_code and last_name (case-insensitive). Returns None if not found.
-    return session.exec(
+    result = await session.exec(
         select(Guest).where(
             Guest.confirmation_code == confirmation_code,
-            Guest.last_name.ilike(last_name),
+            Guest.last_name_lower == normalize_last_name(last_name),
         )
-    ).first()
+    )
+    return result.first()
 
 
 async def get_current_guest(
     request: Request,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ) -> Guest:
     # FastAPI dependency: require guest session. Redirects to /login if not logged in or guest not found.
     guest_id = request.session.get("guest_id")
     if not guest_id:
         raise _redirect_exception("/login")
-    guest = session.get(Guest, guest_id)
+    guest = await _load_principal(session, Guest, guest_id)
     if not guest:
         request.session.clear()
         raise _redirect_exception("/login")
@@ -47,19 +136,48 @@ async def get_current_guest(
 
 async def require_staff(
     request: Request,
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ) -> StaffUser:
     # FastAPI dependency: require staff session. Redirects to /staff/login if not logged in or staff not found.
     staff_id = request.session.get("staff_id")
     if not staff_id:
         raise _redirect_exception("/staff/login")
-    staff = session.get(StaffUser, staff_id)
+    staff = await _load_principal(session, StaffUser, staff_id)
     if not staff:
         request.session.clear()
         raise _redirect_exception("/staff/login")
     return staff
 
 
+async def api_principal(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+) -> Guest | StaffUser:
+    # FastAPI dependency for the JSON API: the logged-in staff member or guest. Answers 401 (JSON)
+    # instead of redirecting to a login page.
+    staff_id = request.session.get("staff_id")
+    if staff_id and (staff := await _load_principal(session, StaffUser, staff_id)):
+        return staff
+    guest_id = request.session.get("guest_id")
+    if guest_id and (guest := await _load_principal(session, Guest, guest_id)):
+        return guest
+    raise HTTPException(status.HTTP_401_UNAUTHORIZED, "Not logged in")
+
+
+async def require_staff_websocket(websocket: WebSocket) -> StaffUser:
+    # WebSocket dependency: require a staff session, else refuse the handshake (policy violation).
+    # Uses a short-lived session of its own: a Depends(get_session) one would stay open (and hold
+    # a pooled connection) for the whole life of the socket.
+    staff_id = websocket.session.get("staff_id")
+    staff = None
+    if staff_id:
+        async with async_session_factory() as session:
+            staff = await _load_principal(session, StaffUser, staff_id)
+    if not staff:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION)
+    return staff
+
+
 class _RedirectException(Exception):
     def __init__(self, url: str):
         self.url = url
@@ -0,0 +1,102 @@
+# app/broker.py — In-process pub/sub broker for Server-Sent Events
+#
+# Routes publish (event, data) pairs to a topic (e.g. "guest:3"); each open SSE connection
+# holds a Subscription with a bounded queue. A slow consumer never blocks publishers: when
+# its queue is full the backlog is discarded and replaced by a single "resync" event, so the
+# browser refetches the full list once instead of replaying stale row updates.
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, field
+
+from starlette.requests import Request
+
+from app.config import settings
+
+RESYNC_EVENT = "resync"
+
+
+def guest_topic(guest_id: int) -> str:
+    return f"guest:{guest_id}"
+
+
+@dataclass(eq=False)
+class Subscription:
+    topic: str
+    queue: asyncio.Queue[tuple[str, str]]
+    last_event_at: float = field(default_factory=time.monotonic)
+
+
+class Broker:
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._topics: dict[str, set[Subscription]] = {}
+
+    def subscribe(self, topic: str) -> Subscription:
+        sub = Subscription(topic=topic, queue=asyncio.Queue(maxsize=self.queue_size))
+        self._topics.setdefault(topic, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        subs = self._topics.get(sub.topic)
+        if subs is None:
+            return
+        subs.discard(sub)
+        if not subs:
+            del self._topics[sub.topic]
+
+    def publish(self, topic: str, event: str, data: str) -> int:
+        # Deliver to every subscriber of topic without waiting. Returns the number of subscribers.
+        subs = self._topics.get(topic, ())
+        for sub in subs:
+            if sub.queue.full():
+                _reset_to_resync(sub.queue)
+                continue
+            sub.queue.put_nowait((event, data))
+        return len(subs)
+
+    def subscriber_count(self, topic: str | None = None) -> int:
+        if topic is not None:
+            return len(self._topics.get(topic, ()))
+        return sum(len(subs) for subs in self._topics.values())
+
+
+def _reset_to_resync(queue: asyncio.Queue[tuple[str, str]]) -> None:
+    # Queue overflowed: the queued row updates are superseded by a full refetch.
+    while not queue.empty():
+        queue.get_nowait()
+    queue.put_nowait((RESYNC_EVENT, ""))
+
+
+def format_sse(event: str, data: str) -> str:
+    # Encode one SSE message; multi-line data needs a "data:" prefix on every line.
+    lines = data.splitlines() or [""]
+    return f"event: {event}\n" + "".join(f"data: {line}\n" for line in lines) + "\n"
+
+
+async def event_stream(request: Request, sub: Subscription) -> AsyncIterator[str]:
+    # Yield SSE messages for one connection: heartbeat comments keep proxies from timing the
+    # stream out, and a connection with no real events for sse_idle_timeout_seconds is closed
+    # (the browser's EventSource reconnects if the tab is still open).
+    heartbeat = settings.sse_heartbeat_seconds
+    idle_timeout = settings.sse_idle_timeout_seconds
+    try:
+        yield f"retry: {settings.sse_retry_ms}\n\n"
+        while True:
+            idle_for = time.monotonic() - sub.last_event_at
+            if idle_for >= idle_timeout or await request.is_disconnected():
+                return
+            try:
+                event, data = await asyncio.wait_for(
+                    sub.queue.get(), timeout=min(heartbeat, idle_timeout - idle_for)
+                )
+            except TimeoutError:
+                yield ": heartbeat\n\n"
+                continue
+            sub.last_event_at = time.monotonic()
+            yield format_sse(event, data)
+    finally:
+        broker.unsubscribe(sub)
+
+
+broker = Broker(queue_size=settings.sse_queue_size)
@@ -0,0 +1,198 @@
+# app/changes.py — Append-only request change log for incremental ("since") sync
+#
+# Every request insert (create_request), status change (update_status, bulk status) and archive
+# (app/archive.py) appends a requestchange row in the same transaction as the write itself. seq
+# only ever grows, so a client that remembers the newest seq it has seen asks the guest poll or
+# the staff filter for ?since=<seq> and gets back only the rows changed after it, plus the new
+# cursor (the X-Change-Cursor header, and the poller row's next URL). A poll with nothing new
+# reads two index lookups and renders nothing.
+#
+# compact() deletes entries older than CHANGE_LOG_RETENTION_HOURS (always keeping the newest, so
+# the cursor range stays known). A client whose cursor falls behind the oldest remaining entry
+# may have missed changes and gets the full list instead (changes_since returns None). The
+# lifespan schedules compaction on the task queue every CHANGE_LOG_COMPACT_INTERVAL_SECONDS.
+#
+# SQLite serializes writers, so entries commit in seq order. On PostgreSQL two transactions can
+# commit out of seq order; there a reader could skip a just-committed lower seq.
+#
+# HOW TO USE:
+#   python -m app.changes                  # log size and cursor range
+#   python -m app.changes --compact        # delete entries older than the retention window
+#   python -m app.changes --compact --hours 1
+import argparse
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import Connection, and_, bindparam, delete, insert, literal
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.config import settings
+from app.models import ChangeKind, RequestChange, RequestStatus, ServiceRequest
+from app.tasks import task_queue
+
+logger = logging.getLogger(__name__)
+
+_changes = RequestChange.__table__
+
+
+@dataclass
+class RequestDelta:
+    # Everything logged for one request after a cursor, collapsed.
+    request_id: int
+    created: bool = False  # inserted after the cursor: the client has never seen it
+    archived: bool = False  # no longer in the live table
+    old_status: RequestStatus | None = None  # status the client last saw (None when created)
+
+
+@dataclass
+class ChangeSet:
+    cursor: int  # newest seq covered; the client's next since
+    deltas: dict[int, RequestDelta] = field(default_factory=dict)  # by request id, oldest first
+
+
+@dataclass
+class RowChanges:
+    # What a page showing a list as of the cursor must do to catch up: rows to add at the top,
+    # rows to replace in place, and ids of rows to drop.
+    inserted: list = field(default_factory=list)
+    updated: list = field(default_factory=list)
+    removed: list[int] = field(default_factory=list)
+
+
+def row_op(delta: RequestDelta, status: RequestStatus, status_filter: str | None) -> str | None:
+    # What a table filtered on status_filter must do with a changed row that matches its other
+    # filters, given the request's current status: "insert" it (it just started matching),
+    # "update" it in place, "remove" it (it stopped matching), or nothing (None).
+    shown = not status_filter or status == status_filter
+    was_shown = not delta.created and (not status_filter or delta.old_status == status_filter)
+    if shown:
+        return "update" if was_shown else "insert"
+    return "remove" if was_shown else None
+
+
+async def record_changes(
+    session: AsyncSession,
+    requests: list[ServiceRequest],
+    kind: ChangeKind,
+    old_status: RequestStatus | None = None,
+) -> None:
+    # Log a change to each request (one executemany). Call before the commit that writes them;
+    # new requests must be flushed first so they have an id.
+    now = datetime.now(UTC)
+    await session.exec(
+        insert(RequestChange),
+        params=[
+            {
+                "request_id": sr.id,
+                "guest_id": sr.guest_id,
+                "kind": kind,
+                "old_status": old_status,
+                "status": sr.status,
+                "changed_at": now,
+            }
+            for sr in requests
+        ],
+    )
+
+
+def record_archived_changes(conn: Connection, request_ids: list[int], archived_at: datetime) -> None:
+    # Log requests about to be deleted from servicerequest. Runs in the archive batch's transaction.
+    requests = ServiceRequest.__table__
+    rows = select(
+        requests.c.id,
+        requests.c.guest_id,
+        literal(ChangeKind.archived, _changes.c.kind.type),
+        requests.c.status,
+        bindparam("changed_at", archived_at, type_=_changes.c.changed_at.type),
+    ).where(requests.c.id.in_(request_ids)).order_by(requests.c.id)
+    conn.execute(
+        insert(_changes).from_select(["request_id", "guest_id", "kind", "old_status", "changed_at"], rows)
+    )
+
+
+async def current_cursor(session: AsyncSession) -> int:
+    # Newest seq (0 for an empty log). Read it before loading a full list, never after, so a
+    # change committed in between is sent again on the next poll rather than lost.
+    return (await session.exec(select(func.coalesce(func.max(RequestChange.seq), 0)))).one()
+
+
+async def changes_since(session: AsyncSession, since: int, guest_id: int | None = None) -> ChangeSet | None:
+    # Requests changed after since (all, or one guest's), or None when since is outside the
+    # retained log (compacted away, or from another database) and the client must reload.
+    oldest, newest = (await session.exec(select(func.min(RequestChange.seq), func.max(RequestChange.seq)))).one()
+    cursor = newest or 0
+    if since > cursor or (oldest is not None and since < oldest - 1):
+        return None
+    changes = ChangeSet(cursor)
+    if since == cursor:
+        return changes
+    statement = select(RequestChange).where(RequestChange.seq > since, RequestChange.seq <= cursor)
+    if guest_id is not None:
+        statement = statement.where(RequestChange.guest_id == guest_id)
+    for entry in (await session.exec(statement.order_by(RequestChange.seq))).all():
+        delta = changes.deltas.get(entry.request_id)
+        if delta is None:
+            delta = changes.deltas[entry.request_id] = RequestDelta(
+                entry.request_id,
+                created=entry.kind == ChangeKind.created,
+                old_status=entry.old_status if entry.kind == ChangeKind.status else None,
+            )
+        delta.archived = entry.kind == ChangeKind.archived
+    return changes
+
+
+# -----------------------------------------------------------------------------
+# Compaction
+# -----------------------------------------------------------------------------
+def compact(conn: Connection, older_than: timedelta | None = None, now: datetime | None = None) -> int:
+    # Delete entries older than the retention window, except the newest. Returns rows deleted.
+    now = now or datetime.now(UTC)
+    retention = older_than if older_than is not None else timedelta(hours=settings.change_log_retention_hours)
+    newest = select(func.max(_changes.c.seq)).scalar_subquery()
+    statement = delete(_changes).where(and_(_changes.c.changed_at < now - retention, _changes.c.seq < newest))
+    return conn.execute(statement).rowcount
+
+
+async def compact_async(engine: AsyncEngine) -> int:
+    async with engine.begin() as conn:
+        removed = await conn.run_sync(compact)
+    logger.info("Compacted %d change log entries", removed)
+    return removed
+
+
+async def schedule_compaction(engine: AsyncEngine, interval: float | None = None) -> None:
+    # Lifespan background task: enqueue a compaction job every interval seconds until cancelled
+    # (the task queue retries a failed run and exports its metrics).
+    interval = interval if interval is not None else settings.change_log_compact_interval_seconds
+    while True:
+        await asyncio.sleep(interval)
+        await task_queue.enqueue("compact_changes", compact_async, engine)
+
+
+def main() -> None:
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Inspect or compact the request change log")
+    parser.add_argument("--compact", action="store_true", help="delete entries older than the retention window")
+    parser.add_argument("--hours", type=float, default=settings.change_log_retention_hours,
+                        help="retention window for --compact")
+    args = parser.parse_args()
+
+    engine.echo = False
+    if args.compact:
+        with engine.begin() as conn:
+            removed = compact(conn, timedelta(hours=args.hours))
+        print(f"Deleted {removed:,} change log entries older than {args.hours:g}h.")
+    with engine.connect() as conn:
+        total, oldest, newest = conn.execute(
+            select(func.count(), func.min(_changes.c.seq), func.max(_changes.c.seq))
+        ).one()
+    print(f"{total:,} entries, seq {oldest or 0}..{newest or 0}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,6 @@
 # app/config.py — Application configuration
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -6,8 +8,78 @@ class Settings(BaseSettings):
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
     database_url: str = "sqlite:///./guest_services_full.db"  # Override with DATABASE_URL
-    debug: bool = True  # SQL echo, etc.
+    debug: bool = True  # SQL echo, template auto-reload, etc.
     secret_key: str = "dev-secret-change-in-prod"  # For session encryption; set in prod
 
+    # Database performance profile (DB_PROFILE):
+    #   development — SQLite defaults; SQL echo follows debug
+    #   production  — PRAGMAs below applied on every new SQLite connection; SQL echo off
+    db_profile: Literal["development", "production"] = "development"
+    sqlite_cache_size_kib: int = 65536  # PRAGMA cache_size, per connection (64 MiB)
+    sqlite_mmap_size_bytes: int = 268435456  # PRAGMA mmap_size (256 MiB)
+    sqlite_busy_timeout_ms: int = 5000  # Wait for a competing writer instead of failing fast
+
+    # Connection pool (see app/database.py); unset = the default for the DATABASE_URL backend
+    db_pool_size: int | None = None
+    db_max_overflow: int | None = None
+    db_pool_timeout_seconds: float = 30.0  # Give up waiting for a free connection after this
+    db_pool_recycle_seconds: int | None = None
+    db_pool_pre_ping: bool | None = None
+
+    # Server-Sent Events (guest request status push)
+    sse_queue_size: int = 32  # Per-connection backlog before the client is told to resync
+    sse_heartbeat_seconds: float = 15.0  # Comment ping interval keeping proxies from closing the stream
+    sse_idle_timeout_seconds: float = 300.0  # Close connections with no events; EventSource reconnects
+    sse_retry_ms: int = 3000  # Client reconnect delay sent in the stream preamble
+
+    # Staff live queue WebSockets (see app/live.py)
+    live_queue_size: int = 64  # Per-connection backlog before the table is told to reload
+
+    # Logged-in guest/staff records cached in-process (see app/auth.py); TTL 0 disables the cache
+    principal_cache_ttl_seconds: float = 30.0
+    principal_cache_size: int = 10_000
+
+    # Compiled template bytecode shared across worker processes (see app/templating.py);
+    # unset = a per-user directory under the system temp dir
+    template_bytecode_cache_dir: str | None = None
+
+    # Rendered request-row HTML kept in memory (see app/fragments.py)
+    fragment_cache_max_bytes: int = 16 * 1024 * 1024
+
+    # Completed requests moved out of the live tables (see app/archive.py)
+    archive_after_days: int = 90  # Archive requests completed (last updated) longer ago than this
+    archive_batch_size: int = 500  # Requests moved per transaction
+
+    # Request change log behind "since" polling (see app/changes.py)
+    change_log_retention_hours: float = 24.0  # Cursors older than this get a full reload
+    change_log_compact_interval_seconds: float = 3600.0  # 0 disables scheduled compaction
+
+    # Post-commit background jobs (see app/tasks.py)
+    task_workers: int = 2
+    task_queue_size: int = 1000  # Jobs waiting beyond this run inline on the request instead
+    task_max_attempts: int = 3
+    task_retry_backoff_seconds: float = 0.5  # Doubled after every failed attempt
+    task_drain_timeout_seconds: float = 10.0  # How long shutdown waits for queued jobs
+
+    # Request metrics (see app/metrics.py, scraped by staff at /metrics)
+    metrics_enabled: bool = True
+
+    @property
+    def sql_echo(self) -> bool:
+        return self.debug and self.db_profile != "production"
+
+    def sqlite_pragmas(self) -> dict[str, str | int]:
+        # PRAGMAs for each new SQLite connection under the active profile (empty in development).
+        if self.db_profile != "production":
+            return {}
+        return {
+            "journal_mode": "WAL",  # readers no longer block on (or block) the writer
+            "synchronous": "NORMAL",  # durable across app crashes; fsync only at checkpoints
+            "cache_size": -self.sqlite_cache_size_kib,  # negative = KiB rather than pages
+            "mmap_size": self.sqlite_mmap_size_bytes,
+            "temp_store": "MEMORY",
+            "busy_timeout": self.sqlite_busy_timeout_ms,
+        }
+
 
 settings = Settings()
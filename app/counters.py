@@ -0,0 +1,156 @@
+# app/counters.py — Incrementally maintained request counts for dashboard summaries
+#
+# The requestcounter table holds one row per (status, category, priority) — at most 72 rows —
+# with the number of service requests in that bucket. create_request and update_status adjust
+# it in the same transaction as their own write (record_created / record_transition(s)), so the
+# staff queue summary and the status/category result counts read a handful of counter rows
+# instead of counting servicerequest. Writers that bypass the routes (seed, seed_synthetic,
+# migrations) call rebuild() afterwards. Counters cover the live table only: app/archive.py
+# uncounts requests as it moves them out (record_archived).
+#
+# HOW TO USE:
+#   python -m app.counters            # compare counters with the table, list mismatches
+#   python -m app.counters --rebuild  # recount from servicerequest
+import argparse
+from collections import Counter
+from dataclasses import dataclass, field
+
+from sqlalchemy import Connection, delete, insert
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import RequestCategory, RequestCounter, RequestPriority, RequestStatus, ServiceRequest
+
+_KEY = ("status", "category", "priority")
+
+# What the counters should hold, counted from the source table
+_ACTUAL = select(
+    ServiceRequest.status, ServiceRequest.category, ServiceRequest.priority, func.count(ServiceRequest.id)
+).group_by(ServiceRequest.status, ServiceRequest.category, ServiceRequest.priority)
+
+
+def _upsert(dialect_name: str):
+    # INSERT ... ON CONFLICT DO UPDATE SET count = count + excluded.count (no read first).
+    # Executed with a list of {status, category, priority, count} deltas as one executemany.
+    dialect_insert = postgresql.insert if dialect_name == "postgresql" else sqlite.insert
+    statement = dialect_insert(RequestCounter.__table__)
+    return statement.on_conflict_do_update(
+        index_elements=list(_KEY), set_={"count": RequestCounter.__table__.c.count + statement.excluded.count}
+    )
+
+
+async def _apply(session: AsyncSession, deltas: Counter) -> None:
+    rows = [
+        {"status": status, "category": category, "priority": priority, "count": delta}
+        for (status, category, priority), delta in deltas.items()
+        if delta
+    ]
+    if rows:
+        await session.exec(_upsert(session.bind.dialect.name), params=rows)
+
+
+async def record_created(session: AsyncSession, sr: ServiceRequest) -> None:
+    # Count a new request. Call before the commit that inserts it.
+    await _apply(session, Counter({(sr.status, sr.category, sr.priority): 1}))
+
+
+async def record_transition(session: AsyncSession, sr: ServiceRequest, old_status: RequestStatus) -> None:
+    # Move a request from old_status to sr.status. Call before the commit that updates it.
+    await record_transitions(session, [sr], old_status)
+
+
+async def record_transitions(
+    session: AsyncSession, moved: list[ServiceRequest], old_status: RequestStatus
+) -> None:
+    # Move several requests from old_status to their (shared) new status: one delta per bucket.
+    deltas = Counter()
+    for sr in moved:
+        deltas[(old_status, sr.category, sr.priority)] -= 1
+        deltas[(sr.status, sr.category, sr.priority)] += 1
+    await _apply(session, deltas)
+
+
+def record_archived(conn: Connection, request_ids: list[int]) -> None:
+    # Uncount requests about to be deleted from servicerequest. Runs in the caller's transaction.
+    rows = [
+        {"status": status, "category": category, "priority": priority, "count": -count}
+        for status, category, priority, count in conn.execute(_ACTUAL.where(ServiceRequest.id.in_(request_ids)))
+    ]
+    if rows:
+        conn.execute(_upsert(conn.dialect.name), rows)
+
+
+@dataclass
+class QueueSummary:
+    by_status: dict[str, int] = field(default_factory=lambda: {s.value: 0 for s in RequestStatus})
+    high_priority: dict[str, int] = field(default_factory=lambda: {s.value: 0 for s in RequestStatus})
+    by_category: dict[str, int] = field(default_factory=lambda: {c.value: 0 for c in RequestCategory})
+
+    @property
+    def total(self) -> int:
+        return sum(self.by_status.values())
+
+
+async def queue_summary(session: AsyncSession) -> QueueSummary:
+    summary = QueueSummary()
+    for counter in (await session.exec(select(RequestCounter))).all():
+        summary.by_status[counter.status.value] += counter.count
+        summary.by_category[counter.category.value] += counter.count
+        if counter.priority == RequestPriority.high:
+            summary.high_priority[counter.status.value] += counter.count
+    return summary
+
+
+async def count_requests(session: AsyncSession, status_filter: str | None, category_filter: str | None) -> int:
+    # Requests matching the dashboard status/category filters, summed from the counters.
+    statement = select(func.coalesce(func.sum(RequestCounter.count), 0))
+    if status_filter:
+        statement = statement.where(RequestCounter.status == status_filter)
+    if category_filter:
+        statement = statement.where(RequestCounter.category == category_filter)
+    return (await session.exec(statement)).one()
+
+
+def rebuild(conn: Connection) -> None:
+    # Replace every counter with a fresh count. Runs in the caller's transaction.
+    conn.execute(delete(RequestCounter))
+    rows = [dict(zip((*_KEY, "count"), row)) for row in conn.execute(_ACTUAL)]
+    if rows:
+        conn.execute(insert(RequestCounter), rows)
+
+
+def check(conn: Connection) -> dict[tuple[str, str, str], tuple[int, int]]:
+    # Buckets whose stored count differs from the table: {(status, category, priority): (stored, actual)}.
+    actual = {tuple(v.value for v in row[:3]): row[3] for row in conn.execute(_ACTUAL)}
+    stored = {
+        tuple(v.value for v in row[:3]): row[3]
+        for row in conn.execute(
+            select(RequestCounter.status, RequestCounter.category, RequestCounter.priority, RequestCounter.count)
+        )
+    }
+    return {
+        key: (stored.get(key, 0), actual.get(key, 0))
+        for key in stored.keys() | actual.keys()
+        if stored.get(key, 0) != actual.get(key, 0)
+    }
+
+
+if __name__ == "__main__":
+    from app.database import engine
+
+    parser = argparse.ArgumentParser(description="Check or rebuild the request counters")
+    parser.add_argument("--rebuild", action="store_true", help="recount every bucket from servicerequest")
+    args = parser.parse_args()
+
+    engine.echo = False
+    with engine.begin() as conn:
+        if args.rebuild:
+            rebuild(conn)
+            print("Request counters rebuilt.")
+        else:
+            mismatches = check(conn)
+            for (status, category, priority), (stored, actual) in sorted(mismatches.items()):
+                print(f"{status}/{category}/{priority}: counter {stored}, table {actual}")
+            print(f"{len(mismatches)} mismatched counters." if mismatches else "Request counters are consistent.")
+    raise SystemExit(1 if not args.rebuild and mismatches else 0)
@@ -1,14 +1,184 @@
-# app/database.py — Database engine and session management
-from sqlmodel import Session, create_engine
+# app/database.py — Database engines and session management
+#
+# Both engines come from make_engine(), which shapes the connection pool for the backend in
+# DATABASE_URL (pool_profile):
+#   sqlite-file   — QueuePool sized for one worker's concurrency: WAL readers run in parallel,
+#                   but writers serialize on the file lock, so a larger pool only queues there.
+#                   No pre-ping or recycle: a local file connection never goes stale.
+#   sqlite-memory — StaticPool: one connection keeps the database alive and every session shares
+#                   it. ":memory:" becomes a shared-cache URI so the sync and async engines of one
+#                   process see the same database.
+#   postgresql    — QueuePool with pre-ping and recycle, surviving server idle timeouts and
+#                   failovers.
+# DB_POOL_* settings override the profile defaults. Time spent waiting for a pooled connection,
+# checkout timeouts and connections in use are exported on /metrics, so pool sizes can be tuned
+# from data.
+import time
+from collections.abc import AsyncIterator
+from dataclasses import dataclass, replace
 
-from app.config import settings
+from sqlalchemy import Engine, event, exc, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool, StaticPool
+from sqlmodel import create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-# SQLite requires check_same_thread=False for FastAPI's async usage
-connect_args = {"check_same_thread": False} if "sqlite" in settings.database_url else {}
-engine = create_engine(settings.database_url, connect_args=connect_args, echo=settings.debug)
+from app.config import Settings, settings
+from app.metrics import LATENCY_BUCKETS, Counter, Gauge, Histogram, register
 
+# Async drivers for each sync backend in DATABASE_URL (sqlite → aiosqlite, postgresql → asyncpg)
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
 
-def get_session():
-    # FastAPI dependency: yields a DB session for the request, then closes it.
-    with Session(engine) as session:
+# Named shared-cache database standing in for a private ":memory:" one
+SHARED_MEMORY_URL = "sqlite:///file:guest_services?mode=memory&cache=shared&uri=true"
+
+POOL_CHECKOUT_WAIT = register(
+    Histogram(
+        "gm_db_pool_checkout_wait_seconds",
+        "Time spent waiting for a pooled connection, by engine.",
+        (0.0001, *LATENCY_BUCKETS),
+    )
+)
+POOL_CHECKOUT_TIMEOUTS = register(
+    Counter("gm_db_pool_checkout_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.")
+)
+POOL_IN_USE = register(Gauge("gm_db_pool_connections_in_use", "Connections checked out of the pool, by engine."))
+
+
+def async_database_url(url: str) -> str:
+    # Rewrite a sync DATABASE_URL to use its async driver. Unknown backends are returned unchanged.
+    scheme, sep, rest = url.partition("://")
+    backend = scheme.split("+", 1)[0]
+    if backend not in _ASYNC_DRIVERS:
+        return url
+    return f"{_ASYNC_DRIVERS[backend]}{sep}{rest}"
+
+
+def apply_sqlite_pragmas(target: Engine, pragmas: dict[str, str | int]) -> None:
+    # Run the given PRAGMAs on every new DBAPI connection of a (sync) engine.
+    if not pragmas:
+        return
+
+    @event.listens_for(target, "connect")
+    def _set_pragmas(dbapi_connection, connection_record) -> None:
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+
+# -----------------------------------------------------------------------------
+# Pool profiles
+# -----------------------------------------------------------------------------
+@dataclass(frozen=True)
+class PoolProfile:
+    name: str
+    static: bool = False  # one shared connection (StaticPool); the sizes below are unused
+    pool_size: int = 5
+    max_overflow: int = 10
+    timeout: float = 30.0
+    pre_ping: bool = False
+    recycle: int = -1  # seconds; -1 = never
+
+
+def _is_sqlite_memory(url: str) -> bool:
+    parsed = make_url(url)
+    return parsed.database in (None, "", ":memory:") or parsed.query.get("mode") == "memory"
+
+
+def pool_profile(url: str, config: Settings = settings) -> PoolProfile:
+    # Defaults for the backend in url, with any DB_POOL_* settings applied on top.
+    backend = make_url(url).get_backend_name()
+    if backend == "sqlite" and _is_sqlite_memory(url):
+        return PoolProfile("sqlite-memory", static=True, pool_size=1, max_overflow=0)
+    if backend == "sqlite":
+        profile = PoolProfile("sqlite-file", pool_size=8, max_overflow=4)
+    else:
+        profile = PoolProfile(backend, pool_size=10, max_overflow=10, pre_ping=True, recycle=1800)
+    overrides = {
+        "pool_size": config.db_pool_size,
+        "max_overflow": config.db_max_overflow,
+        "pre_ping": config.db_pool_pre_ping,
+        "recycle": config.db_pool_recycle_seconds,
+    }
+    return replace(
+        profile,
+        timeout=config.db_pool_timeout_seconds,
+        **{field: value for field, value in overrides.items() if value is not None},
+    )
+
+
+class TimedQueuePool(QueuePool):
+    # QueuePool that records how long each checkout waited for a free connection.
+    engine_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.inc(engine=self.engine_label)
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started, engine=self.engine_label)
+
+
+class TimedAsyncQueuePool(TimedQueuePool, AsyncAdaptedQueuePool):
+    engine_label = "async"
+
+
+def _count_in_use(target: Engine, label: str) -> None:
+    @event.listens_for(target, "checkout")
+    def _checkout(dbapi_connection, connection_record, connection_proxy) -> None:
+        POOL_IN_USE.inc(engine=label)
+
+    @event.listens_for(target, "checkin")
+    def _checkin(dbapi_connection, connection_record) -> None:
+        POOL_IN_USE.inc(-1, engine=label)
+
+
+def make_engine(url: str, use_async: bool = False, config: Settings = settings) -> Engine | AsyncEngine:
+    # Engine for url with the backend's pool profile, SQLite PRAGMAs and pool metrics.
+    profile = pool_profile(url, config)
+    sqlite = make_url(url).get_backend_name() == "sqlite"
+    if profile.static and make_url(url).database in (None, "", ":memory:"):
+        url = SHARED_MEMORY_URL
+    options: dict = {
+        "connect_args": {"check_same_thread": False} if sqlite else {},  # sessions hop threads
+        "echo": config.sql_echo,
+        "pool_pre_ping": profile.pre_ping,
+    }
+    if profile.static:
+        options["poolclass"] = StaticPool
+    else:
+        options.update(
+            poolclass=TimedAsyncQueuePool if use_async else TimedQueuePool,
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.timeout,
+            pool_recycle=profile.recycle,
+        )
+    if use_async:
+        new_engine = create_async_engine(async_database_url(url), **options)
+        sync_engine = new_engine.sync_engine
+    else:
+        new_engine = sync_engine = create_engine(url, **options)
+    if sqlite:
+        apply_sqlite_pragmas(sync_engine, config.sqlite_pragmas())
+    _count_in_use(sync_engine, "async" if use_async else "sync")
+    return new_engine
+
+
+# Sync engine: startup (create_all), seeding, CLI scripts and tests
+engine = make_engine(settings.database_url)
+
+# Async engine: every request-path query, so a slow query never blocks the event loop
+async_engine = make_engine(settings.database_url, use_async=True)
+
+async_session_factory = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+async def get_session() -> AsyncIterator[AsyncSession]:
+    # FastAPI dependency: yields an async DB session for the request, then closes it.
+    async with async_session_factory() as session:
         yield session
@@ -0,0 +1,57 @@
+# app/filters.py — Staff queue filters (status, category, search) as SQL
+#
+# Shared by the dashboard routes (app/routes/staff.py) and the live queue (app/live.py), so a
+# row pushed to a live connection matches exactly what its table would show.
+from sqlalchemy import Select
+from sqlalchemy.sql import Subquery
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.models import Guest, RequestRow, ServiceRequest
+from app.search import fts_enabled, fts_query, match_subquery
+
+
+def search_subquery(session: AsyncSession, search: str | None) -> Subquery | None:
+    # FTS5 match for the search box, or None when there is no search or it must use ILIKE.
+    if not (search and search.strip()) or not fts_enabled(session.bind.dialect.name):
+        return None
+    query = fts_query(search)
+    return match_subquery(query) if query else None
+
+
+def filter_clauses(
+    status_filter: str | None,
+    category_filter: str | None,
+    search: str | None,
+    fts: Subquery | None = None,
+    model: type[RequestRow] = ServiceRequest,
+) -> list:
+    clauses = []
+    if status_filter:
+        clauses.append(model.status == status_filter)
+    if category_filter:
+        clauses.append(model.category == category_filter)
+    if search and search.strip() and fts is None:
+        # ILIKE fallback (non-SQLite databases and the archive): needs the Guest join
+        term = f"%{search.strip()}%"
+        clauses.append(
+            (model.description.ilike(term))
+            | (Guest.first_name.ilike(term))
+            | (Guest.last_name.ilike(term))
+        )
+    return clauses
+
+
+def filtered_statement(
+    statement: Select,
+    fts: Subquery | None,
+    status_filter: str | None,
+    category_filter: str | None,
+    search: str | None,
+    model: type[RequestRow] = ServiceRequest,
+) -> Select:
+    # Apply the dashboard filters to statement; search joins the FTS index when available.
+    if fts is not None:
+        statement = statement.join(fts, fts.c.request_id == model.id)
+    elif search and search.strip():
+        statement = statement.join(Guest, Guest.id == model.guest_id)
+    return statement.where(*filter_clauses(status_filter, category_filter, search, fts, model))
@@ -0,0 +1,123 @@
+# app/fragments.py — Rendered request-row fragment cache
+#
+# Dashboard loads, filter keystrokes, infinite scroll and guest polls render
+# _partials/request_row.html for every row, although almost every row is unchanged since its
+# last render. Templates call {{ request_row(req, is_staff) }} instead of including the
+# partial; it serves the row's HTML from an LRU cache keyed by the row's version:
+#   (request id, updated_at, is_staff) — plus the guest name/room shown on staff rows, so a
+#   guest rename or room move never serves a stale staff row.
+# update_status bumps updated_at (new key) and invalidates the request's old entries. The cache
+# is bounded by total HTML size (FRAGMENT_CACHE_MAX_BYTES); hits, misses and evictions are
+# exported on /metrics.
+import threading
+from collections import OrderedDict
+from collections.abc import Hashable
+
+from markupsafe import Markup
+from starlette.templating import Jinja2Templates
+
+from app.broker import broker, guest_topic
+from app.config import settings
+from app.metrics import Counter, register
+from app.models import ServiceRequest
+
+ROW_TEMPLATE = "_partials/request_row.html"
+
+FRAGMENT_CACHE_LOOKUPS = register(
+    Counter("gm_fragment_cache_lookups_total", "Request row fragment cache lookups by result (hit/miss).")
+)
+FRAGMENT_CACHE_EVICTIONS = register(
+    Counter("gm_fragment_cache_evictions_total", "Request row fragments evicted to stay within the byte bound.")
+)
+
+
+class FragmentCache:
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0  # bytes of cached HTML (UTF-8)
+        self._entries: OrderedDict[Hashable, tuple[str, int]] = OrderedDict()  # key → (html, bytes)
+        self._keys_by_request: dict[int, set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        html = entry[0] if entry is not None else None
+        FRAGMENT_CACHE_LOOKUPS.inc(result="hit" if html is not None else "miss")
+        return html
+
+    def put(self, request_id: int, key: Hashable, html: str) -> None:
+        nbytes = len(html.encode())
+        if nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = (html, nbytes)
+            self._keys_by_request.setdefault(request_id, set()).add(key)
+            self.size += nbytes
+            while self.size > self.max_bytes:
+                old_key, (_html, old_bytes) = self._entries.popitem(last=False)
+                self._forget(old_key, old_bytes)
+                FRAGMENT_CACHE_EVICTIONS.inc()
+
+    def invalidate(self, request_id: int) -> None:
+        # Drop every cached version of one request's row.
+        with self._lock:
+            for key in self._keys_by_request.pop(request_id, set()):
+                self.size -= self._entries.pop(key)[1]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_request.clear()
+            self.size = 0
+
+    def _forget(self, key: Hashable, nbytes: int) -> None:
+        # Caller holds the lock. key[0] is the request id.
+        self.size -= nbytes
+        keys = self._keys_by_request.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_request[key[0]]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+row_cache = FragmentCache(settings.fragment_cache_max_bytes)
+
+
+def _row_key(req: ServiceRequest, is_staff: bool) -> tuple:
+    if not is_staff:
+        return (req.id, req.updated_at, False)
+    guest = req.guest
+    return (req.id, req.updated_at, True, guest.first_name, guest.last_name, guest.room_number)
+
+
+def render_request_row(templates: Jinja2Templates, req: ServiceRequest, is_staff: bool) -> Markup:
+    key = _row_key(req, is_staff)
+    html = row_cache.get(key)
+    if html is None:
+        html = templates.get_template(ROW_TEMPLATE).render(req=req, is_staff=is_staff)
+        row_cache.put(req.id, key, html)
+    return Markup(html)
+
+
+def swap_oob(row_html: str, swap: str = "true") -> Markup:
+    # Mark a rendered row as an htmx out-of-band swap (by default: replace the row with its id).
+    return Markup(str(row_html).replace("<tr ", f'<tr hx-swap-oob="{swap}" ', 1))
+
+
+def publish_guest_row(templates: Jinja2Templates, req: ServiceRequest, event: str) -> None:
+    # Push a request's guest row to its owner's SSE stream (run as a post-commit job).
+    broker.publish(guest_topic(req.guest_id), event, render_request_row(templates, req, is_staff=False))
+
+
+def install_row_cache(templates: Jinja2Templates) -> None:
+    # Expose request_row(req, is_staff) and the swap_oob filter to the environment's templates.
+    templates.env.globals["request_row"] = lambda req, is_staff: render_request_row(templates, req, is_staff)
+    templates.env.filters["swap_oob"] = swap_oob
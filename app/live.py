@@ -0,0 +1,224 @@
+# app/live.py — Staff live queue: filtered row deltas over WebSocket
+#
+# Each open staff dashboard holds a WebSocket (/staff/live) registered with the filter its table
+# shows (status, category, search, history); the browser sends the new filter whenever the form
+# changes. After a request is created or changes status, publish_changes (a post-commit job)
+# pushes the row to the connections whose filter it concerns, as an htmx out-of-band fragment:
+# insert on top, update in place, or remove. Connections are indexed by (status, category)
+# filter, so a change only visits the filter groups it can match, the row is loaded and rendered
+# once per change, and search terms are checked with one query per distinct term (per history
+# flag: history tables search with ILIKE). Nothing is queried when no connection can be affected.
+#
+# Each connection has a bounded outgoing queue (LIVE_QUEUE_SIZE). A connection that falls behind
+# has its backlog replaced by one "reload the table" message. Changes made while a dashboard is
+# connecting, and archiving, are picked up by the table's "since" poller.
+import asyncio
+import json
+from collections.abc import Iterable, Mapping
+from dataclasses import dataclass, field
+from typing import Any
+from urllib.parse import urlencode
+
+from markupsafe import escape
+from sqlalchemy.orm import selectinload
+from sqlmodel import select
+from starlette.templating import Jinja2Templates
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from app.changes import RequestDelta, row_op
+from app.config import settings
+from app.database import async_session_factory
+from app.filters import filtered_statement, search_subquery
+from app.metrics import Counter, Gauge, register
+from app.models import ServiceRequest
+
+LIVE_MESSAGE_TEMPLATE = "_partials/live_row.html"
+
+LIVE_CONNECTIONS = register(Gauge("gm_live_connections", "Open staff live queue WebSockets."))
+LIVE_MESSAGES = register(
+    Counter("gm_live_messages_total", "Live queue messages by op (insert, update, remove, resync).")
+)
+
+
+@dataclass(frozen=True)
+class LiveFilter:
+    status: str = ""
+    category: str = ""
+    search: str = ""
+    history: bool = False
+
+    @classmethod
+    def parse(cls, values: Mapping[str, Any]) -> "LiveFilter":
+        # From the dashboard's query string or filter form (status_filter, category_filter, ...).
+        return cls(
+            status=str(values.get("status_filter") or ""),
+            category=str(values.get("category_filter") or ""),
+            search=str(values.get("search") or "").strip(),
+            history=bool(values.get("history")),
+        )
+
+    def table_url(self) -> str:
+        params = {
+            "status_filter": self.status,
+            "category_filter": self.category,
+            "search": self.search,
+            "history": "1" if self.history else "",
+        }
+        return f"/staff/requests/filter?{urlencode({k: v for k, v in params.items() if v})}"
+
+
+@dataclass(eq=False)
+class LiveConnection:
+    filter: LiveFilter
+    queue: asyncio.Queue[str] = field(default_factory=lambda: asyncio.Queue(maxsize=settings.live_queue_size))
+
+
+class LiveQueue:
+    def __init__(self) -> None:
+        # (status, category) → filter → connections; "" is "any"
+        self._index: dict[tuple[str, str], dict[LiveFilter, set[LiveConnection]]] = {}
+
+    def connect(self, live_filter: LiveFilter) -> LiveConnection:
+        conn = LiveConnection(live_filter)
+        self._add(conn)
+        LIVE_CONNECTIONS.set(self.connection_count())
+        return conn
+
+    def refilter(self, conn: LiveConnection, live_filter: LiveFilter) -> None:
+        self._discard(conn)
+        conn.filter = live_filter
+        self._add(conn)
+
+    def disconnect(self, conn: LiveConnection) -> None:
+        self._discard(conn)
+        LIVE_CONNECTIONS.set(self.connection_count())
+
+    def filters_for(self, statuses: Iterable[str], category: str) -> list[LiveFilter]:
+        # Registered filters a change to a request in category, moving between statuses, can concern.
+        filters = []
+        for status in {"", *statuses}:
+            for category_key in {"", category}:
+                filters += self._index.get((status, category_key), {})
+        return filters
+
+    def send(self, live_filter: LiveFilter, messages: list[str], op: str) -> int:
+        # Queue messages for every connection with live_filter without waiting. Returns how many.
+        conns = self._index.get((live_filter.status, live_filter.category), {}).get(live_filter, ())
+        for conn in conns:
+            if conn.queue.maxsize - conn.queue.qsize() < len(messages):
+                _reset_to_reload(conn)
+                continue
+            for message in messages:
+                conn.queue.put_nowait(message)
+            LIVE_MESSAGES.inc(op=op)
+        return len(conns)
+
+    def connection_count(self) -> int:
+        return sum(len(conns) for group in self._index.values() for conns in group.values())
+
+    def _add(self, conn: LiveConnection) -> None:
+        key = (conn.filter.status, conn.filter.category)
+        self._index.setdefault(key, {}).setdefault(conn.filter, set()).add(conn)
+
+    def _discard(self, conn: LiveConnection) -> None:
+        key = (conn.filter.status, conn.filter.category)
+        group = self._index.get(key, {})
+        conns = group.get(conn.filter)
+        if conns is None:
+            return
+        conns.discard(conn)
+        if not conns:
+            del group[conn.filter]
+        if not group:
+            self._index.pop(key, None)
+
+
+def _reset_to_reload(conn: LiveConnection) -> None:
+    # Backlog overflowed: the queued deltas are superseded by reloading the whole table once.
+    while not conn.queue.empty():
+        conn.queue.get_nowait()
+    url = escape(conn.filter.table_url())
+    conn.queue.put_nowait(
+        f'<div id="live-reload" hidden hx-swap-oob="true" hx-get="{url}" hx-trigger="load" hx-target="#results"></div>'
+    )
+    LIVE_MESSAGES.inc(op="resync")
+
+
+async def publish_changes(templates: Jinja2Templates, changes: list[tuple[RequestDelta, ServiceRequest]]) -> None:
+    # Post-commit job: push each changed request to the live connections whose filter it
+    # concerns. changes pairs each change with the request as written (status and category).
+    targets = {
+        delta.request_id: filters
+        for delta, sr in changes
+        if (filters := live_queue.filters_for(_statuses(delta, sr), sr.category.value))
+    }
+    if not targets:
+        return
+    async with async_session_factory() as session:
+        statement = (
+            select(ServiceRequest)
+            .options(selectinload(ServiceRequest.guest))
+            .where(ServiceRequest.id.in_(list(targets)))
+        )
+        current = {sr.id: sr for sr in (await session.exec(statement)).all()}
+        # Request ids matching each distinct (search term, history); history tables use ILIKE
+        matches: dict[tuple[str, bool], set[int]] = {}
+        for search, history in {(f.search, f.history) for filters in targets.values() for f in filters if f.search}:
+            statement = filtered_statement(
+                select(ServiceRequest.id), None if history else search_subquery(session, search), None, None, search
+            ).where(ServiceRequest.id.in_(list(targets)))
+            matches[search, history] = set((await session.exec(statement)).all())
+
+    template = templates.get_template(LIVE_MESSAGE_TEMPLATE)
+    for delta, _written in changes:
+        sr = current.get(delta.request_id)
+        if sr is None:
+            continue
+        rendered: dict[str, str] = {}  # once per op
+        for live_filter in targets.get(delta.request_id, ()):
+            if live_filter.search and sr.id not in matches[live_filter.search, live_filter.history]:
+                continue
+            op = row_op(delta, sr.status, live_filter.status)
+            if op is None:
+                continue
+            for needed in ("remove", "insert") if op == "insert" else (op,):
+                if needed not in rendered:
+                    rendered[needed] = template.render(op=needed, req=sr).strip()
+            messages = [rendered["remove"], rendered["insert"]] if op == "insert" else [rendered[op]]
+            live_queue.send(live_filter, messages, op)
+
+
+def _statuses(delta: RequestDelta, sr: ServiceRequest) -> set[str]:
+    return {sr.status.value, delta.old_status.value} if delta.old_status else {sr.status.value}
+
+
+async def serve(websocket: WebSocket, conn: LiveConnection) -> None:
+    # Relay conn's queued messages and apply the filters the browser sends until it disconnects.
+    receiver = asyncio.create_task(_receive_filters(websocket, conn))
+    try:
+        while True:
+            message = asyncio.ensure_future(conn.queue.get())
+            await asyncio.wait({message, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            if not message.done():
+                message.cancel()
+                return
+            await websocket.send_text(message.result())
+    finally:
+        receiver.cancel()
+
+
+async def _receive_filters(websocket: WebSocket, conn: LiveConnection) -> None:
+    # The dashboard's filter form sends its values (htmx ws-send) as JSON on every change.
+    try:
+        while True:
+            try:
+                values = json.loads(await websocket.receive_text())
+            except ValueError:
+                continue
+            if isinstance(values, dict):
+                live_queue.refilter(conn, LiveFilter.parse(values))
+    except WebSocketDisconnect:
+        return
+
+
+live_queue = LiveQueue()
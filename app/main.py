@@ -1,5 +1,6 @@
 # app/main.py — Application entry point
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
 from fastapi import FastAPI, Request
@@ -8,20 +9,39 @@ from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 
 from app.auth import _RedirectException
+from app.changes import schedule_compaction
 from app.config import settings
-from app.database import engine
+from app.database import async_engine, engine
+from app.metrics import MetricsMiddleware, instrument_engine
+from app.migrations import run_migrations
 from app.models import SQLModel
-from app.routes import auth, guest, staff
+from app.routes import api, auth, guest, metrics, staff
 from app.seed import seed
+from app.tasks import task_queue
+from app.templating import precompile_templates, templates
 
 # -----------------------------------------------------------------------------
 # App setup
 # -----------------------------------------------------------------------------
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup: create tables, apply SQLite migrations, seed data.
+    # Startup: create tables, apply SQLite migrations, seed data, compile templates, start the
+    # post-commit job workers and the change log compaction schedule.
     _on_startup()
+    precompile_templates(templates)
+    await task_queue.start()
+    compaction = None
+    if settings.change_log_compact_interval_seconds > 0:
+        compaction = asyncio.create_task(schedule_compaction(async_engine), name="change-log-compaction")
     yield
+    # Shutdown: stop scheduling, finish queued jobs, then close pooled async connections (they
+    # are bound to this event loop).
+    if compaction is not None:
+        compaction.cancel()
+        with suppress(asyncio.CancelledError):
+            await compaction
+    await task_queue.stop()
+    await async_engine.dispose()
 
 
 app = FastAPI(
@@ -39,18 +59,27 @@ async def redirect_exception_handler(request: Request, exc: _RedirectException):
 # Session-based auth: stores guest_id or staff_id in encrypted cookie
 app.add_middleware(SessionMiddleware, secret_key=settings.secret_key)
 
+# Per-route latency, SQL and template timings (added last = outermost, so it times everything).
+# Templates are instrumented in app/templating.py.
+app.add_middleware(MetricsMiddleware)
+instrument_engine(engine)
+instrument_engine(async_engine.sync_engine)
+
 # Static assets (CSS, images) served at /static
 app.mount("/static", StaticFiles(directory=str(Path(__file__).parent.parent / "static")), name="static")
 
-# Route modules: auth, guest, staff
+# Route modules: auth, guest, staff, metrics, JSON API (/api/v1)
 app.include_router(auth.router)
 app.include_router(guest.router)
 app.include_router(staff.router)
+app.include_router(metrics.router)
+app.include_router(api.router)
 
 
 def _on_startup():
-    # Run on startup: create tables, seed data. Fresh scaffold — no migrations.
+    # Run on startup: create missing tables, upgrade existing ones (indexes etc.), seed data.
     SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
     seed()
 
 
@@ -0,0 +1,238 @@
+# app/metrics.py — Per-route latency, DB and template metrics (Prometheus text format)
+#
+# MetricsMiddleware times every HTTP request and labels it with the matched route template
+# (/staff/requests/{request_id}, not the raw path), so label cardinality stays bounded.
+# SQLAlchemy cursor events on both engines add each query's count and duration to the current
+# request's RequestStats, and TimedTemplate does the same for Jinja render time. Per request this
+# separates SQL time and template time from the rest (session decoding, routing, Python).
+#
+# Everything aggregates in-process into fixed-bucket histograms: recording a value is a bisect
+# and a few additions under a lock, cheap enough to leave on under load (METRICS_ENABLED=false
+# turns the middleware off). Scraped at GET /metrics, staff only (app/routes/metrics.py).
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass
+
+from jinja2 import Template
+from sqlalchemy import Engine, event
+from starlette.templating import Jinja2Templates
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.config import settings
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100, 250)
+
+_lock = threading.Lock()
+
+
+def _label_text(labels: tuple[tuple[str, str], ...]) -> str:
+    escaped = (
+        (k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in labels
+    )
+    return ",".join(f'{k}="{v}"' for k, v in escaped)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.values: dict[tuple[tuple[str, str], ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = self.values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self.values.get(tuple(sorted(labels.items())), 0.0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, value in sorted(self.values.items()):
+            lines.append(f"{self.name}{{{_label_text(key)}}} {value:g}" if key else f"{self.name} {value:g}")
+        return lines
+
+
+class Gauge(Counter):
+    # A value that goes up and down (e.g. a queue depth): set() replaces it.
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with _lock:
+            self.values[key] = value
+
+
+class Histogram:
+    # Prometheus-style histogram: per label set, a count per bucket upper bound plus sum and count.
+    def __init__(self, name: str, help_text: str, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.series: dict[tuple[tuple[str, str], ...], list[float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        # series layout: [count per bucket..., +Inf bucket, sum]
+        key = tuple(sorted(labels.items()))
+        index = bisect_left(self.buckets, value)
+        with _lock:
+            series = self.series.get(key)
+            if series is None:
+                series = self.series[key] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, **labels: str) -> int:
+        series = self.series.get(tuple(sorted(labels.items())))
+        return int(sum(series[:-1])) if series else 0
+
+    def total(self, **labels: str) -> float:
+        series = self.series.get(tuple(sorted(labels.items())))
+        return series[-1] if series else 0.0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.series.items()):
+            prefix = _label_text(key) + "," if key else ""
+            cumulative = 0.0
+            for bound, n in zip([*self.buckets, "+Inf"], series[:-1]):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {cumulative:g}')
+            labels = f"{{{_label_text(key)}}}" if key else ""
+            lines.append(f"{self.name}_sum{labels} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{labels} {cumulative:g}")
+        return lines
+
+
+HTTP_REQUESTS = Counter("gm_http_requests_total", "HTTP requests by route and response status.")
+HTTP_DURATION = Histogram("gm_http_request_duration_seconds", "HTTP request latency by route.")
+HTTP_DB_QUERIES = Histogram(
+    "gm_http_request_db_queries", "SQL statements executed per HTTP request.", QUERY_COUNT_BUCKETS
+)
+HTTP_DB_SECONDS = Histogram("gm_http_request_db_seconds", "Total SQL time per HTTP request.")
+HTTP_TEMPLATE_SECONDS = Histogram("gm_http_request_template_seconds", "Total template render time per HTTP request.")
+DB_QUERY_SECONDS = Histogram("gm_db_query_duration_seconds", "Duration of every SQL statement.")
+TEMPLATE_SECONDS = Histogram("gm_template_render_seconds", "Render time per top-level template.")
+
+METRICS: list[Counter | Histogram] = [
+    HTTP_REQUESTS,
+    HTTP_DURATION,
+    HTTP_DB_QUERIES,
+    HTTP_DB_SECONDS,
+    HTTP_TEMPLATE_SECONDS,
+    DB_QUERY_SECONDS,
+    TEMPLATE_SECONDS,
+]
+
+
+def register(metric: Counter | Histogram) -> Counter | Histogram:
+    # Add a metric defined elsewhere (e.g. app/auth.py) to the /metrics output.
+    METRICS.append(metric)
+    return metric
+
+
+def render_metrics() -> str:
+    with _lock:
+        lines = [line for metric in METRICS for line in metric.render()]
+    return "\n".join(lines) + "\n"
+
+
+# -----------------------------------------------------------------------------
+# Per-request collection
+# -----------------------------------------------------------------------------
+@dataclass
+class RequestStats:
+    db_queries: int = 0
+    db_seconds: float = 0.0
+    template_seconds: float = 0.0
+
+
+# Stats of the HTTP request being handled (None outside requests: startup, CLI scripts)
+_current: ContextVar[RequestStats | None] = ContextVar("request_stats", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    context._gm_started = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    elapsed = time.perf_counter() - context._gm_started
+    DB_QUERY_SECONDS.observe(elapsed)
+    stats = _current.get()
+    if stats is not None:
+        stats.db_queries += 1
+        stats.db_seconds += elapsed
+
+
+def instrument_engine(target: Engine) -> None:
+    # Time every statement of a (sync) engine; pass async_engine.sync_engine for the async one.
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+
+
+# True while a template renders, so templates rendered from inside another one (request_row()
+# fragments) are not added to the request's template time twice
+_rendering: ContextVar[bool] = ContextVar("rendering", default=False)
+
+
+class TimedTemplate(Template):
+    # Records render() time per template. Includes ({% include %}) count towards their parent.
+    def render(self, *args, **kwargs) -> str:
+        nested = _rendering.get()
+        token = _rendering.set(True)
+        started = time.perf_counter()
+        try:
+            return super().render(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - started
+            _rendering.reset(token)
+            TEMPLATE_SECONDS.observe(elapsed, template=self.name or "<string>")
+            stats = _current.get()
+            if stats is not None and not nested:
+                stats.template_seconds += elapsed
+
+
+def instrument_templates(templates: Jinja2Templates) -> None:
+    # Must run before the first render: templates are compiled and cached with their class.
+    templates.env.template_class = TimedTemplate
+
+
+class MetricsMiddleware:
+    # Pure ASGI middleware (no BaseHTTPMiddleware task hop), outermost so it sees every request.
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not settings.metrics_enabled:
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = _current.set(stats)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _current.reset(token)
+            # The router stores the matched route in the scope; unmatched paths share one label.
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            labels = {"method": scope["method"], "route": route}
+            HTTP_REQUESTS.inc(**labels, status=str(status))
+            HTTP_DURATION.observe(elapsed, **labels)
+            HTTP_DB_QUERIES.observe(stats.db_queries, **labels)
+            HTTP_DB_SECONDS.observe(stats.db_seconds, **labels)
+            HTTP_TEMPLATE_SECONDS.observe(stats.template_seconds, **labels)
@@ -0,0 +1,121 @@
+# app/migrations.py — Versioned schema migrations, applied at startup
+#
+# create_all() only creates missing tables: it never adds indexes or columns to tables that
+# already exist in a production database. Each Migration upgrades an existing database by one
+# step and is recorded in the schema_version table. A fresh database from create_all already
+# has the latest schema, so every migration must be idempotent (IF NOT EXISTS, column checks).
+#
+# Run: applied automatically on app startup, or manually with python -m app.migrations
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import UTC, datetime
+
+from sqlalchemy import Connection, Engine, inspect, text
+
+from app.counters import rebuild as rebuild_counters
+from app.models import normalize_last_name
+from app.search import FTS_BACKFILL, fts_enabled
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _sql(*statements: str) -> Callable[[Connection], None]:
+    def apply(conn: Connection) -> None:
+        for statement in statements:
+            conn.execute(text(statement))
+
+    return apply
+
+
+def _backfill_fts(conn: Connection) -> None:
+    if fts_enabled(conn.dialect.name):
+        conn.execute(text(FTS_BACKFILL))
+
+
+def _add_last_name_lower(conn: Connection) -> None:
+    # Add the normalized login column where missing and backfill it in Python with
+    # normalize_last_name, so stored values match login exactly (SQL lower() folds ASCII only).
+    for table_name, key_column, index_name in (
+        ("guest", "confirmation_code", "ix_guest_code_last_name_lower"),
+        ("staffuser", "employee_id", "ix_staffuser_employee_last_name_lower"),
+    ):
+        if "last_name_lower" not in {c["name"] for c in inspect(conn).get_columns(table_name)}:
+            conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN last_name_lower VARCHAR"))
+        rows = conn.execute(text(f"SELECT id, last_name FROM {table_name} WHERE last_name_lower IS NULL")).all()
+        if rows:
+            conn.execute(
+                text(f"UPDATE {table_name} SET last_name_lower = :lower WHERE id = :id"),
+                [{"id": row.id, "lower": normalize_last_name(row.last_name)} for row in rows],
+            )
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table_name} ({key_column}, last_name_lower)"))
+
+
+def _add_request_version(conn: Connection) -> None:
+    if "version" not in {c["name"] for c in inspect(conn).get_columns("servicerequest")}:
+        conn.execute(text("ALTER TABLE servicerequest ADD COLUMN version INTEGER DEFAULT 0 NOT NULL"))
+
+
+MIGRATIONS: list[Migration] = [
+    Migration(
+        1,
+        "Secondary indexes for guest list, dashboard filters and activity timeline",
+        _sql(
+            "CREATE INDEX IF NOT EXISTS ix_servicerequest_guest_created "
+            "ON servicerequest (guest_id, created_at, updated_at)",
+            "CREATE INDEX IF NOT EXISTS ix_servicerequest_status_created ON servicerequest (status, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_servicerequest_category_created ON servicerequest (category, created_at)",
+            "CREATE INDEX IF NOT EXISTS ix_servicerequest_created_id ON servicerequest (created_at, id)",
+            "CREATE INDEX IF NOT EXISTS ix_requestactivity_request_created ON requestactivity (request_id, created_at)",
+        ),
+    ),
+    Migration(2, "Backfill the staff search FTS index", _backfill_fts),
+    Migration(3, "Indexed lower-cased last names for guest and staff login", _add_last_name_lower),
+    Migration(4, "Backfill the request counters", rebuild_counters),
+    Migration(5, "Version column for optimistic status updates", _add_request_version),
+]
+
+
+def _ensure_version_table(conn: Connection) -> None:
+    conn.execute(
+        text(
+            "CREATE TABLE IF NOT EXISTS schema_version ("
+            "version INTEGER PRIMARY KEY, description VARCHAR NOT NULL, applied_at TIMESTAMP NOT NULL)"
+        )
+    )
+
+
+def current_version(conn: Connection) -> int:
+    _ensure_version_table(conn)
+    return conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_version")).scalar_one()
+
+
+def run_migrations(engine: Engine) -> list[int]:
+    # Apply pending migrations in order, each in its own transaction. Returns versions applied.
+    with engine.begin() as conn:
+        version = current_version(conn)
+    applied: list[int] = []
+    for migration in MIGRATIONS:
+        if migration.version <= version:
+            continue
+        with engine.begin() as conn:
+            migration.apply(conn)
+            conn.execute(
+                text("INSERT INTO schema_version (version, description, applied_at) VALUES (:v, :d, :t)"),
+                {"v": migration.version, "d": migration.description, "t": datetime.now(UTC)},
+            )
+        applied.append(migration.version)
+    return applied
+
+
+if __name__ == "__main__":
+    from app.database import engine
+    from app.models import SQLModel
+
+    SQLModel.metadata.create_all(engine)
+    applied = run_migrations(engine)
+    print(f"Applied migrations: {applied}" if applied else "Schema is up to date.")
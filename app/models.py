@@ -3,6 +3,7 @@ from datetime import UTC, datetime
 from enum import Enum
 from typing import Optional
 
+from sqlalchemy import Index, event
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -42,6 +43,12 @@ class RequestStatus(str, Enum):
     completed = "completed"
 
 
+class ChangeKind(str, Enum):
+    created = "created"
+    status = "status"
+    archived = "archived"
+
+
 # Status transitions for staff updates (new → assigned → in_progress → completed)
 VALID_TRANSITIONS: dict[str, list[str]] = {
     "new": ["assigned"],
@@ -50,14 +57,38 @@ VALID_TRANSITIONS: dict[str, list[str]] = {
     "completed": [],
 }
 
+# The one status each status is reached from (update_status makes it part of its UPDATE)
+PREVIOUS_STATUS: dict[str, str] = {new: old for old, targets in VALID_TRANSITIONS.items() for new in targets}
+
+
+# -----------------------------------------------------------------------------
+# Login lookup normalization
+# -----------------------------------------------------------------------------
+def normalize_last_name(last_name: str) -> str:
+    # Case-folded form stored in last_name_lower and compared at login.
+    return last_name.strip().lower()
+
+
+def _default_last_name_lower(context) -> str:
+    # Column default, so Core bulk inserts (seed_synthetic) get the value without passing it.
+    return normalize_last_name(context.get_current_parameters()["last_name"])
+
+
+def _sync_last_name_lower(mapper, connection, target) -> None:
+    target.last_name_lower = normalize_last_name(target.last_name)
+
 
 # -----------------------------------------------------------------------------
 # Tables
 # -----------------------------------------------------------------------------
 class Guest(SQLModel, table=True):
+    # Login: confirmation_code = ? AND last_name_lower = ? (keep in sync with app/migrations.py)
+    __table_args__ = (Index("ix_guest_code_last_name_lower", "confirmation_code", "last_name_lower"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     first_name: str
     last_name: str
+    last_name_lower: str | None = Field(default=None, sa_column_kwargs={"default": _default_last_name_lower})
     confirmation_code: str = Field(unique=True, index=True)
     tier: GuestTier = GuestTier.silver
     status: GuestStatus = GuestStatus.checked_in
@@ -68,10 +99,14 @@ class Guest(SQLModel, table=True):
 
 
 class StaffUser(SQLModel, table=True):
+    # Login: employee_id = ? AND last_name_lower = ? (keep in sync with app/migrations.py)
+    __table_args__ = (Index("ix_staffuser_employee_last_name_lower", "employee_id", "last_name_lower"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     employee_id: str = Field(unique=True, index=True)
     first_name: str
     last_name: str
+    last_name_lower: str | None = Field(default=None, sa_column_kwargs={"default": _default_last_name_lower})
     role: str = "staff"
 
     @property
@@ -80,6 +115,16 @@ class StaffUser(SQLModel, table=True):
 
 
 class ServiceRequest(SQLModel, table=True):
+    # Indexes match the hot query shapes (keep in sync with app/migrations.py):
+    #   guest list + poll ETag: guest_id = ? ORDER BY created_at (updated_at makes MAX() covered)
+    #   dashboard: ORDER BY created_at, id, optionally filtered by status or category
+    __table_args__ = (
+        Index("ix_servicerequest_guest_created", "guest_id", "created_at", "updated_at"),
+        Index("ix_servicerequest_status_created", "status", "created_at"),
+        Index("ix_servicerequest_category_created", "category", "created_at"),
+        Index("ix_servicerequest_created_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     guest_id: int = Field(foreign_key="guest.id")
     category: RequestCategory
@@ -89,12 +134,17 @@ class ServiceRequest(SQLModel, table=True):
     status: RequestStatus = RequestStatus.new
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+    # Bumped by every status change; update_status only writes the version the page showed
+    version: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     guest: Guest | None = Relationship(back_populates="service_requests")
     activities: list["RequestActivity"] = Relationship(back_populates="request")
 
 
 class RequestActivity(SQLModel, table=True):
+    # Timeline: request_id = ? ORDER BY created_at
+    __table_args__ = (Index("ix_requestactivity_request_created", "request_id", "created_at"),)
+
     id: Optional[int] = Field(default=None, primary_key=True)
     request_id: int = Field(foreign_key="servicerequest.id")
     action: str
@@ -103,3 +153,79 @@ class RequestActivity(SQLModel, table=True):
     created_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
 
     request: ServiceRequest | None = Relationship(back_populates="activities")
+
+
+class RequestCounter(SQLModel, table=True):
+    # Number of service requests per (status, category, priority). Maintained by app/counters.py
+    # in the same transaction as each request insert and status change.
+    status: RequestStatus = Field(primary_key=True)
+    category: RequestCategory = Field(primary_key=True)
+    priority: RequestPriority = Field(primary_key=True)
+    count: int = 0
+
+
+class RequestChange(SQLModel, table=True):
+    # Append-only log of request inserts, status changes and archiving (app/changes.py), written
+    # in the same transaction as the change. seq is AUTOINCREMENT: it only grows and is never
+    # reused, even after compaction deletes old entries, so it works as a sync cursor.
+    #   staff "since" sync: seq > ?      guest "since" sync: guest_id = ? AND seq > ?
+    #   compaction: changed_at < ?
+    __table_args__ = (
+        Index("ix_requestchange_guest_seq", "guest_id", "seq"),
+        Index("ix_requestchange_changed_at", "changed_at"),
+        {"sqlite_autoincrement": True},
+    )
+
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    request_id: int  # no foreign key: archived requests leave servicerequest, their entries stay
+    guest_id: int
+    kind: ChangeKind
+    old_status: RequestStatus | None = None  # status before a status change
+    status: RequestStatus | None = None  # status after the change (None when archived)
+    changed_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+
+class ArchivedServiceRequest(SQLModel, table=True):
+    # Cold copy of a completed ServiceRequest, moved here by app/archive.py. Same columns and id
+    # as the live row, plus when it was archived. Read only in "include history" views.
+    __tablename__ = "servicerequest_archive"
+    __table_args__ = (
+        Index("ix_servicerequest_archive_guest_created", "guest_id", "created_at"),
+        Index("ix_servicerequest_archive_created_id", "created_at", "id"),
+    )
+
+    id: int = Field(primary_key=True)
+    guest_id: int = Field(foreign_key="guest.id")
+    category: RequestCategory
+    priority: RequestPriority
+    request_type: str | None = None
+    description: str = ""
+    status: RequestStatus
+    created_at: datetime
+    updated_at: datetime
+    version: int = 0
+    archived_at: datetime = Field(default_factory=lambda: datetime.now(UTC))
+
+    guest: Guest | None = Relationship()
+
+
+class ArchivedRequestActivity(SQLModel, table=True):
+    # Cold copy of a RequestActivity whose request was archived.
+    __tablename__ = "requestactivity_archive"
+    __table_args__ = (Index("ix_requestactivity_archive_request_created", "request_id", "created_at"),)
+
+    id: int = Field(primary_key=True)
+    request_id: int = Field(foreign_key="servicerequest_archive.id")
+    action: str
+    staff_name: str | None = None
+    note: str | None = None
+    created_at: datetime
+
+
+# A live or archived request: both carry the columns the request row templates read
+RequestRow = ServiceRequest | ArchivedServiceRequest
+
+# ORM inserts and renames keep last_name_lower in step with last_name
+for _model in (Guest, StaffUser):
+    event.listen(_model, "before_insert", _sync_last_name_lower)
+    event.listen(_model, "before_update", _sync_last_name_lower)
@@ -0,0 +1,30 @@
+# app/pagination.py — Opaque keyset cursors for paged lists
+#
+# A cursor encodes the sort key and id of the last row a page showed; the next page continues
+# strictly after it, so pages stay stable while rows are inserted and cost the same however deep
+# they go. Used by the staff dashboard and timeline (app/routes/staff.py) and the JSON API
+# (app/routes/api.py).
+import base64
+from collections.abc import Callable
+from typing import Any
+
+
+def encode_cursor(kind: str, key: str, request_id: int) -> str:
+    # Opaque keyset cursor: sort key + id of the last row shown. kind is "c" for the default
+    # (created_at, id) order, "r" for ranked search results (rank, id) and "a" for the activity
+    # timeline (created_at, id of the activity).
+    raw = f"{kind}|{key}|{request_id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str | None, kind: str, parse: Callable[[str], Any]) -> tuple[Any, int] | None:
+    # Returns None for a missing, malformed or other-order cursor (treated as the first page).
+    if not cursor:
+        return None
+    try:
+        cursor_kind, key, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        if cursor_kind != kind:
+            return None
+        return parse(key), int(request_id)
+    except ValueError:
+        return None
@@ -0,0 +1,45 @@
+# app/querycount.py — Count SQL statements and spot N+1 patterns (used by the test query budgets)
+#
+#   with QueryCounter() as queries:
+#       client.get("/staff")
+#   queries.count, queries.repeated()
+#
+# Listens on cursor execution of both app engines while the block is open. It is deliberately
+# not tied to a context variable: TestClient runs the app in another thread, so statements
+# from any thread are counted. Statements are compared by their SQL text, which is already
+# parameterized, so the same query run for many different ids shows up as one repeated entry
+# — the signature of an N+1 (e.g. a template touching a lazy relationship per row).
+from collections import Counter
+
+from sqlalchemy import Engine, event
+
+from app.database import async_engine, engine
+
+
+class QueryCounter:
+    def __init__(self, *engines: Engine) -> None:
+        self.engines = engines or (engine, async_engine.sync_engine)
+        self.statements: list[str] = []
+
+    def __enter__(self) -> "QueryCounter":
+        for target in self.engines:
+            event.listen(target, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        for target in self.engines:
+            event.remove(target, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany) -> None:
+        self.statements.append(" ".join(statement.split()))
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def repeated(self, min_count: int = 2) -> dict[str, int]:
+        # Statements executed at least min_count times (identical SQL, any parameters).
+        return {sql: n for sql, n in Counter(self.statements).items() if n >= min_count}
+
+    def report(self) -> str:
+        return "\n".join(f"  {i}. {sql}" for i, sql in enumerate(self.statements, 1))
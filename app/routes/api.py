@@ -0,0 +1,240 @@
+# app/routes/api.py — Versioned JSON API for kiosks and in-room tablets (prefix /api/v1)
+#
+# Same session login as the HTML routes (POST /login or /staff/login), but unauthenticated calls
+# get a JSON 401 instead of a redirect. Guests see their own requests; staff see every request
+# and can look guests up.
+#
+# Responses are built from column projections (only the selected fields are queried, as plain
+# rows) and encoded with orjson, never through ORM objects or response models:
+#   ?fields=id,status,updated_at   choose the fields (unknown fields → 400)
+#   ?ids=3,1,2                     batch fetch, in the order asked; ids not found (or not
+#                                  visible) are listed under "missing"
+#   ?cursor=...&limit=50           keyset pages, newest first; "next_cursor" is null on the last
+# Datetimes are UTC, ISO 8601. Archived requests are not served.
+#
+# HOW TO USE:
+#   GET /api/v1/requests?status=new&limit=50&fields=id,status,room_number
+#   GET /api/v1/requests?ids=1,2,3
+#   GET /api/v1/requests/{id}
+#   GET /api/v1/requests/{id}/activity?cursor=...
+#   GET /api/v1/guests/me                (guests)   GET /api/v1/guests?ids=1,2 (staff)
+from datetime import datetime
+from typing import Any
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import Select, tuple_
+from sqlalchemy.sql import ColumnElement
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from app.auth import api_principal
+from app.database import get_session
+from app.filters import filter_clauses
+from app.models import Guest, RequestActivity, RequestCategory, RequestStatus, ServiceRequest, StaffUser
+from app.pagination import decode_cursor, encode_cursor
+
+API_PAGE_SIZE = 50  # Requests per page unless ?limit= asks for fewer or more
+API_MAX_PAGE_SIZE = 200
+API_MAX_IDS = 200  # Ids one batch fetch may ask for
+
+REQUEST_FIELDS: dict[str, ColumnElement] = {
+    "id": ServiceRequest.id,
+    "guest_id": ServiceRequest.guest_id,
+    "category": ServiceRequest.category,
+    "priority": ServiceRequest.priority,
+    "request_type": ServiceRequest.request_type,
+    "description": ServiceRequest.description,
+    "status": ServiceRequest.status,
+    "created_at": ServiceRequest.created_at,
+    "updated_at": ServiceRequest.updated_at,
+    "version": ServiceRequest.version,
+    # From the guest (joined only when asked for)
+    "guest_name": Guest.first_name + " " + Guest.last_name,
+    "room_number": Guest.room_number,
+}
+_GUEST_JOIN_FIELDS = {"guest_name", "room_number"}
+
+ACTIVITY_FIELDS: dict[str, ColumnElement] = {
+    "id": RequestActivity.id,
+    "request_id": RequestActivity.request_id,
+    "action": RequestActivity.action,
+    "staff_name": RequestActivity.staff_name,
+    "note": RequestActivity.note,
+    "created_at": RequestActivity.created_at,
+}
+
+# No login secrets (confirmation_code, last_name_lower)
+GUEST_FIELDS: dict[str, ColumnElement] = {
+    "id": Guest.id,
+    "first_name": Guest.first_name,
+    "last_name": Guest.last_name,
+    "tier": Guest.tier,
+    "status": Guest.status,
+    "room_number": Guest.room_number,
+}
+
+router = APIRouter(prefix="/api/v1", tags=["api"])
+
+
+class APIResponse(JSONResponse):
+    # orjson encoding. Stored datetimes are UTC but come back naive from SQLite: mark them UTC.
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NAIVE_UTC)
+
+
+def _fields(fields: str | None, allowed: dict[str, ColumnElement]) -> list[str]:
+    # Requested field names (all when not given), validated against the projection.
+    if not fields:
+        return list(allowed)
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+    if unknown or not names:
+        raise HTTPException(400, f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(allowed)}")
+    return names
+
+
+def _ids(ids: str) -> list[int]:
+    try:
+        parsed = list(dict.fromkeys(int(value) for value in ids.split(",") if value.strip()))
+    except ValueError:
+        raise HTTPException(400, "ids must be a comma-separated list of integers") from None
+    if not parsed or len(parsed) > API_MAX_IDS:
+        raise HTTPException(400, f"Ask for between 1 and {API_MAX_IDS} ids")
+    return parsed
+
+
+def _projection(names: list[str], allowed: dict[str, ColumnElement], *keys: ColumnElement) -> Select:
+    # SELECT the named columns, plus key columns (id, sort key) under private labels.
+    return select(
+        *(allowed[name].label(name) for name in names),
+        *(key.label(f"_{key.key}") for key in keys),
+    )
+
+
+def _rows(result, names: list[str]) -> list[dict]:
+    return [{name: row[name] for name in names} for row in result.mappings()]
+
+
+def _request_statement(names: list[str], principal: Guest | StaffUser) -> Select:
+    statement = _projection(names, REQUEST_FIELDS, ServiceRequest.id, ServiceRequest.created_at)
+    if _GUEST_JOIN_FIELDS.intersection(names):
+        statement = statement.select_from(ServiceRequest).join(Guest, Guest.id == ServiceRequest.guest_id)
+    if isinstance(principal, Guest):
+        statement = statement.where(ServiceRequest.guest_id == principal.id)
+    return statement
+
+
+async def _batch(session: AsyncSession, statement: Select, id_column: ColumnElement, ids: list[int], names: list[str]):
+    # Rows for ids in the order asked, and the ids that matched nothing.
+    rows = {row["_id"]: row for row in (await session.exec(statement.where(id_column.in_(ids)))).mappings()}
+    return APIResponse({
+        "data": [{name: rows[i][name] for name in names} for i in ids if i in rows],
+        "missing": [i for i in ids if i not in rows],
+    })
+
+
+@router.get("/requests")
+async def list_requests(
+    principal: Guest | StaffUser = Depends(api_principal),
+    session: AsyncSession = Depends(get_session),
+    fields: str | None = None,
+    ids: str | None = None,
+    status: RequestStatus | None = None,
+    category: RequestCategory | None = None,
+    cursor: str | None = None,
+    limit: int = API_PAGE_SIZE,
+):
+    names = _fields(fields, REQUEST_FIELDS)
+    statement = _request_statement(names, principal)
+    if ids is not None:
+        return await _batch(session, statement, ServiceRequest.id, _ids(ids), names)
+    statement = statement.where(*filter_clauses(status, category, None))
+    after = decode_cursor(cursor, "c", datetime.fromisoformat)
+    if after:
+        statement = statement.where(tuple_(ServiceRequest.created_at, ServiceRequest.id) < after)
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+    statement = statement.order_by(ServiceRequest.created_at.desc(), ServiceRequest.id.desc()).limit(limit + 1)
+    rows = (await session.exec(statement)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("c", rows[-1]["_created_at"].isoformat(), rows[-1]["_id"])
+    return APIResponse({"data": [{name: row[name] for name in names} for row in rows], "next_cursor": next_cursor})
+
+
+@router.get("/requests/{request_id}")
+async def get_request(
+    request_id: int,
+    principal: Guest | StaffUser = Depends(api_principal),
+    session: AsyncSession = Depends(get_session),
+    fields: str | None = None,
+):
+    names = _fields(fields, REQUEST_FIELDS)
+    statement = _request_statement(names, principal).where(ServiceRequest.id == request_id)
+    rows = _rows(await session.exec(statement), names)
+    if not rows:
+        raise HTTPException(404, "Request not found")
+    return APIResponse({"data": rows[0]})
+
+
+@router.get("/requests/{request_id}/activity")
+async def request_activity(
+    request_id: int,
+    principal: Guest | StaffUser = Depends(api_principal),
+    session: AsyncSession = Depends(get_session),
+    fields: str | None = None,
+    cursor: str | None = None,
+    limit: int = API_PAGE_SIZE,
+):
+    # The request's timeline, newest first. Empty for a request the caller cannot see.
+    names = _fields(fields, ACTIVITY_FIELDS)
+    statement = _projection(names, ACTIVITY_FIELDS, RequestActivity.id, RequestActivity.created_at).where(
+        RequestActivity.request_id == request_id
+    )
+    if isinstance(principal, Guest):
+        statement = statement.join(ServiceRequest, ServiceRequest.id == RequestActivity.request_id).where(
+            ServiceRequest.guest_id == principal.id
+        )
+    after = decode_cursor(cursor, "a", datetime.fromisoformat)
+    if after:
+        statement = statement.where(tuple_(RequestActivity.created_at, RequestActivity.id) < after)
+    limit = max(1, min(limit, API_MAX_PAGE_SIZE))
+    statement = statement.order_by(RequestActivity.created_at.desc(), RequestActivity.id.desc()).limit(limit + 1)
+    rows = (await session.exec(statement)).mappings().all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor("a", rows[-1]["_created_at"].isoformat(), rows[-1]["_id"])
+    return APIResponse({"data": [{name: row[name] for name in names} for row in rows], "next_cursor": next_cursor})
+
+
+@router.get("/guests/me")
+async def current_guest(
+    principal: Guest | StaffUser = Depends(api_principal),
+    session: AsyncSession = Depends(get_session),
+    fields: str | None = None,
+):
+    if not isinstance(principal, Guest):
+        raise HTTPException(404, "Not logged in as a guest")
+    names = _fields(fields, GUEST_FIELDS)
+    statement = _projection(names, GUEST_FIELDS).where(Guest.id == principal.id)
+    rows = _rows(await session.exec(statement), names)
+    if not rows:
+        raise HTTPException(404, "Guest not found")
+    return APIResponse({"data": rows[0]})
+
+
+@router.get("/guests")
+async def list_guests(
+    ids: str,
+    principal: Guest | StaffUser = Depends(api_principal),
+    session: AsyncSession = Depends(get_session),
+    fields: str | None = None,
+):
+    # Staff only: batch fetch guests by id.
+    if not isinstance(principal, StaffUser):
+        raise HTTPException(403, "Staff only")
+    names = _fields(fields, GUEST_FIELDS)
+    return await _batch(session, _projection(names, GUEST_FIELDS, Guest.id), Guest.id, _ids(ids), names)
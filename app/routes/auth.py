@@ -1,16 +1,15 @@
 # app/routes/auth.py — Guest and staff login/logout routes
-from pathlib import Path
 
 from fastapi import APIRouter, Depends, Form, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth import lookup_guest, lookup_staff
+from app.auth import lookup_guest, lookup_staff, principal_cache
 from app.database import get_session
+from app.models import Guest, StaffUser
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent.parent / "templates"))
 
 
 @router.get("/login", response_class=HTMLResponse)
@@ -27,11 +26,12 @@ async def guest_login(
     request: Request,
     confirmation_code: str = Form(...),
     last_name: str = Form(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    guest = lookup_guest(session, confirmation_code.strip(), last_name.strip())
+    guest = await lookup_guest(session, confirmation_code.strip(), last_name.strip())
     if guest:
         request.session["guest_id"] = guest.id
+        principal_cache.put(guest)
         return RedirectResponse(url="/guest", status_code=303)
     return templates.TemplateResponse(
         request, "auth/login.html",
@@ -49,11 +49,12 @@ async def staff_login(
     request: Request,
     employee_id: str = Form(...),
     last_name: str = Form(...),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    staff = lookup_staff(session, employee_id.strip(), last_name.strip())
+    staff = await lookup_staff(session, employee_id.strip(), last_name.strip())
     if staff:
         request.session["staff_id"] = staff.id
+        principal_cache.put(staff)
         return RedirectResponse(url="/staff", status_code=303)
     return templates.TemplateResponse(
         request, "auth/staff_login.html",
@@ -63,5 +64,9 @@ async def staff_login(
 
 @router.post("/logout")
 async def logout(request: Request):
+    if guest_id := request.session.get("guest_id"):
+        principal_cache.invalidate(Guest, guest_id)
+    if staff_id := request.session.get("staff_id"):
+        principal_cache.invalidate(StaffUser, staff_id)
     request.session.clear()
     return RedirectResponse(url="/login", status_code=303)
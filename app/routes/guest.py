@@ -1,18 +1,33 @@
 # app/routes/guest.py — Guest-facing routes (prefix /guest)
 import json
-from pathlib import Path
 
 from fastapi import APIRouter, Depends, Form, Request
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlmodel import Session, select
+from fastapi.responses import HTMLResponse, RedirectResponse, Response, StreamingResponse
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from app.auth import get_current_guest
+from app.broker import broker, event_stream, guest_topic
+from app.changes import ChangeSet, RequestDelta, RowChanges, changes_since, current_cursor, record_changes
+from app.counters import record_created
 from app.database import get_session
-from app.models import Guest, RequestCategory, RequestPriority, RequestStatus, ServiceRequest
+from app.fragments import publish_guest_row
+from app.live import publish_changes
+from app.models import (
+    ArchivedServiceRequest,
+    ChangeKind,
+    Guest,
+    RequestCategory,
+    RequestChange,
+    RequestPriority,
+    RequestRow,
+    RequestStatus,
+    ServiceRequest,
+)
+from app.tasks import task_queue
+from app.templating import templates
 
 router = APIRouter(prefix="/guest", tags=["guest"])
-templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent.parent / "templates"))
 
 
 @router.get("", response_class=HTMLResponse)
@@ -26,40 +41,132 @@ async def guest_home(
     )
 
 
-def _guest_requests(session: Session, guest_id: int) -> list[ServiceRequest]:
-    statement = (
-        select(ServiceRequest)
-        .where(ServiceRequest.guest_id == guest_id)
-        .order_by(ServiceRequest.created_at.desc())
-    )
-    return list(session.exec(statement).all())
+async def _guest_requests(session: AsyncSession, guest_id: int, history: bool = False) -> list[RequestRow]:
+    # Live requests, newest first; history adds the guest's archived requests.
+    rows: list[RequestRow] = []
+    for model in (ServiceRequest, ArchivedServiceRequest) if history else (ServiceRequest,):
+        statement = select(model).where(model.guest_id == guest_id).order_by(model.created_at.desc())
+        rows += (await session.exec(statement)).all()
+    if history:
+        rows.sort(key=lambda sr: sr.created_at, reverse=True)
+    return rows
+
+
+def _poll_context(cursor: int, history: bool) -> dict:
+    # The hidden poller row asks for changes after cursor (see _partials/changes_poller.html).
+    query = f"since={cursor}&history=1" if history else f"since={cursor}"
+    return {"poll_url": f"/guest/requests/poll?{query}", "poll_target": "#request-rows"}
 
 
 @router.get("/requests", response_class=HTMLResponse)
 async def my_requests(
     request: Request,
     guest: Guest = Depends(get_current_guest),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
+    history: bool = False,
 ):
-    requests_list = _guest_requests(session, guest.id)
+    cursor = await current_cursor(session)
+    requests_list = await _guest_requests(session, guest.id, history)
     return templates.TemplateResponse(
         request,
         "guest/my_requests.html",
-        context={"requests": requests_list, "is_staff": False},
+        context={"requests": requests_list, "is_staff": False, "history": history, **_poll_context(cursor, history)},
     )
 
 
+async def _guest_requests_etag(session: AsyncSession, guest_id: int, history: bool = False) -> tuple[str, int]:
+    # Cheap version of a guest's request list: row count + newest updated_at, and the change log
+    # cursor the list is current as of (one aggregate row). The with-history list gets its own
+    # tag, so switching views never answers 304 with the other list.
+    count, last_updated, cursor = (
+        await session.exec(
+            select(
+                func.count(ServiceRequest.id),
+                func.max(ServiceRequest.updated_at),
+                select(func.coalesce(func.max(RequestChange.seq), 0)).scalar_subquery(),
+            ).where(ServiceRequest.guest_id == guest_id)
+        )
+    ).one()
+    stamp = last_updated.isoformat() if last_updated else "0"
+    view = "-history" if history else ""
+    return f'W/"{guest_id}-{count}-{stamp}{view}"', cursor
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
 @router.get("/requests/poll", response_class=HTMLResponse)
 async def my_requests_poll(
     request: Request,
     guest: Guest = Depends(get_current_guest),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
+    history: bool = False,
+    since: int | None = None,
 ):
-    requests_list = _guest_requests(session, guest.id)
+    # With since (a change log cursor): only the rows changed after it, as out-of-band swaps.
+    # Without it, or when since is too old to answer from the log, the full list, as a
+    # conditional GET: when the list is unchanged, skip loading rows and rendering entirely.
+    # htmx requests get an empty 200 with HX-Reswap: none, so the browser never hands htmx a
+    # cached body to re-swap; other clients get a plain 304.
+    if since is not None:
+        changes = await changes_since(session, since, guest.id)
+        if changes is not None:
+            return await _changed_rows(request, session, changes, history)
+    etag, cursor = await _guest_requests_etag(session, guest.id, history)
+    cache_headers = {"ETag": etag, "Cache-Control": "private, no-cache", "X-Change-Cursor": str(cursor)}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        if request.headers.get("hx-request"):
+            return Response(headers={**cache_headers, "HX-Reswap": "none"})
+        return Response(status_code=304, headers=cache_headers)
+    requests_list = await _guest_requests(session, guest.id, history)
     return templates.TemplateResponse(
         request,
         "_partials/request_rows.html",
-        context={"requests": requests_list, "is_staff": False},
+        context={"requests": requests_list, "is_staff": False, **_poll_context(cursor, history)},
+        headers=cache_headers,
+    )
+
+
+async def _changed_rows(request: Request, session: AsyncSession, changes: ChangeSet, history: bool) -> Response:
+    # Catch a guest's list up from the change set: new requests go on top, changed ones are
+    # replaced in place, archived ones dropped (kept, unchanged, when showing history).
+    rows = RowChanges()
+    ids = [delta.request_id for delta in changes.deltas.values() if not delta.archived]
+    current = {}
+    if ids:
+        current = {sr.id: sr for sr in (await session.exec(select(ServiceRequest).where(ServiceRequest.id.in_(ids))))}
+    for delta in changes.deltas.values():
+        sr = current.get(delta.request_id)
+        if sr is None:
+            if not history:
+                rows.removed.append(delta.request_id)
+        elif delta.created:
+            rows.inserted.insert(0, sr)  # newest first, like the list
+        else:
+            rows.updated.append(sr)
+    return templates.TemplateResponse(
+        request,
+        "_partials/request_changes.html",
+        context={"changes": rows, "is_staff": False, "rows_id": "request-rows", **_poll_context(changes.cursor, history)},
+        headers={"X-Change-Cursor": str(changes.cursor), "HX-Reswap": "none"},
+    )
+
+
+@router.get("/requests/stream")
+async def my_requests_stream(
+    request: Request,
+    guest: Guest = Depends(get_current_guest),
+):
+    # SSE: pushes "created" and "request-{id}" row fragments for this guest as they change.
+    sub = broker.subscribe(guest_topic(guest.id))
+    return StreamingResponse(
+        event_stream(request, sub),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
     )
 
 
@@ -105,7 +212,7 @@ def _description_required_for_category(category: str, description: str) -> bool:
 async def create_request(
     request: Request,
     guest: Guest = Depends(get_current_guest),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     category: str = Form(...),
     priority: str = Form("medium"),
     request_type: str | None = Form(None),
@@ -147,6 +254,11 @@ async def create_request(
         status=RequestStatus.new,
     )
     session.add(sr)
-    session.commit()
-    session.refresh(sr)
+    await session.flush()
+    await record_created(session, sr)
+    await record_changes(session, [sr], ChangeKind.created)
+    await session.commit()
+    await session.refresh(sr)
+    await task_queue.enqueue("publish_row", publish_guest_row, templates, sr, "created")
+    await task_queue.enqueue("publish_live", publish_changes, templates, [(RequestDelta(sr.id, created=True), sr)])
     return RedirectResponse("/guest/requests", status_code=303)
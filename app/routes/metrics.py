@@ -0,0 +1,17 @@
+# app/routes/metrics.py — Prometheus metrics endpoint (staff only)
+from fastapi import APIRouter, Depends
+from fastapi.responses import PlainTextResponse
+
+from app.auth import require_staff
+from app.metrics import render_metrics
+from app.models import StaffUser
+
+router = APIRouter()
+
+# Prometheus text exposition format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics(staff: StaffUser = Depends(require_staff)):
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
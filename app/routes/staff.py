@@ -1,85 +1,514 @@
 # app/routes/staff.py — Staff-facing routes (prefix /staff)
 from datetime import UTC, datetime
-from pathlib import Path
+from urllib.parse import urlencode
 
-from fastapi import APIRouter, Depends, Form, Request
+from fastapi import APIRouter, Depends, Form, Request, WebSocket
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from sqlalchemy.orm import selectinload
-from sqlmodel import Session, select
+from sqlalchemy import Select, and_, insert, or_, tuple_, update
+from sqlalchemy.orm import aliased, contains_eager, selectinload
+from sqlmodel import func, select
+from sqlmodel.ext.asyncio.session import AsyncSession
 
-from app.auth import require_staff
+from app.auth import require_staff, require_staff_websocket
+from app.changes import (
+    ChangeSet,
+    RequestDelta,
+    RowChanges,
+    changes_since,
+    current_cursor,
+    record_changes,
+    row_op,
+)
+from app.counters import count_requests, queue_summary, record_transition, record_transitions
 from app.database import get_session
-from app.models import Guest, RequestActivity, RequestCategory, RequestPriority, RequestStatus, ServiceRequest, StaffUser, VALID_TRANSITIONS
+from app.filters import filtered_statement, search_subquery
+from app.fragments import publish_guest_row, row_cache
+from app.live import LiveFilter, live_queue, publish_changes, serve
+from app.models import (
+    PREVIOUS_STATUS,
+    VALID_TRANSITIONS,
+    ArchivedRequestActivity,
+    ArchivedServiceRequest,
+    ChangeKind,
+    RequestActivity,
+    RequestRow,
+    RequestStatus,
+    ServiceRequest,
+    StaffUser,
+)
+from app.pagination import decode_cursor, encode_cursor
+from app.tasks import task_queue
+from app.templating import templates
 
 router = APIRouter(prefix="/staff", tags=["staff"])
-templates = Jinja2Templates(directory=str(Path(__file__).resolve().parent.parent.parent / "templates"))
 
 
-def _filtered_requests(
-    session: Session,
+PAGE_SIZE = 50  # Dashboard rows per page; further pages load via the "load more" row
+BULK_MAX_REQUESTS = 200  # Requests one bulk status change may select
+TIMELINE_PAGE_SIZE = 20  # Activity entries on the detail page; older ones load via "show older"
+
+
+async def _filtered_requests(
+    session: AsyncSession,
     status_filter: str | None = None,
     category_filter: str | None = None,
     search: str | None = None,
-) -> list[ServiceRequest]:
-    statement = (
-        select(ServiceRequest)
-        .options(selectinload(ServiceRequest.guest))
-        .join(Guest)
+    cursor: str | None = None,
+    limit: int | None = None,
+    history: bool = False,
+) -> tuple[list[RequestRow], str | None]:
+    # One page of requests plus the cursor for the next page (None on the last). Newest first,
+    # or best match first when searching with FTS.
+    limit = limit or PAGE_SIZE
+    if history:
+        return await _filtered_history(session, status_filter, category_filter, search, cursor, limit)
+    fts = search_subquery(session, search)
+    columns = (ServiceRequest,) if fts is None else (ServiceRequest, fts.c.rank)
+    statement = filtered_statement(
+        select(*columns).options(selectinload(ServiceRequest.guest)),
+        fts,
+        status_filter,
+        category_filter,
+        search,
     )
-    if status_filter:
-        statement = statement.where(ServiceRequest.status == status_filter)
-    if category_filter:
-        statement = statement.where(ServiceRequest.category == category_filter)
-    if search and search.strip():
-        term = f"%{search.strip()}%"
-        statement = statement.where(
-            (ServiceRequest.description.ilike(term))
-            | (Guest.first_name.ilike(term))
-            | (Guest.last_name.ilike(term))
+    if fts is not None:
+        after = decode_cursor(cursor, "r", float)
+        if after:
+            rank, request_id = after
+            statement = statement.where(
+                or_(fts.c.rank > rank, and_(fts.c.rank == rank, ServiceRequest.id < request_id))
+            )
+        statement = statement.order_by(fts.c.rank, ServiceRequest.id.desc())
+    else:
+        after = decode_cursor(cursor, "c", datetime.fromisoformat)
+        if after:
+            statement = statement.where(tuple_(ServiceRequest.created_at, ServiceRequest.id) < after)
+        statement = statement.order_by(ServiceRequest.created_at.desc(), ServiceRequest.id.desc())
+
+    rows = list((await session.exec(statement.limit(limit + 1))).all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if fts is None:
+        next_cursor = encode_cursor("c", rows[-1].created_at.isoformat(), rows[-1].id) if has_more else None
+        return rows, next_cursor
+    next_cursor = encode_cursor("r", repr(rows[-1][1]), rows[-1][0].id) if has_more else None
+    return [sr for sr, _rank in rows], next_cursor
+
+
+async def _filtered_history(
+    session: AsyncSession,
+    status_filter: str | None,
+    category_filter: str | None,
+    search: str | None,
+    cursor: str | None,
+    limit: int,
+) -> tuple[list[RequestRow], str | None]:
+    # "Include history": the same keyset page taken from the live and archive tables separately
+    # and merged, newest first. Search uses ILIKE here, since the FTS index only covers live rows.
+    after = decode_cursor(cursor, "c", datetime.fromisoformat)
+    rows: list[RequestRow] = []
+    for model in (ServiceRequest, ArchivedServiceRequest):
+        statement = filtered_statement(
+            select(model).options(selectinload(model.guest)), None, status_filter, category_filter, search, model
         )
-    statement = statement.order_by(ServiceRequest.created_at.desc())
-    return list(session.exec(statement).all())
+        if after:
+            statement = statement.where(tuple_(model.created_at, model.id) < after)
+        statement = statement.order_by(model.created_at.desc(), model.id.desc()).limit(limit + 1)
+        rows += (await session.exec(statement)).all()
+    rows.sort(key=lambda sr: (sr.created_at, sr.id), reverse=True)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = encode_cursor("c", rows[-1].created_at.isoformat(), rows[-1].id) if has_more else None
+    return rows, next_cursor
+
+
+async def _count_requests(
+    session: AsyncSession,
+    status_filter: str | None = None,
+    category_filter: str | None = None,
+    search: str | None = None,
+    history: bool = False,
+) -> int:
+    # Status/category filters alone are answered from the request counters; search must count.
+    # The counters cover live rows only, so history adds a count over the archive. With history
+    # the table searches both tables with ILIKE (_filtered_history), so the live count does too.
+    total = 0
+    if history:
+        statement = filtered_statement(
+            select(func.count(ArchivedServiceRequest.id)),
+            None,
+            status_filter,
+            category_filter,
+            search,
+            ArchivedServiceRequest,
+        )
+        total = (await session.exec(statement)).one()
+    if not (search and search.strip()):
+        return total + await count_requests(session, status_filter, category_filter)
+    statement = filtered_statement(
+        select(func.count(ServiceRequest.id)),
+        None if history else search_subquery(session, search),
+        status_filter,
+        category_filter,
+        search,
+    )
+    return total + (await session.exec(statement)).one()
+
+
+def _filter_query(
+    status_filter: str | None,
+    category_filter: str | None,
+    search: str | None,
+    cursor: str | None = None,
+    history: bool = False,
+    since: int | None = None,
+) -> str:
+    # Query string carrying the active filters (and optionally a page cursor or change log
+    # cursor) to the htmx partials.
+    params = {
+        "status_filter": status_filter,
+        "category_filter": category_filter,
+        "search": search,
+        "history": "1" if history else None,
+        "cursor": cursor,
+        "since": since,
+    }
+    return urlencode({k: v for k, v in params.items() if v not in (None, "")})
+
+
+def _table_context(
+    requests_list: list[RequestRow],
+    next_cursor: str | None,
+    status_filter: str | None,
+    category_filter: str | None,
+    search: str | None,
+    history: bool = False,
+    since: int | None = None,
+) -> dict:
+    # since (the change log cursor the rows are current as of) adds the incremental poller.
+    context = {
+        "requests": requests_list,
+        "is_staff": True,
+        "count_url": f"/staff/requests/count?{_filter_query(status_filter, category_filter, search, history=history)}",
+        "more_url": (
+            f"/staff/requests/more?{_filter_query(status_filter, category_filter, search, next_cursor, history)}"
+            if next_cursor
+            else None
+        ),
+    }
+    if since is not None:
+        context.update(_poll_context(status_filter, category_filter, search, history, since))
+    return context
+
+
+def _poll_context(
+    status_filter: str | None, category_filter: str | None, search: str | None, history: bool, since: int
+) -> dict:
+    # URLs for _partials/changes_poller.html: changes after since, or (for an empty table, which
+    # has no rows to update) the whole table again.
+    return {
+        "poll_url": f"/staff/requests/filter?{_filter_query(status_filter, category_filter, search, None, history, since)}",
+        "poll_target": "#results",
+        "refresh_url": f"/staff/requests/filter?{_filter_query(status_filter, category_filter, search, history=history)}",
+    }
 
 
 @router.get("", response_class=HTMLResponse)
 async def staff_dashboard(
     request: Request,
     staff: StaffUser = Depends(require_staff),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     status_filter: str | None = None,
     category_filter: str | None = None,
     search: str | None = None,
+    history: bool = False,
 ):
-    requests_list = _filtered_requests(session, status_filter, category_filter, search)
+    cursor = await current_cursor(session)
+    requests_list, next_cursor = await _filtered_requests(
+        session, status_filter, category_filter, search, history=history
+    )
     return templates.TemplateResponse(
         request,
         "staff/dashboard.html",
         context={
-            "requests": requests_list,
+            **_table_context(requests_list, next_cursor, status_filter, category_filter, search, history, cursor),
             "staff": staff,
-            "is_staff": True,
             "status_filter": status_filter or "",
             "category_filter": category_filter or "",
             "search": search or "",
+            "history": history,
+            "live_url": f"/staff/live?{_filter_query(status_filter, category_filter, search, history=history)}",
         },
     )
 
 
+@router.websocket("/live")
+async def staff_live(websocket: WebSocket, staff: StaffUser = Depends(require_staff_websocket)):
+    # Live queue for an open dashboard: row deltas matching its filter (see app/live.py). The
+    # connect URL carries the filter the page was rendered with; the filter form sends changes.
+    await websocket.accept()
+    conn = live_queue.connect(LiveFilter.parse(websocket.query_params))
+    try:
+        await serve(websocket, conn)
+    finally:
+        live_queue.disconnect(conn)
+
+
 @router.get("/requests/filter", response_class=HTMLResponse)
 async def staff_filter(
     request: Request,
     staff: StaffUser = Depends(require_staff),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     status_filter: str | None = None,
     category_filter: str | None = None,
     search: str | None = None,
+    history: bool = False,
+    since: int | None = None,
 ):
-    requests_list = _filtered_requests(session, status_filter, category_filter, search)
+    # The results table for the filters. With since (a change log cursor) only the rows that
+    # changed after it, as out-of-band swaps, unless since is too old to answer from the log.
+    if since is not None:
+        changes = await changes_since(session, since)
+        if changes is not None:
+            rows = await _changed_rows(session, changes, status_filter, category_filter, search, history)
+            return templates.TemplateResponse(
+                request,
+                "_partials/request_changes.html",
+                context={
+                    "changes": rows,
+                    "is_staff": True,
+                    "rows_id": "staff-request-rows",
+                    **_poll_context(status_filter, category_filter, search, history, changes.cursor),
+                },
+                headers={"X-Change-Cursor": str(changes.cursor), "HX-Reswap": "none"},
+            )
+    cursor = await current_cursor(session)
+    requests_list, next_cursor = await _filtered_requests(
+        session, status_filter, category_filter, search, history=history
+    )
     return templates.TemplateResponse(
         request,
         "_partials/staff_requests_table.html",
-        context={"requests": requests_list, "is_staff": True},
+        context=_table_context(requests_list, next_cursor, status_filter, category_filter, search, history, cursor),
+        headers={"X-Change-Cursor": str(cursor)},
+    )
+
+
+async def _changed_rows(
+    session: AsyncSession,
+    changes: ChangeSet,
+    status_filter: str | None,
+    category_filter: str | None,
+    search: str | None,
+    history: bool,
+) -> RowChanges:
+    # Catch a filtered table up from the change set. Category and search matches never change,
+    # so one query finds the changed requests they select; row_op then checks the status filter
+    # against the status before (what the table shows) and after. Requests that start matching
+    # go on top. Archived requests are dropped unless the table includes history. A history
+    # table was searched with ILIKE (_filtered_history), so its changes are matched the same way.
+    ids = [delta.request_id for delta in changes.deltas.values() if not delta.archived]
+    current = {}
+    if ids:
+        statement = filtered_statement(
+            select(ServiceRequest).options(selectinload(ServiceRequest.guest)),
+            None if history else search_subquery(session, search),
+            None,
+            category_filter,
+            search,
+        ).where(ServiceRequest.id.in_(ids))
+        current = {sr.id: sr for sr in (await session.exec(statement)).all()}
+
+    rows = RowChanges()
+    for delta in changes.deltas.values():
+        if delta.archived:
+            if not history:
+                rows.removed.append(delta.request_id)
+            continue
+        sr = current.get(delta.request_id)
+        op = row_op(delta, sr.status, status_filter) if sr is not None else None
+        if op == "update":
+            rows.updated.append(sr)
+        elif op == "insert":
+            rows.inserted.insert(0, sr)
+        elif op == "remove":
+            rows.removed.append(sr.id)
+    return rows
+
+
+@router.get("/requests/more", response_class=HTMLResponse)
+async def staff_more(
+    request: Request,
+    staff: StaffUser = Depends(require_staff),
+    session: AsyncSession = Depends(get_session),
+    status_filter: str | None = None,
+    category_filter: str | None = None,
+    search: str | None = None,
+    cursor: str | None = None,
+    history: bool = False,
+):
+    # Next page of rows for infinite scroll; replaces the "load more" row it was fetched from.
+    requests_list, next_cursor = await _filtered_requests(
+        session, status_filter, category_filter, search, cursor, history=history
+    )
+    return templates.TemplateResponse(
+        request,
+        "_partials/staff_request_page.html",
+        context=_table_context(requests_list, next_cursor, status_filter, category_filter, search, history),
+    )
+
+
+@router.get("/requests/count", response_class=HTMLResponse)
+async def staff_count(
+    request: Request,
+    staff: StaffUser = Depends(require_staff),
+    session: AsyncSession = Depends(get_session),
+    status_filter: str | None = None,
+    category_filter: str | None = None,
+    search: str | None = None,
+    history: bool = False,
+):
+    # Total for the active filters, loaded lazily so the table never waits on a full COUNT.
+    total = await _count_requests(session, status_filter, category_filter, search, history)
+    return templates.TemplateResponse(request, "_partials/request_count.html", context={"total": total})
+
+
+@router.get("/requests/summary", response_class=HTMLResponse)
+async def staff_summary(
+    request: Request,
+    staff: StaffUser = Depends(require_staff),
+    session: AsyncSession = Depends(get_session),
+):
+    # Live queue totals per status (and high priority), read from the request counters.
+    summary = await queue_summary(session)
+    return templates.TemplateResponse(request, "_partials/request_summary.html", context={"summary": summary})
+
+
+@router.post("/requests/bulk-status", response_class=HTMLResponse)
+async def bulk_update_status(
+    request: Request,
+    status: str = Form(...),
+    request_ids: list[int] = Form([]),
+    staff: StaffUser = Depends(require_staff),
+    session: AsyncSession = Depends(get_session),
+):
+    # Move every selected request to status in one transaction: one conditional UPDATE ...
+    # RETURNING for all ids (only rows in the status that precedes the target match, as in
+    # update_status), then the activity rows and counter deltas as batched inserts. Rows that
+    # did not match are reported per id; the dashboard table reloads on the HX-Trigger event.
+    ids = list(dict.fromkeys(request_ids))
+    if not ids or len(ids) > BULK_MAX_REQUESTS:
+        error = "Select at least one request." if not ids else f"Select at most {BULK_MAX_REQUESTS} requests."
+        return templates.TemplateResponse(
+            request, "_partials/bulk_status_results.html", context={"status": status, "results": [], "error": error}
+        )
+
+    old_status = PREVIOUS_STATUS.get(status)
+    now = datetime.now(UTC)
+    moved: list[ServiceRequest] = []
+    if old_status is not None:
+        moved = list(
+            (
+                await session.exec(
+                    update(ServiceRequest)
+                    .where(ServiceRequest.id.in_(ids), ServiceRequest.status == old_status)
+                    .values(status=RequestStatus(status), version=ServiceRequest.version + 1, updated_at=now)
+                    .returning(ServiceRequest)
+                )
+            ).scalars()
+        )
+    if moved:
+        await session.exec(
+            insert(RequestActivity),
+            params=[
+                {
+                    "request_id": sr.id,
+                    "action": f"Status changed from {old_status} to {status}",
+                    "staff_name": staff.name,
+                    "created_at": now,
+                }
+                for sr in moved
+            ],
+        )
+        await record_transitions(session, moved, RequestStatus(old_status))
+        await record_changes(session, moved, ChangeKind.status, RequestStatus(old_status))
+        await session.commit()
+
+    results = {sr.id: ("updated", sr.status.value) for sr in moved}
+    rejected = [request_id for request_id in ids if request_id not in results]
+    if rejected:
+        statement = select(ServiceRequest.id, ServiceRequest.status).where(ServiceRequest.id.in_(rejected))
+        current = dict((await session.exec(statement)).all())
+        for request_id in rejected:
+            if request_id not in current:
+                results[request_id] = ("not_found", None)
+            else:
+                results[request_id] = ("invalid", current[request_id].value)
+
+    for sr in moved:
+        row_cache.invalidate(sr.id)
+        await task_queue.enqueue("publish_row", publish_guest_row, templates, sr, f"request-{sr.id}")
+    if moved:
+        changes = [(RequestDelta(sr.id, old_status=RequestStatus(old_status)), sr) for sr in moved]
+        await task_queue.enqueue("publish_live", publish_changes, templates, changes)
+    return templates.TemplateResponse(
+        request,
+        "_partials/bulk_status_results.html",
+        context={
+            "status": status,
+            "results": [(request_id, *results[request_id]) for request_id in ids],
+            "updated": len(moved),
+        },
+        headers={"HX-Trigger": "requests-updated"} if moved else None,
+    )
+
+
+def _activity_page(
+    activities: list[RequestActivity], request_id: int, archived: bool = False
+) -> tuple[list[RequestActivity], str | None]:
+    # Trim a TIMELINE_PAGE_SIZE + 1 fetch to one page plus the "show older" URL (None on the last).
+    if len(activities) <= TIMELINE_PAGE_SIZE:
+        return activities, None
+    activities = activities[:TIMELINE_PAGE_SIZE]
+    last = activities[-1]
+    params = {"cursor": encode_cursor("a", last.created_at.isoformat(), last.id)}
+    if archived:
+        params["archived"] = "1"
+    return activities, f"/staff/requests/{request_id}/activity?{urlencode(params)}"
+
+
+def _newest_activities(
+    request_id: int,
+    after: tuple[datetime, int] | None = None,
+    model: type[RequestActivity | ArchivedRequestActivity] = RequestActivity,
+) -> Select:
+    # One page (+1 to detect more) of a request's timeline, newest first, keyset on (created_at, id).
+    statement = select(model).where(model.request_id == request_id)
+    if after:
+        statement = statement.where(tuple_(model.created_at, model.id) < after)
+    return statement.order_by(model.created_at.desc(), model.id.desc()).limit(TIMELINE_PAGE_SIZE + 1)
+
+
+async def _detail_rows(
+    session: AsyncSession,
+    request_id: int,
+    model: type[RequestRow],
+    activity_model: type[RequestActivity | ArchivedRequestActivity],
+) -> list[tuple]:
+    # One round trip: the request joined to its guest, outer-joined to the newest page of its
+    # timeline (a LIMITed subquery), so each result row is (request, activity or None).
+    recent = aliased(activity_model, _newest_activities(request_id, model=activity_model).subquery())
+    return list(
+        (
+            await session.exec(
+                select(model, recent)
+                .join(model.guest)
+                .outerjoin(recent, recent.request_id == model.id)
+                .options(contains_eager(model.guest))
+                .where(model.id == request_id)
+                .order_by(recent.created_at.desc(), recent.id.desc())
+            )
+        ).all()
     )
 
 
@@ -88,28 +517,28 @@ async def request_detail(
     request: Request,
     request_id: int,
     staff: StaffUser = Depends(require_staff),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
     error: str | None = None,
 ):
-    sr = session.exec(
-        select(ServiceRequest)
-        .options(selectinload(ServiceRequest.guest))
-        .where(ServiceRequest.id == request_id)
-    ).first()
-    if not sr:
+    # Live request first; requests moved to the archive are still shown, read-only.
+    archived = False
+    rows = await _detail_rows(session, request_id, ServiceRequest, RequestActivity)
+    if not rows:
+        archived = True
+        rows = await _detail_rows(session, request_id, ArchivedServiceRequest, ArchivedRequestActivity)
+    if not rows:
         return RedirectResponse("/staff", status_code=303)
-    activities = session.exec(
-        select(RequestActivity)
-        .where(RequestActivity.request_id == request_id)
-        .order_by(RequestActivity.created_at.asc())
-    ).all()
-    next_statuses = VALID_TRANSITIONS.get(sr.status.value, [])
+    sr = rows[0][0]
+    activities, more_url = _activity_page([a for _sr, a in rows if a is not None], request_id, archived)
+    next_statuses = [] if archived else VALID_TRANSITIONS.get(sr.status.value, [])
     return templates.TemplateResponse(
         request,
         "staff/request_detail.html",
         context={
             "sr": sr,
+            "archived": archived,
             "activities": activities,
+            "more_url": more_url,
             "staff": staff,
             "next_statuses": next_statuses,
             "error": error,
@@ -117,28 +546,54 @@ async def request_detail(
     )
 
 
+@router.get("/requests/{request_id}/activity", response_class=HTMLResponse)
+async def request_activity(
+    request: Request,
+    request_id: int,
+    staff: StaffUser = Depends(require_staff),
+    session: AsyncSession = Depends(get_session),
+    cursor: str | None = None,
+    archived: bool = False,
+):
+    # Older timeline entries for "show older"; replaces the list item it was fetched from.
+    after = decode_cursor(cursor, "a", datetime.fromisoformat)
+    model = ArchivedRequestActivity if archived else RequestActivity
+    activities = list((await session.exec(_newest_activities(request_id, after, model))).all())
+    activities, more_url = _activity_page(activities, request_id, archived)
+    return templates.TemplateResponse(
+        request,
+        "_partials/activity_page.html",
+        context={"activities": activities, "more_url": more_url},
+    )
+
+
 @router.post("/requests/{request_id}/status")
 async def update_status(
     request: Request,
     request_id: int,
     status: str = Form(...),
+    version: int | None = Form(None),
     staff: StaffUser = Depends(require_staff),
-    session: Session = Depends(get_session),
+    session: AsyncSession = Depends(get_session),
 ):
-    sr = session.exec(
-        select(ServiceRequest).where(ServiceRequest.id == request_id)
-    ).first()
-    if not sr:
-        return RedirectResponse("/staff", status_code=303)
-
-    allowed = VALID_TRANSITIONS.get(sr.status.value, [])
-    if status not in allowed:
-        return await request_detail(request, request_id, staff, session, error="Invalid status transition.")
-
-    old_status = sr.status.value
-    sr.status = RequestStatus(status)
-    sr.updated_at = datetime.now(UTC)
-    session.add(sr)
+    # Optimistic concurrency: one conditional UPDATE both checks and applies the transition
+    # (WHERE id = ? AND status = <the status it follows> [AND version = <the version shown>]),
+    # so there is no read-then-write window and two simultaneous clicks cannot both win.
+    # version comes from the detail form; without it only the status is checked.
+    old_status = PREVIOUS_STATUS.get(status)
+    sr = None
+    if old_status is not None:
+        statement = (
+            update(ServiceRequest)
+            .where(ServiceRequest.id == request_id, ServiceRequest.status == old_status)
+            .values(status=RequestStatus(status), version=ServiceRequest.version + 1, updated_at=datetime.now(UTC))
+            .returning(ServiceRequest)
+        )
+        if version is not None:
+            statement = statement.where(ServiceRequest.version == version)
+        sr = (await session.exec(statement)).scalar_one_or_none()
+    if sr is None:
+        return await _rejected_status_update(request, request_id, status, version, staff, session)
 
     activity = RequestActivity(
         request_id=sr.id,
@@ -146,6 +601,40 @@ async def update_status(
         staff_name=staff.name,
     )
     session.add(activity)
-    session.commit()
+    await record_transition(session, sr, RequestStatus(old_status))
+    await record_changes(session, [sr], ChangeKind.status, RequestStatus(old_status))
+    await session.commit()
+    row_cache.invalidate(sr.id)
+    await task_queue.enqueue("publish_row", publish_guest_row, templates, sr, f"request-{sr.id}")
+    delta = RequestDelta(sr.id, old_status=RequestStatus(old_status))
+    await task_queue.enqueue("publish_live", publish_changes, templates, [(delta, sr)])
 
     return RedirectResponse(f"/staff/requests/{request_id}", status_code=303)
+
+
+async def _rejected_status_update(
+    request: Request,
+    request_id: int,
+    status: str,
+    version: int | None,
+    staff: StaffUser,
+    session: AsyncSession,
+):
+    # The conditional UPDATE matched nothing: work out why. Someone else got there first → 409
+    # naming the current status; otherwise the transition was never valid → the detail page
+    # with an error, as before.
+    await session.rollback()
+    current = (
+        await session.exec(select(ServiceRequest.status, ServiceRequest.version).where(ServiceRequest.id == request_id))
+    ).first()
+    if current is None:
+        return RedirectResponse("/staff", status_code=303)
+    current_status, current_version = current
+    if (version is not None and version != current_version) or current_status.value == status:
+        response = await request_detail(
+            request, request_id, staff, session,
+            error=f"This request was already moved to {current_status.value.replace('_', ' ')} by someone else.",
+        )
+        response.status_code = 409
+        return response
+    return await request_detail(request, request_id, staff, session, error="Invalid status transition.")
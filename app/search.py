@@ -0,0 +1,104 @@
+# app/search.py — Full-text search over service requests (SQLite FTS5)
+#
+# servicerequest_fts indexes each request's description, request type and guest name, keyed by
+# rowid = servicerequest.id. Triggers keep it in sync on request insert/update/delete and on
+# guest renames. The DDL hangs off SQLModel.metadata, so create_all/drop_all manage it together
+# with the regular tables; app/migrations.py backfills databases that predate it. Callers fall
+# back to ILIKE on non-SQLite databases or SQLite builds without FTS5 (see fts_enabled).
+import re
+import sqlite3
+
+from sqlalchemy import DDL, column, event, table
+from sqlalchemy.sql import Subquery
+from sqlmodel import SQLModel, select
+
+FTS_TABLE = "servicerequest_fts"
+
+_fts = table(FTS_TABLE, column("rowid"), column("rank"), column(FTS_TABLE))
+
+_GUEST_NAME = "(SELECT g.first_name || ' ' || g.last_name FROM guest g WHERE g.id = new.guest_id)"
+
+FTS_DDL: list[str] = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(description, request_type, guest_name, tokenize = 'unicode61 remove_diacritics 2')",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON servicerequest BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, description, request_type, guest_name)
+        VALUES (new.id, new.description, coalesce(new.request_type, ''), {_GUEST_NAME});
+    END""",
+    # Only text-bearing columns: status changes never touch the index.
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au
+        AFTER UPDATE OF description, request_type, guest_id ON servicerequest BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, description, request_type, guest_name)
+        VALUES (new.id, new.description, coalesce(new.request_type, ''), {_GUEST_NAME});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON servicerequest BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_guest_au
+        AFTER UPDATE OF first_name, last_name ON guest BEGIN
+        UPDATE {FTS_TABLE} SET guest_name = new.first_name || ' ' || new.last_name
+        WHERE rowid IN (SELECT id FROM servicerequest WHERE guest_id = new.id);
+    END""",
+]
+
+# Index rows that predate the FTS table. Run once by app/migrations.py on existing databases.
+FTS_BACKFILL = f"""INSERT INTO {FTS_TABLE}(rowid, description, request_type, guest_name)
+    SELECT sr.id, sr.description, coalesce(sr.request_type, ''), g.first_name || ' ' || g.last_name
+    FROM servicerequest sr JOIN guest g ON g.id = sr.guest_id
+    WHERE sr.id NOT IN (SELECT rowid FROM {FTS_TABLE})"""
+
+
+def _probe_fts5() -> bool:
+    # Some SQLite builds omit FTS5; detect it once so callers can fall back to ILIKE.
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE probe USING fts5(x)")
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+    return True
+
+
+FTS5_AVAILABLE = _probe_fts5()
+
+
+def fts_enabled(dialect_name: str) -> bool:
+    return FTS5_AVAILABLE and dialect_name == "sqlite"
+
+
+def fts_query(term: str) -> str | None:
+    # Turn free text into an FTS5 query: every word must match as a prefix ("emi park" →
+    # "emi"* "park"*). Returns None when the term has no searchable words.
+    words = re.findall(r"\w+", term)
+    if not words:
+        return None
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def match_subquery(query: str) -> Subquery:
+    # (request_id, rank) for every request matching an fts_query() string. Lower rank = better
+    # match (FTS5 bm25).
+    return (
+        select(_fts.c.rowid.label("request_id"), _fts.c.rank.label("rank"))
+        .where(_fts.c[FTS_TABLE].match(query))
+        .subquery("fts")
+    )
+
+
+def _fts5_available(*args, **kwargs) -> bool:
+    return FTS5_AVAILABLE
+
+
+for _statement in FTS_DDL:
+    event.listen(
+        SQLModel.metadata,
+        "after_create",
+        DDL(_statement).execute_if(dialect="sqlite", callable_=_fts5_available),
+    )
+event.listen(
+    SQLModel.metadata,
+    "before_drop",
+    DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"),
+)
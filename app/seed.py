@@ -1,9 +1,14 @@
 # app/seed.py — Seed database with demo data from seed_data/seed.json
+import itertools
 import json
+from collections.abc import Iterable, Iterator
 from pathlib import Path
 
-from sqlmodel import Session, select
+from sqlalchemy import Connection, Engine, insert
+from sqlmodel import Session, SQLModel, select
 
+import app.search  # noqa: F401  (registers the FTS index DDL on SQLModel.metadata)
+from app.counters import rebuild as rebuild_counters
 from app.database import engine
 from app.models import (
     Guest,
@@ -25,22 +30,50 @@ def load_seed_data() -> dict:
         return json.load(f)
 
 
-def seed():
-    # Populate DB with demo data. No-op if guests already exist.
-    from sqlmodel import SQLModel
+def _batched(rows: Iterable[dict], size: int) -> Iterator[list[dict]]:
+    iterator = iter(rows)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
 
-    SQLModel.metadata.create_all(engine)
 
-    with Session(engine) as session:
+def bulk_insert(
+    conn: Connection,
+    model: type[SQLModel],
+    rows: Iterable[dict],
+    batch_size: int = 5000,
+    commit_every: int = 20,
+) -> int:
+    # Insert plain dict rows with executemany in batches of batch_size, committing every
+    # commit_every batches so a large load never holds one huge write transaction.
+    # Rows must already carry every column value (no ORM defaults run). Returns rows inserted.
+    statement = insert(model)
+    total = 0
+    batches = 0
+    for batch in _batched(rows, batch_size):
+        conn.execute(statement, batch)
+        total += len(batch)
+        batches += 1
+        if batches % commit_every == 0:
+            conn.commit()
+    conn.commit()
+    return total
+
+
+def seed(bind: Engine | Connection = engine):
+    # Populate DB with demo data. No-op if guests already exist. bind defaults to the app engine.
+    SQLModel.metadata.create_all(bind)
+
+    with Session(bind) as session:
         if session.exec(select(Guest)).first():
             print("Database already seeded, skipping.")
             return
 
         data = load_seed_data()
 
-        guests: list[Guest] = []
-        for g in data["guests"]:
-            guest = Guest(
+        # Objects are linked through relationships instead of flushed one by one for their ids,
+        # so the single commit below inserts each table in one batched statement.
+        guests = [
+            Guest(
                 first_name=g["first_name"],
                 last_name=g["last_name"],
                 confirmation_code=g["confirmation_code"],
@@ -48,25 +81,24 @@ def seed():
                 status=GuestStatus(g["status"]),
                 room_number=g.get("room_number"),
             )
-            session.add(guest)
-            session.flush()
-            guests.append(guest)
+            for g in data["guests"]
+        ]
+        session.add_all(guests)
 
-        for s in data["staff"]:
-            session.add(
-                StaffUser(
-                    employee_id=s["employee_id"],
-                    first_name=s["first_name"],
-                    last_name=s["last_name"],
-                    role=s["role"],
-                )
+        session.add_all(
+            StaffUser(
+                employee_id=s["employee_id"],
+                first_name=s["first_name"],
+                last_name=s["last_name"],
+                role=s["role"],
             )
+            for s in data["staff"]
+        )
 
         staff_names = [f"{s['first_name']} {s['last_name']}" for s in data["staff"]]
         for req in data["service_requests"]:
-            guest = guests[req["guest_index"]]
             sr = ServiceRequest(
-                guest_id=guest.id,
+                guest=guests[req["guest_index"]],
                 category=RequestCategory(req["category"]),
                 priority=RequestPriority(req["priority"]),
                 request_type=req.get("request_type"),
@@ -74,10 +106,9 @@ def seed():
                 status=RequestStatus(req["status"]),
             )
             session.add(sr)
-            session.flush()
             session.add(
                 RequestActivity(
-                    request_id=sr.id,
+                    request=sr,
                     action="created",
                     note="Request submitted by guest",
                 )
@@ -87,13 +118,15 @@ def seed():
                 staff_name = staff_names[staff_idx] if staff_names else None
                 session.add(
                     RequestActivity(
-                        request_id=sr.id,
+                        request=sr,
                         action=req["status"],
                         note=f"Status updated to {req['status']}",
                         staff_name=staff_name,
                     )
                 )
 
+        session.flush()
+        rebuild_counters(session.connection())
         session.commit()
         print("Seed data loaded successfully.")
 
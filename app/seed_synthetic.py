@@ -0,0 +1,217 @@
+# app/seed_synthetic.py — Deterministic large-hotel dataset for performance work
+#
+# HOW TO USE:
+#   python -m app.seed_synthetic                                  # 50k guests, 1M requests
+#   python -m app.seed_synthetic --guests 5000 --requests 100000 --reset
+#   make seed-large
+#
+# The same --seed and --anchor (default DEFAULT_ANCHOR, a fixed date) always produce the same
+# rows, so every performance change can be measured against the same database. Rows are appended after any existing data (use
+# --reset for a clean database) and go through app.seed.bulk_insert: executemany batches with
+# periodic commits, never one ORM flush per row.
+#
+# Logins: guests use confirmation code GM-S-<id> plus their generated last name, staff use
+# EMP-S-<id> (see synthetic_guest_code / synthetic_staff_id).
+import argparse
+import random
+import time
+from collections.abc import Iterator
+from datetime import UTC, datetime, timedelta
+
+from sqlalchemy import Connection, func, select
+from sqlmodel import SQLModel
+
+from app.counters import rebuild as rebuild_counters
+from app.database import engine
+from app.models import Guest, RequestActivity, ServiceRequest, StaffUser
+from app.routes.guest import CATEGORY_OPTIONS
+from app.seed import _batched, bulk_insert
+
+FIRST_NAMES = [
+    "Emily", "David", "Lisa", "James", "Maria", "Ahmed", "Sofia", "Kenji", "Olivia", "Lucas",
+    "Amara", "Noah", "Priya", "Mateo", "Chloe", "Ivan", "Fatima", "Liam", "Mei", "Oscar",
+]
+LAST_NAMES = [
+    "Parker", "Kim", "Chen", "Wilson", "Garcia", "Haddad", "Rossi", "Tanaka", "Brown", "Silva",
+    "Okafor", "Miller", "Sharma", "Lopez", "Martin", "Petrov", "Khan", "Murphy", "Wong", "Berg",
+]
+STAFF_ROLES = ["housekeeping", "concierge", "front_desk", "maintenance", "dining"]
+
+CATEGORY_WEIGHTS = {
+    "housekeeping": 30, "dining": 25, "maintenance": 15, "concierge": 12, "front_desk": 13, "other": 5,
+}
+PRIORITY_WEIGHTS = {"low": 30, "medium": 50, "high": 20}
+TIER_WEIGHTS = {"silver": 60, "gold": 30, "platinum": 10}
+DESCRIPTIONS = {
+    "housekeeping": ["Please bring {n} extra towels", "Room needs cleaning before {h}:00", "Out of shampoo"],
+    "dining": ["Breakfast for {n} at {h}:00", "Vegetarian dinner for {n}", "Champagne and {n} glasses"],
+    "maintenance": ["AC not cooling properly", "Shower drain is slow", "Bedside lamp flickers"],
+    "concierge": ["Taxi to the airport at {h}:00", "{n} tickets for tonight's show", "Dinner recommendation"],
+    "front_desk": ["Checkout at {h}:00 please", "Move to a quieter room", "Question about my invoice"],
+    "other": ["Please call me about my stay", "Lost item in the lobby", "Birthday surprise for {n}"],
+}
+# Step order a request moves through (mirrors VALID_TRANSITIONS)
+STEPS = ["new", "assigned", "in_progress", "completed"]
+
+DEFAULT_GUESTS = 50_000
+DEFAULT_REQUESTS = 1_000_000
+DEFAULT_STAFF = 60
+HISTORY_DAYS = 180
+DEFAULT_ANCHOR = datetime(2026, 1, 1, tzinfo=UTC)  # the history ends here unless --anchor says otherwise
+
+
+def synthetic_guest_code(guest_id: int) -> str:
+    return f"GM-S-{guest_id:07d}"
+
+
+def synthetic_staff_id(staff_id: int) -> str:
+    return f"EMP-S-{staff_id:05d}"
+
+
+def _pick(rng: random.Random, weights: dict[str, int]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def _status_for_age(rng: random.Random, age: timedelta) -> str:
+    # Old requests are almost all completed; the last two days hold the live queue.
+    if age > timedelta(days=2):
+        return "completed" if rng.random() < 0.97 else rng.choice(STEPS[:3])
+    return rng.choices(STEPS, weights=[30, 25, 25, 20])[0]
+
+
+def _guest_rows(rng: random.Random, first_id: int, count: int, anchor: datetime) -> Iterator[dict]:
+    for guest_id in range(first_id, first_id + count):
+        checked_in = rng.random() < 0.8
+        yield {
+            "id": guest_id,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "confirmation_code": synthetic_guest_code(guest_id),
+            "tier": _pick(rng, TIER_WEIGHTS),
+            "status": "checked_in" if checked_in else "pre_arrival",
+            "room_number": f"{rng.randint(2, 30)}-{rng.randint(1, 40):03d}" if checked_in else None,
+            "created_at": anchor - timedelta(days=rng.uniform(0, HISTORY_DAYS)),
+        }
+
+
+def _staff_rows(rng: random.Random, first_id: int, count: int) -> Iterator[dict]:
+    for staff_id in range(first_id, first_id + count):
+        yield {
+            "id": staff_id,
+            "employee_id": synthetic_staff_id(staff_id),
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "role": rng.choice(STAFF_ROLES),
+        }
+
+
+def _request_rows(
+    rng: random.Random,
+    first_id: int,
+    count: int,
+    guest_ids: range,
+    staff_names: list[str],
+    anchor: datetime,
+) -> Iterator[tuple[dict, list[dict]]]:
+    # Yields (service request row, its activity rows), oldest request first.
+    offsets = sorted(rng.uniform(0, HISTORY_DAYS * 86400) for _ in range(count))
+    for request_id, offset in zip(range(first_id, first_id + count), reversed(offsets)):
+        created_at = anchor - timedelta(seconds=offset)
+        category = _pick(rng, CATEGORY_WEIGHTS)
+        status = _status_for_age(rng, anchor - created_at)
+        description = rng.choice(DESCRIPTIONS[category]).format(n=rng.randint(2, 6), h=rng.randint(7, 22))
+
+        activities = [{
+            "request_id": request_id, "action": "created", "staff_name": None,
+            "note": "Request submitted by guest", "created_at": created_at,
+        }]
+        changed_at = created_at
+        for old, new in zip(STEPS, STEPS[1:STEPS.index(status) + 1]):
+            changed_at = min(changed_at + timedelta(minutes=rng.randint(2, 90)), anchor)
+            activities.append({
+                "request_id": request_id, "action": f"Status changed from {old} to {new}",
+                "staff_name": rng.choice(staff_names), "note": None, "created_at": changed_at,
+            })
+
+        request = {
+            "id": request_id,
+            "guest_id": rng.choice(guest_ids),
+            "category": category,
+            "priority": _pick(rng, PRIORITY_WEIGHTS),
+            "request_type": rng.choice(CATEGORY_OPTIONS[category]),
+            "description": description,
+            "status": status,
+            "created_at": created_at,
+            "updated_at": changed_at,
+        }
+        yield request, activities
+
+
+def _next_id(conn: Connection, model: type[SQLModel]) -> int:
+    return (conn.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+def generate(
+    conn: Connection,
+    guests: int = DEFAULT_GUESTS,
+    requests: int = DEFAULT_REQUESTS,
+    staff: int = DEFAULT_STAFF,
+    seed: int = 2026,
+    anchor: datetime = DEFAULT_ANCHOR,
+    batch_size: int = 5000,
+) -> dict[str, int]:
+    # Append a synthetic dataset to the database behind conn. Returns rows inserted per table.
+    rng = random.Random(seed)
+    if anchor.tzinfo is None:
+        anchor = anchor.replace(tzinfo=UTC)  # timestamps are stored as UTC
+
+    first_guest = _next_id(conn, Guest)
+    inserted = {"guests": bulk_insert(conn, Guest, _guest_rows(rng, first_guest, guests, anchor), batch_size)}
+
+    first_staff = _next_id(conn, StaffUser)
+    staff_rows = list(_staff_rows(rng, first_staff, staff))
+    inserted["staff"] = bulk_insert(conn, StaffUser, staff_rows, batch_size)
+    staff_names = [f"{s['first_name']} {s['last_name']}" for s in staff_rows]
+
+    pairs = _request_rows(
+        rng, _next_id(conn, ServiceRequest), requests,
+        range(first_guest, first_guest + guests), staff_names, anchor,
+    )
+    inserted["requests"] = inserted["activities"] = 0
+    for chunk in _batched(pairs, batch_size):
+        inserted["requests"] += bulk_insert(conn, ServiceRequest, [req for req, _ in chunk], batch_size)
+        inserted["activities"] += bulk_insert(
+            conn, RequestActivity, [a for _, acts in chunk for a in acts], batch_size
+        )
+    rebuild_counters(conn)
+    conn.commit()
+    return inserted
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Generate a large deterministic hotel dataset")
+    parser.add_argument("--guests", type=int, default=DEFAULT_GUESTS)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument("--staff", type=int, default=DEFAULT_STAFF)
+    parser.add_argument("--seed", type=int, default=2026, help="random seed (same seed → same data)")
+    parser.add_argument("--anchor", type=datetime.fromisoformat, default=DEFAULT_ANCHOR,
+                        help=f"ISO date the history ends at (default: {DEFAULT_ANCHOR.date()})")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--reset", action="store_true", help="drop and recreate all tables first")
+    args = parser.parse_args()
+
+    engine.echo = False  # echoing millions of bound parameters would dominate the load time
+    if args.reset:
+        SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        inserted = generate(
+            conn, args.guests, args.requests, args.staff, args.seed, args.anchor, args.batch_size
+        )
+    elapsed = time.perf_counter() - started
+    print(", ".join(f"{n:,} {table}" for table, n in inserted.items()) + f" in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
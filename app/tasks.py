@@ -0,0 +1,145 @@
+# app/tasks.py — Bounded in-process queue for post-commit side effects
+#
+# Work that has to happen after a request's transaction commits, but that the response does not
+# need to wait for (rendering and publishing row updates to SSE subscribers, later notifications
+# or triage), is enqueued here instead of running before the redirect. A fixed pool of worker
+# tasks, started and stopped by the lifespan in app/main.py, runs jobs from a bounded
+# asyncio.Queue:
+#   - a job that raises is retried up to TASK_MAX_ATTEMPTS times, waiting
+#     TASK_RETRY_BACKOFF_SECONDS (doubled after each failure) in between, then logged and dropped
+#   - when the queue is full, or not running (CLIs, scripts, tests without a lifespan), the job
+#     runs inline in the caller: side effects slow down under load but are never lost
+#   - shutdown stops accepting jobs, lets the workers drain the queue for up to
+#     TASK_DRAIN_TIMEOUT_SECONDS, then cancels them
+# Writes that must be atomic with the request (activity rows, counters) stay in its transaction.
+# Queue depth, queue wait, run time and outcomes per job are exported on /metrics.
+import asyncio
+import inspect
+import logging
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from app.config import settings
+from app.metrics import Counter, Gauge, Histogram, register
+
+logger = logging.getLogger(__name__)
+
+TASK_QUEUE_DEPTH = register(Gauge("gm_task_queue_depth", "Post-commit jobs waiting for a worker."))
+TASK_WAIT_SECONDS = register(Histogram("gm_task_wait_seconds", "Time a job waited in the queue, by job."))
+TASK_SECONDS = register(Histogram("gm_task_duration_seconds", "Run time of each job attempt, by job."))
+TASK_RESULTS = register(
+    Counter("gm_tasks_total", "Jobs by job and result (ok, retried, failed; inline = run by the caller).")
+)
+
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[..., Any]
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class TaskQueue:
+    def __init__(
+        self,
+        workers: int,
+        max_size: int,
+        max_attempts: int = 3,
+        backoff_seconds: float = 0.5,
+        drain_timeout: float = 10.0,
+    ) -> None:
+        self.workers = workers
+        self.max_size = max_size
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.drain_timeout = drain_timeout
+        self._queue: asyncio.Queue[Job] | None = None
+        self._workers: list[asyncio.Task] = []
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def start(self) -> None:
+        # Bind the queue and workers to the running event loop.
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        self._workers = [
+            asyncio.create_task(self._work(self._queue), name=f"task-worker-{i}") for i in range(self.workers)
+        ]
+
+    async def stop(self) -> None:
+        # Take no new jobs (they run inline from now on), drain, then cancel the workers.
+        queue, self._queue = self._queue, None
+        if queue is None:
+            return
+        try:
+            await asyncio.wait_for(queue.join(), self.drain_timeout)
+        except TimeoutError:
+            logger.warning("Task queue drain timed out; %d jobs dropped", queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        TASK_QUEUE_DEPTH.set(0)
+
+    async def enqueue(self, name: str, func: Callable[..., Any], *args: Any, **kwargs: Any) -> None:
+        # Schedule func(*args, **kwargs) (sync or async). Call after the commit it depends on.
+        job = Job(name, func, args, kwargs)
+        if self._queue is not None and self.workers > 0:
+            try:
+                self._queue.put_nowait(job)
+            except asyncio.QueueFull:
+                pass
+            else:
+                TASK_QUEUE_DEPTH.set(self._queue.qsize())
+                return
+        TASK_RESULTS.inc(job=name, result="inline")
+        await self._run(job)
+
+    async def join(self) -> None:
+        # Wait until every queued job has finished (tests, benchmarks).
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def _work(self, queue: asyncio.Queue[Job]) -> None:
+        while True:
+            job = await queue.get()
+            TASK_QUEUE_DEPTH.set(queue.qsize())
+            TASK_WAIT_SECONDS.observe(time.monotonic() - job.enqueued_at, job=job.name)
+            try:
+                await self._run(job)
+            finally:
+                queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            try:
+                result = job.func(*job.args, **job.kwargs)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception:
+                TASK_SECONDS.observe(time.perf_counter() - started, job=job.name)
+                if attempt == self.max_attempts:
+                    TASK_RESULTS.inc(job=job.name, result="failed")
+                    logger.exception("Job %s failed after %d attempts", job.name, attempt)
+                    return
+                TASK_RESULTS.inc(job=job.name, result="retried")
+                await asyncio.sleep(self.backoff_seconds * 2 ** (attempt - 1))
+            else:
+                TASK_SECONDS.observe(time.perf_counter() - started, job=job.name)
+                TASK_RESULTS.inc(job=job.name, result="ok")
+                return
+
+
+task_queue = TaskQueue(
+    workers=settings.task_workers,
+    max_size=settings.task_queue_size,
+    max_attempts=settings.task_max_attempts,
+    backoff_seconds=settings.task_retry_backoff_seconds,
+    drain_timeout=settings.task_drain_timeout_seconds,
+)
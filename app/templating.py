@@ -0,0 +1,49 @@
+# app/templating.py — The one Jinja2 environment shared by every route module
+#
+# All routes render through this single `templates` object: one template cache and one parse
+# per template per process. Outside debug (DEBUG=false) auto_reload is off, so a render never
+# stats the template files to check for edits. Compiled templates are also written to a
+# FileSystemBytecodeCache, so a new worker process loads bytecode instead of parsing and
+# compiling, and precompile_templates() runs at startup so the first request renders from a
+# warm cache. Benchmark: python -m benchmarks.bench_templates
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, select_autoescape
+from starlette.templating import Jinja2Templates
+
+from app.config import settings
+from app.fragments import install_row_cache
+from app.metrics import instrument_templates
+
+TEMPLATES_DIR = Path(__file__).resolve().parent.parent / "templates"
+
+
+def build_templates(
+    auto_reload: bool = settings.debug,
+    bytecode_cache_dir: str | None = settings.template_bytecode_cache_dir,
+) -> Jinja2Templates:
+    # bytecode_cache_dir None uses Jinja's default (a per-user directory under the system temp dir).
+    if bytecode_cache_dir:
+        Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATES_DIR),
+        autoescape=select_autoescape(),
+        auto_reload=auto_reload,
+        bytecode_cache=FileSystemBytecodeCache(bytecode_cache_dir),
+        cache_size=-1,  # never evict a compiled template; the template set is small and fixed
+    )
+    shared = Jinja2Templates(env=env)
+    instrument_templates(shared)
+    install_row_cache(shared)
+    return shared
+
+
+def precompile_templates(target: Jinja2Templates) -> int:
+    # Load (parse + compile, or read bytecode for) every template now. Returns how many.
+    names = target.env.list_templates(extensions=["html"])
+    for name in names:
+        target.env.get_template(name)
+    return len(names)
+
+
+templates = build_templates()
@@ -0,0 +1,4 @@
+# benchmarks/ — Performance benchmarks for The Grand Meridian Guest Services
+#
+# Run from the project root, e.g.: python -m benchmarks.bench_async_db
+# Each benchmark uses its own bench_*.db SQLite file so it never touches dev or test data.
@@ -0,0 +1,113 @@
+# benchmarks/bench_api.py — Per-request cost of the JSON API vs the HTML routes
+#
+# HOW TO USE:
+#   python -m benchmarks.bench_api [--guests 2000] [--requests 20000] [--iterations 300]
+#
+# Builds a synthetic database (app.seed_synthetic), logs in as staff and times sequential
+# requests against the in-process ASGI app, best mean of 3 batches per route:
+#   html page / api page     — 50 newest requests: /staff/requests/filter vs /api/v1/requests
+#   api page (4 fields)      — the same page with ?fields=id,status,room_number,updated_at
+#   api batch (50 ids)       — ?ids= of 50 scattered requests (one IN query)
+#   html detail / api detail — one request: /staff/requests/{id} vs /api/v1/requests/{id}
+# Then, without HTTP, the encoding cost of one 50-row page: column projection + orjson (what
+# the API does) vs loading ORM objects and encoding them with jsonable_encoder + json.dumps.
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_guest_services.db")
+
+import httpx  # noqa: E402
+import orjson  # noqa: E402
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from sqlalchemy.orm import selectinload  # noqa: E402
+from sqlmodel import SQLModel, select  # noqa: E402
+
+from app.database import async_engine, async_session_factory, engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.migrations import run_migrations  # noqa: E402
+from app.models import ServiceRequest  # noqa: E402
+from app.routes.api import REQUEST_FIELDS, _request_statement  # noqa: E402
+from app.seed import seed  # noqa: E402
+from app.seed_synthetic import generate  # noqa: E402
+
+
+async def _per_request_ms(client: httpx.AsyncClient, url: str, iterations: int) -> float:
+    (await client.get(url)).raise_for_status()  # warm up (templates, statement cache)
+    batches = []
+    for _ in range(3):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            resp = await client.get(url)
+        resp.raise_for_status()
+        batches.append((time.perf_counter() - started) / iterations)
+    return min(batches) * 1000
+
+
+async def _encode_ms(iterations: int) -> tuple[float, float]:
+    # One 50-row page, query + encode: projection rows → orjson vs ORM objects → jsonable_encoder.
+    names = list(REQUEST_FIELDS)
+    projection = _request_statement(names, None).order_by(ServiceRequest.created_at.desc()).limit(50)
+    orm = (
+        select(ServiceRequest).options(selectinload(ServiceRequest.guest))
+        .order_by(ServiceRequest.created_at.desc()).limit(50)
+    )
+    timings = []
+    async with async_session_factory() as session:
+        for encode in ("projection", "orm"):
+            started = time.perf_counter()
+            for _ in range(iterations):
+                if encode == "projection":
+                    rows = (await session.exec(projection)).mappings().all()
+                    orjson.dumps([{name: row[name] for name in names} for row in rows], option=orjson.OPT_NAIVE_UTC)
+                else:
+                    requests = (await session.exec(orm)).all()
+                    json.dumps(jsonable_encoder([{**sr.model_dump(), "guest": sr.guest.model_dump()} for sr in requests]))
+                session.expunge_all()
+            timings.append((time.perf_counter() - started) / iterations * 1000)
+    return timings[0], timings[1]
+
+
+async def main(guests: int, requests: int, iterations: int) -> None:
+    engine.echo = async_engine.echo = False  # logging every statement would dominate the timings
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    run_migrations(engine)
+    seed()
+    with engine.connect() as conn:
+        generate(conn, guests=guests, requests=requests)
+    ids = random.Random(7).sample(range(1, requests + 1), 50)
+    one = ids[0]
+
+    routes = {
+        "html page": "/staff/requests/filter",
+        "api page": "/api/v1/requests?limit=50",
+        "api page (4 fields)": "/api/v1/requests?limit=50&fields=id,status,room_number,updated_at",
+        "api batch (50 ids)": f"/api/v1/requests?ids={','.join(map(str, ids))}",
+        "html detail": f"/staff/requests/{one}",
+        "api detail": f"/api/v1/requests/{one}",
+    }
+    print(f"{requests:,} requests, {guests:,} guests; best mean of 3 x {iterations} sequential requests")
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as staff:
+        await staff.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+        for name, url in routes.items():
+            ms = await _per_request_ms(staff, url, iterations)
+            size = len((await staff.get(url)).content)
+            print(f"{name:>20}  {ms:7.2f} ms/request  {size / 1024:7.1f} KiB")
+
+    projection_ms, orm_ms = await _encode_ms(iterations)
+    print(f"50-row page, query + encode: projection + orjson {projection_ms:6.2f} ms  |  "
+          f"ORM + jsonable_encoder {orm_ms:6.2f} ms  ({orm_ms / projection_ms:4.1f}x)")
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="JSON API vs HTML route per-request cost")
+    parser.add_argument("--guests", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--iterations", type=int, default=300)
+    args = parser.parse_args()
+    asyncio.run(main(args.guests, args.requests, args.iterations))
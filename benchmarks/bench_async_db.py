@@ -0,0 +1,111 @@
+# benchmarks/bench_async_db.py — Poll/dashboard latency while one slow query is in flight
+#
+# HOW TO USE:
+#   python -m benchmarks.bench_async_db [--slow-ms 500] [--concurrency 10]
+#
+# Starts one deliberately slow SQL query, then fires N concurrent guest polls and N staff
+# dashboard loads against the in-process ASGI app. Runs two modes:
+#   blocking — slow query runs through the sync engine on the event loop (the old request path)
+#   async    — slow query runs through the async session (the current request path)
+# In blocking mode every concurrent request waits out the slow query; in async mode their
+# latency stays close to the no-contention baseline.
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./bench_guest_services.db")
+
+import httpx  # noqa: E402
+from fastapi import Depends  # noqa: E402
+from sqlalchemy import event, text  # noqa: E402
+from sqlmodel import Session, SQLModel  # noqa: E402
+from sqlmodel.ext.asyncio.session import AsyncSession  # noqa: E402
+
+from app.database import async_engine, engine, get_session  # noqa: E402
+from app.main import app  # noqa: E402
+from app.seed import seed  # noqa: E402
+
+
+def _sleep(seconds: float) -> int:
+    time.sleep(seconds)
+    return 0
+
+
+def _register_sleep(dbapi_connection, connection_record) -> None:
+    dbapi_connection.create_function("gm_sleep", 1, _sleep)
+
+
+event.listen(engine, "connect", _register_sleep)
+event.listen(async_engine.sync_engine, "connect", _register_sleep)
+
+
+@app.get("/__bench/slow-blocking", include_in_schema=False)
+async def _slow_blocking(seconds: float):
+    with Session(engine) as session:
+        session.exec(text("SELECT gm_sleep(:s)").bindparams(s=seconds))
+    return {"ok": True}
+
+
+@app.get("/__bench/slow-async", include_in_schema=False)
+async def _slow_async(seconds: float, session: AsyncSession = Depends(get_session)):
+    await session.exec(text("SELECT gm_sleep(:s)").bindparams(s=seconds))
+    return {"ok": True}
+
+
+async def _timed_get(client: httpx.AsyncClient, url: str, started: float) -> float:
+    # Latency is measured from when the burst was issued, so time spent queued behind a
+    # blocked event loop counts against the request.
+    resp = await client.get(url)
+    resp.raise_for_status()
+    return (time.perf_counter() - started) * 1000
+
+
+async def _run_mode(mode: str, slow_ms: int, concurrency: int) -> dict:
+    transport = httpx.ASGITransport(app=app)
+    async with (
+        httpx.AsyncClient(transport=transport, base_url="http://bench") as guest,
+        httpx.AsyncClient(transport=transport, base_url="http://bench") as staff,
+    ):
+        await guest.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+        await staff.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+
+        # The slow request is scheduled first, so it reaches the database before the burst.
+        slow = asyncio.create_task(guest.get(f"/__bench/slow-{mode}", params={"seconds": slow_ms / 1000}))
+        started = time.perf_counter()
+        polls = [_timed_get(guest, "/guest/requests/poll", started) for _ in range(concurrency)]
+        dashboards = [_timed_get(staff, "/staff", started) for _ in range(concurrency)]
+        results = await asyncio.gather(*polls, *dashboards)
+        await slow
+
+    poll_ms, dash_ms = results[:concurrency], results[concurrency:]
+    return {
+        "mode": mode,
+        "poll_p50_ms": statistics.median(poll_ms),
+        "poll_max_ms": max(poll_ms),
+        "dashboard_p50_ms": statistics.median(dash_ms),
+        "dashboard_max_ms": max(dash_ms),
+    }
+
+
+async def main(slow_ms: int, concurrency: int) -> None:
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    seed()
+    print(f"slow query: {slow_ms} ms, concurrency: {concurrency} polls + {concurrency} dashboards")
+    for mode in ("blocking", "async"):
+        r = await _run_mode(mode, slow_ms, concurrency)
+        print(
+            f"{r['mode']:>9}  poll p50 {r['poll_p50_ms']:7.1f} ms  max {r['poll_max_ms']:7.1f} ms  |  "
+            f"dashboard p50 {r['dashboard_p50_ms']:7.1f} ms  max {r['dashboard_max_ms']:7.1f} ms"
+        )
+    await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Poll/dashboard latency behind one slow query")
+    parser.add_argument("--slow-ms", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.slow_ms, args.concurrency))
@@ -0,0 +1,119 @@
+# benchmarks/bench_sqlite_profile.py — Mixed read/write throughput per DB_PROFILE
+#
+# HOW TO USE:
+#   python -m benchmarks.bench_sqlite_profile [--readers 8] [--writers 2] [--seconds 5] [--requests 20000]
+#
+# Builds one SQLite file per profile with the same synthetic data, then runs reader threads
+# (dashboard page query) and writer threads (status update + activity row, one transaction
+# each) concurrently for a fixed time. Reports reads/s, writes/s and lock errors.
+#   development — SQLite defaults (rollback journal): the writer blocks readers
+#   production  — Settings.sqlite_pragmas() (WAL, synchronous=NORMAL, cache, mmap, busy_timeout)
+import argparse
+import random
+import threading
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+from sqlalchemy import insert, text
+from sqlalchemy.exc import OperationalError
+from sqlmodel import SQLModel, create_engine
+
+from app.config import Settings
+from app.database import apply_sqlite_pragmas
+from app.models import Guest, RequestActivity, ServiceRequest
+
+DASHBOARD_QUERY = text(
+    "SELECT sr.*, g.first_name, g.last_name FROM servicerequest sr JOIN guest g ON g.id = sr.guest_id "
+    "WHERE sr.status = :status ORDER BY sr.created_at DESC, sr.id DESC LIMIT 50"
+)
+STATUSES = ["new", "assigned", "in_progress", "completed"]
+
+
+def _build_db(path: Path, profile: str, n_requests: int):
+    path.unlink(missing_ok=True)
+    eng = create_engine(f"sqlite:///{path}", connect_args={"check_same_thread": False})
+    apply_sqlite_pragmas(eng, Settings(db_profile=profile).sqlite_pragmas())
+    SQLModel.metadata.create_all(eng)
+    now = datetime.now(UTC)
+    rng = random.Random(7)
+    with eng.begin() as conn:
+        conn.execute(
+            insert(Guest),
+            [{"id": i, "first_name": f"Guest{i}", "last_name": "Bench", "confirmation_code": f"B-{i}",
+              "tier": "silver", "status": "checked_in", "created_at": now} for i in range(1, 501)],
+        )
+        conn.execute(
+            insert(ServiceRequest),
+            [{"guest_id": rng.randint(1, 500), "category": "housekeeping", "priority": "medium",
+              "description": "bench", "status": rng.choice(STATUSES), "created_at": now, "updated_at": now}
+             for _ in range(n_requests)],
+        )
+    return eng
+
+
+def _run(eng, readers: int, writers: int, seconds: float, n_requests: int) -> dict:
+    stop = time.monotonic() + seconds
+    counts = {"reads": 0, "writes": 0, "lock_errors": 0}
+    lock = threading.Lock()
+
+    def reader() -> None:
+        rng = random.Random()
+        while time.monotonic() < stop:
+            try:
+                with eng.connect() as conn:
+                    conn.execute(DASHBOARD_QUERY, {"status": rng.choice(STATUSES)}).all()
+                key = "reads"
+            except OperationalError:
+                key = "lock_errors"
+            with lock:
+                counts[key] += 1
+
+    def writer() -> None:
+        rng = random.Random()
+        while time.monotonic() < stop:
+            request_id = rng.randint(1, n_requests)
+            try:
+                with eng.begin() as conn:
+                    conn.execute(
+                        text("UPDATE servicerequest SET status = :s, updated_at = :t WHERE id = :id"),
+                        {"s": rng.choice(STATUSES), "t": datetime.now(UTC), "id": request_id},
+                    )
+                    conn.execute(
+                        insert(RequestActivity),
+                        {"request_id": request_id, "action": "bench", "created_at": datetime.now(UTC)},
+                    )
+                key = "writes"
+            except OperationalError:
+                key = "lock_errors"
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return {k: v / seconds if k != "lock_errors" else v for k, v in counts.items()}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Mixed read/write throughput per DB_PROFILE")
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{args.readers} readers + {args.writers} writers for {args.seconds:.0f}s over {args.requests} requests")
+    for profile in ("development", "production"):
+        path = Path(f"bench_profile_{profile}.db")
+        eng = _build_db(path, profile, args.requests)
+        r = _run(eng, args.readers, args.writers, args.seconds, args.requests)
+        eng.dispose()
+        print(f"{profile:>12}  reads/s {r['reads']:8.0f}  writes/s {r['writes']:7.0f}  lock errors {r['lock_errors']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# benchmarks/bench_templates.py — Template startup, first-render and steady render cost
+#
+# HOW TO USE:
+#   python -m benchmarks.bench_templates [--renders 2000]
+#
+# Each mode runs in a fresh interpreter, like a newly started worker:
+#   per-module  — the old setup: auth/guest/staff each build their own Jinja2Templates
+#                 (auto_reload on, no bytecode cache), compiling templates on first render
+#   shared-cold — app.templating: one environment, auto_reload off, precompiled at startup
+#                 with an empty bytecode cache (first deploy)
+#   shared-warm — the same with the bytecode cache already written (every later worker start)
+# Reports startup (environment + precompile), the first login/guest list/dashboard renders a
+# new worker serves, and the cost of re-rendering an already compiled page (auto_reload stats
+# the template files on every render).
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import UTC, datetime
+from types import SimpleNamespace
+
+MODES = ("per-module", "shared-cold", "shared-warm")
+FIRST_PAGES = ("auth/login.html", "guest/my_requests.html", "staff/dashboard.html")
+
+
+def _rows(n: int) -> list:
+    from app.models import Guest, RequestCategory, RequestPriority, RequestStatus, ServiceRequest
+
+    guest = Guest(id=1, first_name="Emily", last_name="Parker", confirmation_code="B-1", room_number="12-001")
+    now = datetime.now(UTC)
+    return [
+        ServiceRequest(
+            id=i, guest_id=1, guest=guest, category=RequestCategory.dining, priority=RequestPriority.high,
+            description="Breakfast for two", status=RequestStatus.new, created_at=now, updated_at=now,
+        )
+        for i in range(1, n + 1)
+    ]
+
+
+def _contexts() -> dict[str, dict]:
+    rows = _rows(50)
+    request = SimpleNamespace(session={"staff_id": 1})
+    return {
+        "auth/login.html": {"request": request},
+        "guest/my_requests.html": {"request": request, "requests": rows, "is_staff": False},
+        "staff/dashboard.html": {
+            "request": request, "requests": rows, "is_staff": True, "count_url": "/c", "more_url": "/m",
+            "status_filter": "", "category_filter": "", "search": "",
+        },
+    }
+
+
+def _child(mode: str, cache_dir: str, renders: int) -> dict:
+    # Imports are done before timing: only template work is measured.
+    from starlette.templating import Jinja2Templates
+
+    from app.fragments import install_row_cache, row_cache
+    from app.templating import TEMPLATES_DIR, build_templates, precompile_templates
+
+    contexts = _contexts()
+    started = time.perf_counter()
+    if mode == "per-module":
+        envs = {}
+        for page in FIRST_PAGES:  # one environment per route module
+            envs[page] = Jinja2Templates(directory=str(TEMPLATES_DIR))
+            install_row_cache(envs[page])
+    else:
+        shared = build_templates(auto_reload=False, bytecode_cache_dir=cache_dir)
+        precompile_templates(shared)
+        envs = dict.fromkeys(FIRST_PAGES, shared)
+    startup = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for page in FIRST_PAGES:
+        envs[page].get_template(page).render(contexts[page])
+    first = time.perf_counter() - started
+
+    row_cache.clear()
+    row_cache.max_bytes = 0  # measure template work, not fragment cache hits
+    page = "auth/login.html"
+    batches = []
+    for _ in range(5):  # best of 5 batches, to keep scheduler noise out of a µs-scale number
+        started = time.perf_counter()
+        for _ in range(renders):
+            envs[page].get_template(page).render(contexts[page])
+        batches.append((time.perf_counter() - started) / renders)
+    steady = min(batches)
+    return {"startup_ms": startup * 1000, "first_renders_ms": first * 1000, "render_us": steady * 1e6}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Template startup and render cost per environment setup")
+    parser.add_argument("--renders", type=int, default=2000)
+    parser.add_argument("--child", choices=MODES, help=argparse.SUPPRESS)
+    parser.add_argument("--cache-dir", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(_child(args.child, args.cache_dir, args.renders)))
+        return
+
+    print(f"fresh interpreter per mode; steady render = best mean of 5 x {args.renders} login page renders")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for mode in MODES:  # shared-cold writes the bytecode that shared-warm reads
+            out = subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_templates", "--child", mode,
+                 "--cache-dir", cache_dir, "--renders", str(args.renders)],
+                capture_output=True, text=True, check=True,
+            )
+            r = json.loads(out.stdout.strip().splitlines()[-1])
+            print(
+                f"{mode:>12}  startup {r['startup_ms']:6.1f} ms  first renders {r['first_renders_ms']:6.1f} ms  "
+                f"(total {r['startup_ms'] + r['first_renders_ms']:6.1f} ms)  steady render {r['render_us']:6.1f} µs"
+            )
+
+
+if __name__ == "__main__":
+    main()
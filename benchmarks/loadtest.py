@@ -0,0 +1,288 @@
+# benchmarks/loadtest.py — Concurrent guest/staff load test with per-route latency percentiles
+#
+# HOW TO USE:
+#   python -m benchmarks.loadtest                                   # in-process ASGI app
+#   python -m benchmarks.loadtest --guests 200 --staff 10 --seconds 30 --db-requests 200000
+#   python -m benchmarks.loadtest --base-url http://127.0.0.1:8000  # against a local uvicorn
+#   make loadtest
+#
+# Virtual users run concurrently for a fixed time:
+#   guests — poll GET /guest/requests/poll, replaying the last ETag like the browser does
+#   staff  — filter GET /staff/requests/filter (random status/category/search), and with
+#            probability --update-ratio advance an open request via POST /staff/requests/{id}/status
+# Reports throughput and p50/p95/p99 latency per route, and writes them with the scenario and
+# git commit to a JSON file (--output) so two commits can be diffed.
+#
+# In-process mode rebuilds DATABASE_URL (default loadtest_guest_services.db) from the demo seed
+# plus app.seed_synthetic with a fixed seed and anchor, so every run measures the same data;
+# --reuse-db skips the rebuild. With --base-url the server owns the database: start uvicorn with
+# the same DATABASE_URL (prepared with python -m app.seed_synthetic) — logins and open requests
+# are read from it. In-process numbers include the client's own CPU time on the same loop.
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import time
+from collections import defaultdict
+from datetime import UTC, datetime
+from pathlib import Path
+
+os.environ.setdefault("DATABASE_URL", "sqlite:///./loadtest_guest_services.db")
+os.environ.setdefault("DEBUG", "false")  # SQL echo would dominate the measurements
+
+import httpx  # noqa: E402
+from sqlmodel import Session, SQLModel, select  # noqa: E402
+
+from app.database import engine  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Guest, RequestStatus, ServiceRequest, StaffUser, VALID_TRANSITIONS  # noqa: E402
+from app.seed import seed  # noqa: E402
+from app.seed_synthetic import generate  # noqa: E402
+
+POLL = "GET /guest/requests/poll"
+FILTER = "GET /staff/requests/filter"
+UPDATE = "POST /staff/requests/{id}/status"
+EXPECTED_STATUS = {POLL: {200, 304}, FILTER: {200}, UPDATE: {303}}
+
+FILTER_STATUSES = ["", "new", "assigned", "in_progress", "completed"]
+FILTER_CATEGORIES = ["", "housekeeping", "dining", "maintenance", "concierge", "front_desk"]
+FILTER_SEARCHES = ["", "", "", "towel", "park", "taxi", "dinner"]
+ANCHOR = datetime(2026, 1, 1, tzinfo=UTC)
+
+
+class Recorder:
+    # Latencies (ms) and response status counts per route, from the end of the warm-up on.
+    def __init__(self) -> None:
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.statuses: dict[str, dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        self.errors: dict[str, int] = defaultdict(int)
+        self.recording = False
+
+    async def call(self, route: str, request) -> httpx.Response | None:
+        started = time.perf_counter()
+        try:
+            resp = await request
+        except httpx.HTTPError:
+            if self.recording:
+                self.errors[route] += 1
+                self.statuses[route]["error"] += 1
+            return None
+        if self.recording:
+            self.latencies[route].append((time.perf_counter() - started) * 1000)
+            self.statuses[route][str(resp.status_code)] += 1
+            if resp.status_code not in EXPECTED_STATUS[route]:
+                self.errors[route] += 1
+        return resp
+
+
+def _percentile(ordered: list[float], pct: float) -> float:
+    # Nearest-rank percentile of an already sorted list.
+    if not ordered:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def summarize(latencies: list[float], seconds: float) -> dict[str, float]:
+    ordered = sorted(latencies)
+    return {
+        "count": len(ordered),
+        "throughput_rps": round(len(ordered) / seconds, 1),
+        "mean_ms": round(sum(ordered) / len(ordered), 2) if ordered else 0.0,
+        "p50_ms": round(_percentile(ordered, 50), 2),
+        "p95_ms": round(_percentile(ordered, 95), 2),
+        "p99_ms": round(_percentile(ordered, 99), 2),
+        "max_ms": round(ordered[-1], 2) if ordered else 0.0,
+    }
+
+
+def filter_params(rng: random.Random) -> dict[str, str]:
+    # One staff filter form submission (the query keys /staff/requests/filter reads).
+    return {
+        "status_filter": rng.choice(FILTER_STATUSES),
+        "category_filter": rng.choice(FILTER_CATEGORIES),
+        "search": rng.choice(FILTER_SEARCHES),
+    }
+
+
+def _build_database(args: argparse.Namespace) -> None:
+    # Demo seed (so the README logins keep working) plus a deterministic synthetic dataset.
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    seed()
+    with engine.connect() as conn:
+        generate(conn, args.db_guests, args.db_requests, max(args.staff, 10), seed=args.seed, anchor=ANCHOR)
+
+
+def _load_fixtures(guests: int, staff: int) -> tuple[list[dict], list[dict], dict[int, str]]:
+    # Logins for the virtual users and the open requests staff will advance.
+    with Session(engine) as session:
+        guest_logins = [
+            {"confirmation_code": code, "last_name": last}
+            for code, last in session.exec(
+                select(Guest.confirmation_code, Guest.last_name).order_by(Guest.id).limit(guests)
+            )
+        ]
+        staff_logins = [
+            {"employee_id": emp, "last_name": last}
+            for emp, last in session.exec(
+                select(StaffUser.employee_id, StaffUser.last_name).order_by(StaffUser.id).limit(staff)
+            )
+        ]
+        open_requests = dict(
+            session.exec(
+                select(ServiceRequest.id, ServiceRequest.status)
+                .where(ServiceRequest.status != RequestStatus.completed)
+                .order_by(ServiceRequest.id.desc())
+                .limit(10_000)
+            ).all()
+        )
+    if len(guest_logins) < guests or len(staff_logins) < staff:
+        raise SystemExit(
+            f"database has {len(guest_logins)} guests / {len(staff_logins)} staff; "
+            f"need {guests} / {staff} (grow it with --db-guests or app.seed_synthetic)"
+        )
+    return guest_logins, staff_logins, {k: v.value for k, v in open_requests.items()}
+
+
+async def _guest_user(client: httpx.AsyncClient, rec: Recorder, login: dict, stop: float, think: float) -> None:
+    await client.post("/login", data=login)
+    etag = None
+    while time.perf_counter() < stop:
+        headers = {"If-None-Match": etag} if etag else {}
+        resp = await rec.call(POLL, client.get("/guest/requests/poll", headers=headers))
+        if resp is not None and resp.status_code == 200:
+            etag = resp.headers.get("etag", etag)
+        await asyncio.sleep(think)
+
+
+async def _staff_user(
+    client: httpx.AsyncClient,
+    rec: Recorder,
+    login: dict,
+    stop: float,
+    think: float,
+    update_ratio: float,
+    open_requests: dict[int, str],
+    rng: random.Random,
+) -> None:
+    await client.post("/staff/login", data=login)
+    while time.perf_counter() < stop:
+        if open_requests and rng.random() < update_ratio:
+            # Claim a request so two staff users never race on the same transition.
+            request_id, status = open_requests.popitem()
+            new_status = VALID_TRANSITIONS[status][0]
+            resp = await rec.call(
+                UPDATE, client.post(f"/staff/requests/{request_id}/status", data={"status": new_status})
+            )
+            if resp is not None and resp.status_code == 303 and VALID_TRANSITIONS[new_status]:
+                open_requests[request_id] = new_status
+        else:
+            await rec.call(FILTER, client.get("/staff/requests/filter", params=filter_params(rng)))
+        await asyncio.sleep(think)
+
+
+async def run(args: argparse.Namespace) -> dict:
+    guest_logins, staff_logins, open_requests = _load_fixtures(args.guests, args.staff)
+    rec = Recorder()
+    rng = random.Random(args.seed)
+    if args.base_url:
+        base_url, transport = args.base_url, None
+    else:
+        base_url, transport = "http://loadtest", httpx.ASGITransport(app=app)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    clients = [
+        httpx.AsyncClient(base_url=base_url, transport=transport, limits=limits, timeout=30.0)
+        for _ in range(args.guests + args.staff)
+    ]
+    think = args.think_ms / 1000
+    started = time.perf_counter()
+    stop = started + args.warmup + args.seconds
+    users = [
+        _guest_user(client, rec, login, stop, think)
+        for client, login in zip(clients, guest_logins)
+    ] + [
+        _staff_user(client, rec, login, stop, think, args.update_ratio, open_requests, random.Random(rng.random()))
+        for client, login in zip(clients[args.guests:], staff_logins)
+    ]
+
+    async def start_recording() -> None:
+        await asyncio.sleep(args.warmup)
+        rec.recording = True
+
+    try:
+        await asyncio.gather(start_recording(), *users)
+    finally:
+        for client in clients:
+            await client.aclose()
+
+    routes = {
+        route: {
+            **summarize(rec.latencies[route], args.seconds),
+            "errors": rec.errors[route],
+            "statuses": dict(sorted(rec.statuses[route].items())),
+        }
+        for route in (POLL, FILTER, UPDATE)
+    }
+    overall = summarize([ms for lat in rec.latencies.values() for ms in lat], args.seconds)
+    return {"routes": routes, "overall": {**overall, "errors": sum(rec.errors.values())}}
+
+
+def _git_commit() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.base_url:
+        results = await run(args)
+    else:
+        if not args.reuse_db:
+            _build_database(args)
+        async with app.router.lifespan_context(app):
+            results = await run(args)
+
+    report = {
+        "commit": _git_commit(),
+        "started_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "target": args.base_url or "in-process",
+        "database_url": os.environ["DATABASE_URL"],
+        "db_profile": os.environ.get("DB_PROFILE", "development"),
+        "scenario": {
+            k: getattr(args, k)
+            for k in ("guests", "staff", "seconds", "warmup", "think_ms", "update_ratio",
+                      "db_guests", "db_requests", "seed")
+        },
+        **results,
+    }
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+
+    print(f"{args.guests} guests + {args.staff} staff for {args.seconds:.0f}s ({report['target']})")
+    for route, r in {**results["routes"], "overall": results["overall"]}.items():
+        print(
+            f"{route:>34}  {r['throughput_rps']:8.1f} req/s  p50 {r['p50_ms']:7.1f}  "
+            f"p95 {r['p95_ms']:7.1f}  p99 {r['p99_ms']:7.1f} ms  errors {r['errors']}"
+        )
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent guest/staff load test")
+    parser.add_argument("--base-url", default=None, help="target a running server instead of the in-process app")
+    parser.add_argument("--guests", type=int, default=50, help="concurrent polling guests")
+    parser.add_argument("--staff", type=int, default=5, help="concurrent staff users")
+    parser.add_argument("--seconds", type=float, default=10.0, help="measured duration")
+    parser.add_argument("--warmup", type=float, default=2.0, help="unmeasured ramp-up before recording")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between a user's requests")
+    parser.add_argument("--update-ratio", type=float, default=0.2, help="share of staff actions that are status updates")
+    parser.add_argument("--db-guests", type=int, default=2_000, help="synthetic guests (in-process rebuild)")
+    parser.add_argument("--db-requests", type=int, default=50_000, help="synthetic requests (in-process rebuild)")
+    parser.add_argument("--reuse-db", action="store_true", help="skip rebuilding the in-process database")
+    parser.add_argument("--seed", type=int, default=2026)
+    parser.add_argument("--output", default="loadtest_results.json")
+    asyncio.run(main(parser.parse_args()))
@@ -1,4 +1,29 @@
-# tests/conftest.py — Use separate test database
+# tests/conftest.py — Use separate test database; SQL query budget fixture
 import os
+from collections.abc import Callable, Iterator
+from contextlib import AbstractContextManager, contextmanager
+
+import pytest
 
 os.environ["DATABASE_URL"] = "sqlite:///./test_guest_services.db"
+
+from app.querycount import QueryCounter  # noqa: E402  (needs DATABASE_URL above)
+
+
+@pytest.fixture()
+def query_budget() -> Callable[..., AbstractContextManager[QueryCounter]]:
+    # with query_budget(3): client.get("/staff")
+    # Fails the test if the block runs more than max_queries SQL statements, or runs the same
+    # statement more than max_repeats times (an N+1: one query per row instead of one per page).
+    @contextmanager
+    def budget(max_queries: int, max_repeats: int = 1) -> Iterator[QueryCounter]:
+        with QueryCounter() as queries:
+            yield queries
+        if queries.count > max_queries:
+            pytest.fail(f"{queries.count} SQL statements, budget is {max_queries}:\n{queries.report()}")
+        repeated = queries.repeated(max_repeats + 1)
+        if repeated:
+            lines = "\n".join(f"  {n}x {sql}" for sql, n in repeated.items())
+            pytest.fail(f"Repeated statements (possible N+1):\n{lines}")
+
+    return budget
@@ -1,18 +1,69 @@
 """Smoke tests — verify scaffold boots and auth works."""
+import asyncio
+import inspect
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import UTC, datetime, timedelta
+from pathlib import Path
+
+import httpx
 import pytest
 from fastapi.testclient import TestClient
-
-from app.database import engine
+from starlette.websockets import WebSocketDisconnect
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as SQLAlchemyTimeoutError
+from sqlmodel import Session, create_engine, select
+
+from app import changes as change_log, counters
+from app.archive import archive
+from app.auth import PRINCIPAL_CACHE_LOOKUPS, PrincipalCache, principal_cache
+from app.broker import RESYNC_EVENT, Broker, broker, format_sse, guest_topic
+from app.config import Settings, settings
+from app.database import (
+    POOL_CHECKOUT_TIMEOUTS,
+    POOL_CHECKOUT_WAIT,
+    apply_sqlite_pragmas,
+    async_engine,
+    async_session_factory,
+    engine,
+    make_engine,
+    pool_profile,
+)
+from app.fragments import FRAGMENT_CACHE_LOOKUPS, FragmentCache, row_cache
+from app.live import LiveFilter, LiveQueue, live_queue
 from app.main import app
-from app.models import SQLModel
+from app.metrics import HTTP_DB_QUERIES, TEMPLATE_SECONDS, Histogram
+from app.migrations import MIGRATIONS, current_version, run_migrations
+from app.models import Guest, RequestActivity, ServiceRequest, SQLModel
+from app.querycount import QueryCounter
+from app.routes import auth as auth_routes, guest as guest_routes, staff as staff_routes
 from app.seed import seed
+from app.seed_synthetic import generate, synthetic_guest_code
+from app.tasks import TASK_RESULTS, TaskQueue, task_queue
+from app.templating import TEMPLATES_DIR, build_templates, precompile_templates
 
 
-@pytest.fixture()
-def client():
+def _reset_database():
     SQLModel.metadata.drop_all(engine)
     SQLModel.metadata.create_all(engine)
     seed()
+    principal_cache.clear()  # ids are reused by the fresh database
+    row_cache.clear()
+
+
+def _drain_tasks(client: TestClient) -> None:
+    # Post-commit jobs run on the app's event loop after the response; wait for them.
+    client.portal.call(task_queue.join)
+
+
+@pytest.fixture()
+def client():
+    _reset_database()
     with TestClient(app) as c:
         yield c
 
@@ -54,6 +105,40 @@ def test_guest_login_invalid(client):
     assert "error" in resp.text.lower() or "invalid" in resp.text.lower()
 
 
+def test_login_is_case_insensitive(client):
+    resp = client.post(
+        "/login",
+        data={"confirmation_code": "GM-2026-001", "last_name": " pARKER "},
+        follow_redirects=False,
+    )
+    assert resp.status_code == 303
+    resp = client.post(
+        "/staff/login",
+        data={"employee_id": "EMP-2026-002", "last_name": "WILSON"},
+        follow_redirects=False,
+    )
+    assert resp.status_code == 303
+
+
+def test_login_last_name_is_not_a_pattern(client):
+    resp = client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "%"})
+    assert "invalid" in resp.text.lower()
+
+
+def test_login_follows_renamed_guest(client):
+    with Session(engine) as session:
+        guest = session.exec(select(Guest).where(Guest.confirmation_code == "GM-2026-001")).one()
+        guest.last_name = "Parker-Lee"
+        session.add(guest)
+        session.commit()
+    resp = client.post(
+        "/login",
+        data={"confirmation_code": "GM-2026-001", "last_name": "parker-lee"},
+        follow_redirects=False,
+    )
+    assert resp.status_code == 303
+
+
 def test_staff_login_valid(client):
     resp = client.post(
         "/staff/login",
@@ -452,12 +537,127 @@ def test_poll_endpoint_reflects_status_change(client):
     assert "Assigned" in resp.text
 
 
+def test_poll_returns_etag(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    resp = client.get("/guest/requests/poll")
+    assert resp.headers["etag"].startswith('W/"1-2-')
+    assert "no-cache" in resp.headers["cache-control"]
+
+
+def test_poll_unchanged_returns_304(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    etag = client.get("/guest/requests/poll").headers["etag"]
+    resp = client.get("/guest/requests/poll", headers={"If-None-Match": etag})
+    assert resp.status_code == 304
+    assert resp.text == ""
+
+
+def test_poll_unchanged_htmx_no_swap(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    etag = client.get("/guest/requests/poll").headers["etag"]
+    resp = client.get("/guest/requests/poll", headers={"If-None-Match": etag, "HX-Request": "true"})
+    assert resp.status_code == 200
+    assert resp.headers["hx-reswap"] == "none"
+    assert resp.text == ""
+
+
+def test_poll_etag_differs_with_history(client):
+    _guest_login(client)
+    etag = client.get("/guest/requests/poll").headers["etag"]
+    resp = client.get("/guest/requests/poll?history=1", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+
+
+def test_poll_etag_changes_after_status_update(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-002", "last_name": "Kim"})
+    etag = client.get("/guest/requests/poll").headers["etag"]
+    client.post("/logout")
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    client.post("/staff/requests/3/status", data={"status": "assigned"})
+    client.post("/logout")
+    client.post("/login", data={"confirmation_code": "GM-2026-002", "last_name": "Kim"})
+    resp = client.get("/guest/requests/poll", headers={"If-None-Match": etag})
+    assert resp.status_code == 200
+    assert resp.headers["etag"] != etag
+    assert "Assigned" in resp.text
+
+
 def test_my_requests_has_htmx_polling(client):
-    """The my_requests page should have hx-get polling on the tbody."""
+    """The my_requests page keeps a slow incremental poll as a safety net behind SSE push."""
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    resp = client.get("/guest/requests")
+    assert 'hx-get="/guest/requests/poll" hx-trigger="sse:resync"' in resp.text
+    assert 'hx-get="/guest/requests/poll?since=0" hx-trigger="every 30s"' in resp.text
+
+
+def test_my_requests_connects_sse(client):
     client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
     resp = client.get("/guest/requests")
-    assert 'hx-get="/guest/requests/poll"' in resp.text
-    assert 'hx-trigger="every 3s"' in resp.text
+    assert 'sse-connect="/guest/requests/stream"' in resp.text
+    assert 'sse-swap="created"' in resp.text
+    assert 'sse-swap="request-1"' in resp.text
+
+
+def test_stream_requires_auth(client):
+    resp = client.get("/guest/requests/stream", follow_redirects=False)
+    assert resp.status_code == 303
+    assert "/login" in resp.headers["location"]
+
+
+def test_stream_closes_idle_connection(client, monkeypatch):
+    monkeypatch.setattr(settings, "sse_idle_timeout_seconds", 0)
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    resp = client.get("/guest/requests/stream")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.text.startswith("retry: ")
+    assert broker.subscriber_count() == 0
+
+
+def test_status_update_publishes_row_to_guest(client):
+    sub = broker.subscribe(guest_topic(2))  # David owns request #3
+    try:
+        client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+        client.post("/staff/requests/3/status", data={"status": "assigned"})
+        _drain_tasks(client)
+        event, data = sub.queue.get_nowait()
+    finally:
+        broker.unsubscribe(sub)
+    assert event == "request-3"
+    assert 'id="request-3"' in data
+    assert "Assigned" in data
+
+
+def test_create_request_publishes_created_row(client):
+    sub = broker.subscribe(guest_topic(1))
+    try:
+        client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+        client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+        _drain_tasks(client)
+        event, data = sub.queue.get_nowait()
+    finally:
+        broker.unsubscribe(sub)
+    assert event == "created"
+    assert "Tea" in data
+
+
+def test_broker_overflow_collapses_to_resync():
+    b = Broker(queue_size=2)
+    sub = b.subscribe("guest:1")
+    other = b.subscribe("guest:2")
+    for i in range(3):
+        b.publish("guest:1", f"request-{i}", "<tr></tr>")
+    assert sub.queue.qsize() == 1
+    assert sub.queue.get_nowait() == (RESYNC_EVENT, "")
+    assert other.queue.empty()
+    b.unsubscribe(sub)
+    b.unsubscribe(other)
+    assert b.subscriber_count() == 0
+
+
+def test_format_sse_prefixes_every_data_line():
+    assert format_sse("created", "<tr>\n</tr>") == "event: created\ndata: <tr>\ndata: </tr>\n\n"
 
 
 # ---------------------------------------------------------------------------
@@ -520,3 +720,1325 @@ def test_dashboard_filter_no_results(client):
     resp = client.get("/staff/requests/filter?search=nonexistent_xyz")
     assert resp.status_code == 200
     assert "No requests match" in resp.text
+
+
+# ---------------------------------------------------------------------------
+# Staff dashboard pagination
+# ---------------------------------------------------------------------------
+
+def test_dashboard_paginates_with_load_more(client, monkeypatch):
+    monkeypatch.setattr(staff_routes, "PAGE_SIZE", 2)
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff")
+    assert resp.text.count('<tr id="request-') == 2
+    more_url = re.search(r'id="load-more" hx-get="([^"]+)"', resp.text).group(1).replace("&amp;", "&")
+
+    seen = re.findall(r'<tr id="request-(\d+)"', resp.text)
+    while more_url:
+        page = client.get(more_url)
+        assert page.status_code == 200
+        seen += re.findall(r'<tr id="request-(\d+)"', page.text)
+        match = re.search(r'id="load-more" hx-get="([^"]+)"', page.text)
+        more_url = match.group(1).replace("&amp;", "&") if match else None
+    assert sorted(seen, key=int) == ["1", "2", "3", "4", "5"]
+
+
+def test_dashboard_pagination_keeps_filters(client, monkeypatch):
+    monkeypatch.setattr(staff_routes, "PAGE_SIZE", 1)
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/filter?status_filter=new")
+    more_url = re.search(r'id="load-more" hx-get="([^"]+)"', resp.text).group(1).replace("&amp;", "&")
+    assert "status_filter=new" in more_url
+    page = client.get(more_url)
+    assert "load-more" not in page.text
+    assert page.text.count('<tr id="request-') == 1
+    assert "New" in page.text
+
+
+def test_dashboard_count_is_separate_query(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff")
+    assert 'hx-get="/staff/requests/count?"' in resp.text
+    assert "5 results" in client.get("/staff/requests/count").text
+    assert "2 results" in client.get("/staff/requests/count?status_filter=new").text
+    assert "1 result<" in client.get("/staff/requests/count?search=Lisa").text
+
+
+def test_dashboard_malformed_cursor_returns_first_page(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/more?cursor=not-a-cursor")
+    assert resp.status_code == 200
+    assert resp.text.count('<tr id="request-') == 5
+
+
+# ---------------------------------------------------------------------------
+# Staff search (FTS5)
+# ---------------------------------------------------------------------------
+
+def test_search_matches_prefix(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/filter?search=Emi")
+    assert "Emily" in resp.text
+    assert "David" not in resp.text
+
+
+def test_search_matches_request_type(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/filter?search=towels")
+    assert resp.text.count('<tr id="request-') == 1
+    assert "Extra towels" in resp.text
+
+
+def test_search_composes_with_filters(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/filter?search=Kim&status_filter=assigned")
+    assert resp.text.count('<tr id="request-') == 1
+    assert "Transportation" in resp.text
+    assert "1 result<" in client.get("/staff/requests/count?search=Kim&status_filter=assigned").text
+
+
+def test_search_index_follows_new_requests_and_renames(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-003", "last_name": "Chen"})
+    client.post("/guest/requests", data={"category": "dining", "priority": "low", "description": "Gluten free pastries"})
+    with Session(engine) as session:
+        lisa = session.get(Guest, 3)
+        lisa.last_name = "Chen-Moreau"
+        session.add(lisa)
+        session.commit()
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    assert "Gluten free" in client.get("/staff/requests/filter?search=pastr").text
+    resp = client.get("/staff/requests/filter?search=moreau")
+    assert resp.text.count('<tr id="request-') == 2
+
+
+def test_search_ranked_pagination(client, monkeypatch):
+    monkeypatch.setattr(staff_routes, "PAGE_SIZE", 1)
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/filter?search=room")
+    seen = re.findall(r'<tr id="request-(\d+)"', resp.text)
+    match = re.search(r'id="load-more" hx-get="([^"]+)"', resp.text)
+    while match:
+        page = client.get(match.group(1).replace("&amp;", "&"))
+        seen += re.findall(r'<tr id="request-(\d+)"', page.text)
+        match = re.search(r'id="load-more" hx-get="([^"]+)"', page.text)
+    assert sorted(seen) == ["1", "2", "3"]  # "room" in description or request type
+
+
+def test_search_ilike_fallback(client, monkeypatch):
+    monkeypatch.setattr("app.filters.fts_enabled", lambda dialect_name: False)
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    resp = client.get("/staff/requests/filter?search=ooling")  # substring, not a prefix
+    assert "Maintenance" in resp.text
+    assert "Housekeeping" not in resp.text
+
+
+# ---------------------------------------------------------------------------
+# Schema migrations
+# ---------------------------------------------------------------------------
+
+def _legacy_database(tmp_path):
+    # A database created before the secondary indexes and FTS index existed, with data in it.
+    legacy = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    SQLModel.metadata.create_all(legacy)
+    seed(legacy)
+    with legacy.begin() as conn:
+        for name in ("ix_servicerequest_guest_created", "ix_servicerequest_status_created",
+                     "ix_requestactivity_request_created"):
+            conn.execute(text(f"DROP INDEX {name}"))
+        conn.execute(text("DELETE FROM servicerequest_fts"))
+    return legacy
+
+
+def _index_names(eng) -> set[str]:
+    with eng.connect() as conn:
+        return set(conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'index'")).scalars())
+
+
+def test_migrations_add_indexes_to_existing_database(tmp_path):
+    legacy = _legacy_database(tmp_path)
+    assert "ix_servicerequest_guest_created" not in _index_names(legacy)
+    assert run_migrations(legacy) == [m.version for m in MIGRATIONS]
+    assert {"ix_servicerequest_guest_created", "ix_servicerequest_status_created",
+            "ix_requestactivity_request_created"} <= _index_names(legacy)
+    with legacy.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM servicerequest_fts")).scalar_one() == 5
+        assert current_version(conn) == MIGRATIONS[-1].version
+    legacy.dispose()
+
+
+def test_migration_backfills_login_columns(tmp_path):
+    legacy = _legacy_database(tmp_path)
+    with legacy.begin() as conn:
+        conn.execute(text("DROP INDEX ix_guest_code_last_name_lower"))
+        conn.execute(text("ALTER TABLE guest DROP COLUMN last_name_lower"))
+    run_migrations(legacy)
+    with legacy.connect() as conn:
+        lowered = conn.execute(
+            text("SELECT last_name_lower FROM guest WHERE confirmation_code = 'GM-2026-001'")
+        ).scalar_one()
+    assert lowered == "parker"
+    assert "ix_guest_code_last_name_lower" in _index_names(legacy)
+    legacy.dispose()
+
+
+def test_migrations_are_applied_once(tmp_path):
+    legacy = _legacy_database(tmp_path)
+    run_migrations(legacy)
+    assert run_migrations(legacy) == []
+    legacy.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Database performance profile
+# ---------------------------------------------------------------------------
+
+def test_development_profile_leaves_sqlite_defaults():
+    dev = Settings(db_profile="development", debug=True)
+    assert dev.sqlite_pragmas() == {}
+    assert dev.sql_echo is True
+
+
+def test_production_profile_applies_pragmas(tmp_path):
+    prod = Settings(db_profile="production", debug=True)
+    assert prod.sql_echo is False
+    eng = create_engine(f"sqlite:///{tmp_path / 'prod.db'}")
+    apply_sqlite_pragmas(eng, prod.sqlite_pragmas())
+    with eng.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == prod.sqlite_busy_timeout_ms
+        assert conn.execute(text("PRAGMA cache_size")).scalar() == -prod.sqlite_cache_size_kib
+    eng.dispose()
+
+
+# ---------------------------------------------------------------------------
+# Synthetic dataset generator
+# ---------------------------------------------------------------------------
+
+def _synthetic_snapshot(path) -> tuple:
+    eng = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(eng)
+    with eng.connect() as conn:
+        inserted = generate(conn, guests=40, requests=300, staff=5, seed=7,
+                            anchor=datetime(2026, 1, 1), batch_size=64)
+        rows = conn.execute(text("SELECT * FROM servicerequest ORDER BY id")).all()
+        activities = conn.execute(text("SELECT count(*) FROM requestactivity")).scalar_one()
+        completed_steps = conn.execute(text(
+            "SELECT count(*) FROM requestactivity a JOIN servicerequest sr ON sr.id = a.request_id "
+            "WHERE sr.status = 'completed' AND a.action = 'Status changed from in_progress to completed'"
+        )).scalar_one()
+        completed = conn.execute(text("SELECT count(*) FROM servicerequest WHERE status = 'completed'")).scalar_one()
+    eng.dispose()
+    return inserted, rows, activities, completed_steps, completed
+
+
+def test_synthetic_generator_is_deterministic(tmp_path):
+    first = _synthetic_snapshot(tmp_path / "a.db")
+    second = _synthetic_snapshot(tmp_path / "b.db")
+    assert first == second
+    inserted, rows, activities, completed_steps, completed = first
+    assert inserted == {"guests": 40, "staff": 5, "requests": 300, "activities": activities}
+    assert len(rows) == 300
+    assert completed_steps == completed  # every completed request has its full history
+
+
+def test_synthetic_guest_can_log_in(client):
+    with engine.connect() as conn:
+        generate(conn, guests=3, requests=10, staff=1, seed=1)
+    with Session(engine) as session:
+        guest = session.exec(select(Guest).where(Guest.confirmation_code == synthetic_guest_code(4))).one()
+    resp = client.post(
+        "/login",
+        data={"confirmation_code": guest.confirmation_code, "last_name": guest.last_name},
+        follow_redirects=False,
+    )
+    assert resp.status_code == 303
+
+
+# ---------------------------------------------------------------------------
+# Request metrics
+# ---------------------------------------------------------------------------
+
+def test_metrics_requires_staff(client):
+    resp = client.get("/metrics", follow_redirects=False)
+    assert resp.status_code == 303
+    assert "/staff/login" in resp.headers["location"]
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    assert client.get("/metrics", follow_redirects=False).status_code == 303
+
+
+def test_metrics_record_route_db_and_template_time(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    before = HTTP_DB_QUERIES.count(method="GET", route="/staff/requests/{request_id}")
+    renders = TEMPLATE_SECONDS.count(template="staff/request_detail.html")
+    assert client.get("/staff/requests/1").status_code == 200
+    assert HTTP_DB_QUERIES.count(method="GET", route="/staff/requests/{request_id}") == before + 1
+    assert HTTP_DB_QUERIES.total(method="GET", route="/staff/requests/{request_id}") > 0
+    assert TEMPLATE_SECONDS.count(template="staff/request_detail.html") == renders + 1
+
+    resp = client.get("/metrics")
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/plain")
+    assert 'gm_http_requests_total{method="GET",route="/staff/requests/{request_id}",status="200"}' in resp.text
+    assert 'gm_template_render_seconds_count{template="staff/request_detail.html"}' in resp.text
+
+
+def test_histogram_buckets_are_cumulative():
+    hist = Histogram("test_seconds", "Test.", buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        hist.observe(value, route="/x")
+    lines = hist.render()
+    assert 'test_seconds_bucket{route="/x",le="0.1"} 2' in lines
+    assert 'test_seconds_bucket{route="/x",le="1.0"} 3' in lines
+    assert 'test_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+    assert 'test_seconds_count{route="/x"} 4' in lines
+
+
+# ---------------------------------------------------------------------------
+# SQL query budgets
+# ---------------------------------------------------------------------------
+
+LOGINS = {
+    "guest": ("/login", {"confirmation_code": "GM-2026-001", "last_name": "Parker"}),
+    "staff": ("/staff/login", {"employee_id": "EMP-2026-002", "last_name": "Wilson"}),
+}
+
+# Declared SQL statement budget per endpoint (the principal comes from the cache filled at login).
+# Full lists also read the change log cursor they are current as of; "since" polls with nothing
+# new only read the cursor range.
+QUERY_BUDGETS = [
+    ("staff", "/staff", 3),
+    ("staff", "/staff/requests/filter?status_filter=new&category_filter=dining", 3),
+    ("staff", "/staff/requests/filter?search=towel", 3),
+    ("staff", "/staff/requests/filter?since=0", 1),
+    ("staff", "/staff/requests/1", 1),
+    ("guest", "/guest/requests/poll", 2),
+    ("guest", "/guest/requests/poll?since=0", 1),
+    ("guest", "/guest/requests", 2),
+    ("staff", "/api/v1/requests", 1),
+    ("staff", "/api/v1/requests?ids=1,2,3,50,150&fields=id,room_number", 1),
+    ("guest", "/api/v1/requests/1/activity", 1),
+]
+
+
+@pytest.mark.parametrize("role,path,budget", QUERY_BUDGETS)
+def test_endpoint_query_budget(client, query_budget, role, path, budget):
+    # Enough rows from many guests that a per-row query would blow the budget.
+    with engine.connect() as conn:
+        generate(conn, guests=30, requests=200, staff=2, seed=5)
+    url, data = LOGINS[role]
+    client.post(url, data=data)
+    with query_budget(budget):
+        assert client.get(path).status_code == 200
+
+
+def test_query_budget_fails_when_exceeded(client, query_budget):
+    url, data = LOGINS["staff"]
+    client.post(url, data=data)
+    with pytest.raises(pytest.fail.Exception, match="budget is 1"):
+        with query_budget(1):
+            client.get("/staff")
+
+
+def test_query_counter_flags_repeated_statements(client):
+    with QueryCounter() as queries, Session(engine) as session:
+        for guest_id in (1, 2, 3):
+            session.get(Guest, guest_id)
+    assert queries.count == 3
+    [(sql, n)] = queries.repeated().items()
+    assert n == 3 and sql.startswith("SELECT guest.id")
+
+
+# ---------------------------------------------------------------------------
+# Principal cache
+# ---------------------------------------------------------------------------
+
+def test_poll_resolves_guest_from_cache(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    hits = PRINCIPAL_CACHE_LOOKUPS.value(kind="Guest", result="hit")
+    with QueryCounter() as queries:
+        assert client.get("/guest/requests/poll").status_code == 200
+    assert PRINCIPAL_CACHE_LOOKUPS.value(kind="Guest", result="hit") == hits + 1
+    assert not any("FROM guest WHERE guest.id" in sql for sql in queries.statements)
+
+
+def test_principal_cache_invalidated_on_guest_update(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    assert "Emily" in client.get("/guest").text
+    with Session(engine) as session:
+        guest = session.exec(select(Guest).where(Guest.confirmation_code == "GM-2026-001")).one()
+        guest.first_name = "Emilia"
+        session.add(guest)
+        session.commit()
+    assert "Welcome, Emilia" in client.get("/guest").text
+
+
+def test_logout_evicts_principal(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    assert len(principal_cache) == 1
+    client.post("/logout")
+    assert len(principal_cache) == 0
+
+
+def test_principal_cache_ttl_and_lru(monkeypatch):
+    cache = PrincipalCache(max_entries=2, ttl_seconds=10)
+    for guest_id in (1, 2, 3):
+        cache.put(Guest(id=guest_id, first_name="G", last_name=str(guest_id), confirmation_code=str(guest_id)))
+    assert cache.get(Guest, 1) is None  # least recently used, evicted
+    assert cache.get(Guest, 3).last_name == "3"
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+    assert cache.get(Guest, 3) is None
+
+
+# ---------------------------------------------------------------------------
+# Request counters
+# ---------------------------------------------------------------------------
+
+def _staff_login(client):
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+
+
+def test_counters_follow_creates_and_transitions(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    client.post("/logout")
+    _staff_login(client)
+    client.post("/staff/requests/1/status", data={"status": "assigned"})
+    client.post("/staff/requests/1/status", data={"status": "in_progress"})
+    with engine.connect() as conn:
+        assert counters.check(conn) == {}
+
+
+def test_summary_reads_counters(client):
+    _staff_login(client)
+    with Session(engine) as session:
+        new = len(session.exec(select(ServiceRequest).where(ServiceRequest.status == "new")).all())
+    with QueryCounter() as queries:
+        resp = client.get("/staff/requests/summary")
+    assert f"{new} new" in resp.text
+    assert not any("FROM servicerequest" in sql for sql in queries.statements)
+
+
+def test_summary_breaks_down_by_category(client):
+    _staff_login(client)
+    with Session(engine) as session:
+        dining = len(session.exec(select(ServiceRequest).where(ServiceRequest.category == "dining")).all())
+    summary = client.portal.call(_queue_summary)
+    assert summary.by_category["dining"] == dining
+    assert sum(summary.by_category.values()) == summary.total
+    assert f"{dining} dining" in client.get("/staff/requests/summary").text
+    assert "1 front desk" in client.get("/staff/requests/summary").text
+
+
+async def _queue_summary():
+    async with async_session_factory() as session:
+        return await counters.queue_summary(session)
+
+
+def test_status_count_served_from_counters(client):
+    _staff_login(client)
+    with QueryCounter() as queries:
+        resp = client.get("/staff/requests/count?status_filter=new&category_filter=housekeeping")
+    assert "result" in resp.text
+    assert any("FROM requestcounter" in sql for sql in queries.statements)
+    assert not any("FROM servicerequest" in sql for sql in queries.statements)
+
+
+def test_counter_check_and_rebuild(client):
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE requestcounter SET count = count + 3"))
+        assert counters.check(conn)
+        counters.rebuild(conn)
+        assert counters.check(conn) == {}
+
+
+# ---------------------------------------------------------------------------
+# Row fragment cache
+# ---------------------------------------------------------------------------
+
+def test_dashboard_rows_served_from_fragment_cache(client):
+    _staff_login(client)
+    first = client.get("/staff/requests/filter").text
+    hits = FRAGMENT_CACHE_LOOKUPS.value(result="hit")
+    again = client.get("/staff/requests/filter").text
+    assert again == first
+    assert FRAGMENT_CACHE_LOOKUPS.value(result="hit") == hits + 5  # every seeded row
+
+
+def test_status_update_rerenders_row(client):
+    _staff_login(client)
+    assert 'id="request-3"' in client.get("/staff/requests/filter?status_filter=new").text
+    client.post("/staff/requests/3/status", data={"status": "assigned"})
+    rows = client.get("/staff/requests/filter?status_filter=assigned").text
+    row = rows[rows.index('id="request-3"'):]
+    assert "Assigned" in row[:row.index("</tr>")]
+
+
+def test_staff_row_follows_guest_rename(client):
+    _staff_login(client)
+    client.get("/staff/requests/filter")
+    with Session(engine) as session:
+        guest = session.exec(select(Guest).where(Guest.confirmation_code == "GM-2026-001")).one()
+        guest.first_name = "Emilia"
+        session.add(guest)
+        session.commit()
+    assert "Emilia Parker" in client.get("/staff/requests/filter").text
+
+
+def test_fragment_cache_is_byte_bounded():
+    cache = FragmentCache(max_bytes=10)
+    cache.put(1, (1, "a", False), "x" * 6)
+    cache.put(2, (2, "a", False), "y" * 6)  # evicts request 1
+    assert cache.get((1, "a", False)) is None
+    assert cache.get((2, "a", False)) == "y" * 6
+    assert cache.size == 6
+    cache.invalidate(2)
+    assert len(cache) == 0 and cache.size == 0
+
+
+def test_fragment_cache_counts_encoded_bytes():
+    cache = FragmentCache(max_bytes=10)
+    cache.put(1, (1, "a", False), "é" * 6)  # 6 characters, 12 bytes: over the bound
+    assert cache.get((1, "a", False)) is None
+    cache.put(2, (2, "a", False), "é" * 4)
+    assert cache.size == 8
+    cache.put(3, (3, "a", False), "abc")  # 11 bytes in total: evicts request 2
+    assert cache.get((2, "a", False)) is None and cache.size == 3
+
+
+# ---------------------------------------------------------------------------
+# Shared template environment
+# ---------------------------------------------------------------------------
+
+def test_route_modules_share_one_template_environment():
+    assert auth_routes.templates is guest_routes.templates is staff_routes.templates
+
+
+def test_precompile_fills_bytecode_cache(tmp_path):
+    shared = build_templates(auto_reload=False, bytecode_cache_dir=str(tmp_path))
+    assert precompile_templates(shared) == len(list(TEMPLATES_DIR.rglob("*.html")))
+    assert any(tmp_path.iterdir())
+    assert shared.env.auto_reload is False
+
+
+# ---------------------------------------------------------------------------
+# Optimistic concurrency for status transitions
+# ---------------------------------------------------------------------------
+
+def test_detail_form_carries_version(client):
+    _staff_login(client)
+    assert 'name="version" value="0"' in client.get("/staff/requests/3").text
+    client.post("/staff/requests/3/status", data={"status": "assigned", "version": "0"})
+    assert 'name="version" value="1"' in client.get("/staff/requests/3").text
+
+
+def test_stale_version_conflicts(client):
+    _staff_login(client)
+    client.post("/staff/requests/3/status", data={"status": "assigned", "version": "0"})
+    client.post("/staff/requests/3/status", data={"status": "in_progress", "version": "1"})
+    # A page still showing version 1 (assigned) tries to move it on again
+    resp = client.post("/staff/requests/3/status", data={"status": "in_progress", "version": "1"})
+    assert resp.status_code == 409
+    assert "already moved to in progress" in resp.text
+
+
+def test_simultaneous_transitions_have_one_winner():
+    _reset_database()
+
+    async def race() -> list[int]:
+        transport = httpx.ASGITransport(app=app)
+        clients = [httpx.AsyncClient(transport=transport, base_url="http://test") for _ in range(12)]
+        try:
+            for c in clients:
+                await c.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+            responses = await asyncio.gather(
+                *(c.post("/staff/requests/3/status", data={"status": "assigned", "version": "0"}) for c in clients)
+            )
+            return sorted(r.status_code for r in responses)
+        finally:
+            for c in clients:
+                await c.aclose()
+            await async_engine.dispose()
+
+    assert asyncio.run(race()) == [303] + [409] * 11
+    with engine.connect() as conn:
+        moves = conn.execute(text(
+            "SELECT count(*) FROM requestactivity WHERE request_id = 3 AND action LIKE '%to assigned'"
+        )).scalar_one()
+        assert moves == 1
+        assert counters.check(conn) == {}
+
+
+# ---------------------------------------------------------------------------
+# Bulk status changes
+# ---------------------------------------------------------------------------
+
+def test_bulk_status_moves_valid_requests_and_reports_the_rest(client):
+    _staff_login(client)
+    # 3 and 5 are new; 1 is in progress; 999 does not exist
+    resp = client.post(
+        "/staff/requests/bulk-status", data={"status": "assigned", "request_ids": ["3", "5", "1", "999"]}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["hx-trigger"] == "requests-updated"
+    assert "2 of 4 requests moved to assigned" in resp.text
+    assert 'data-request-id="1" data-result="invalid"' in resp.text
+    assert "cannot move from in progress" in resp.text
+    assert 'data-request-id="999" data-result="not_found"' in resp.text
+
+    with Session(engine) as session:
+        moved = session.exec(select(ServiceRequest).where(ServiceRequest.id.in_([3, 5]))).all()
+        assert {(sr.status.value, sr.version) for sr in moved} == {("assigned", 1)}
+        assert session.exec(select(ServiceRequest.status).where(ServiceRequest.id == 1)).one().value == "in_progress"
+    with engine.connect() as conn:
+        actions = conn.execute(text(
+            "SELECT request_id FROM requestactivity WHERE action = 'Status changed from new to assigned'"
+        )).scalars().all()
+        assert sorted(actions) == [3, 5]
+        assert counters.check(conn) == {}
+
+
+def test_bulk_status_is_one_transaction(client, query_budget):
+    _staff_login(client)
+    # update ... returning, activity, counter and change log executemanys (commit is not a statement)
+    with query_budget(4):
+        resp = client.post("/staff/requests/bulk-status", data={"status": "assigned", "request_ids": ["3", "5"]})
+    assert "2 of 2 requests moved" in resp.text
+
+
+def test_bulk_status_rejections_change_nothing(client):
+    _staff_login(client)
+    resp = client.post("/staff/requests/bulk-status", data={"status": "new", "request_ids": ["3"]})
+    assert "0 of 1 request moved" in resp.text
+    assert "hx-trigger" not in resp.headers
+    resp = client.post("/staff/requests/bulk-status", data={"status": "assigned"})
+    assert "Select at least one request." in resp.text
+    with engine.connect() as conn:
+        assert counters.check(conn) == {}
+
+
+def test_bulk_status_invalidates_rows_and_notifies_guests(client):
+    _staff_login(client)
+    client.get("/staff/requests/filter?status_filter=new")  # caches request 5's row as "new"
+    sub = broker.subscribe(guest_topic(3))
+    try:
+        client.post("/staff/requests/bulk-status", data={"status": "assigned", "request_ids": ["5"]})
+        _drain_tasks(client)
+        event, data = sub.queue.get_nowait()
+        assert event == "request-5"
+        assert "Assigned" in data
+    finally:
+        broker.unsubscribe(sub)
+    rows = client.get("/staff/requests/filter?status_filter=assigned").text
+    row_5 = rows[rows.index('id="request-5"'):].split("</tr>")[0]
+    assert ">Assigned</span>" in row_5
+
+
+def test_dashboard_has_bulk_form(client):
+    _staff_login(client)
+    page = client.get("/staff").text
+    assert 'id="bulk-status-form"' in page
+    assert 'form="bulk-status-form"' in page
+
+
+# ---------------------------------------------------------------------------
+# Request detail timeline pages
+# ---------------------------------------------------------------------------
+
+def _replace_activities(request_id: int, count: int) -> None:
+    # Replace a request's timeline with count notes; pairs share a timestamp so the id
+    # tie-break is exercised.
+    base = datetime(2026, 3, 1, 8, 0, tzinfo=UTC)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM requestactivity WHERE request_id = :r"), {"r": request_id})
+        conn.execute(RequestActivity.__table__.insert(), [
+            {"request_id": request_id, "action": "note", "note": f"Note {i:02d}",
+             "created_at": base.replace(minute=i // 2)}
+            for i in range(count)
+        ])
+
+
+def test_request_detail_shows_newest_activity_page(client):
+    _replace_activities(3, 45)
+    _staff_login(client)
+    page = client.get("/staff/requests/3").text
+    notes = re.findall(r"Note (\d\d)", page)
+    assert notes == [f"{i:02d}" for i in range(44, 24, -1)]
+    assert "Show older activity" in page
+
+
+def test_request_activity_pages_cover_the_timeline(client):
+    _replace_activities(3, 45)
+    _staff_login(client)
+    page = client.get("/staff/requests/3").text
+    seen = re.findall(r"Note (\d\d)", page)
+    while (more := re.search(r'hx-get="(/staff/requests/3/activity\?[^"]+)"', page)) is not None:
+        page = client.get(more.group(1).replace("&amp;", "&")).text
+        seen += re.findall(r"Note (\d\d)", page)
+    assert seen == [f"{i:02d}" for i in range(44, -1, -1)]
+
+
+def test_request_detail_without_activity(client):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM requestactivity WHERE request_id = 3"))
+    _staff_login(client)
+    resp = client.get("/staff/requests/3")
+    assert resp.status_code == 200
+    assert "No activity recorded yet." in resp.text
+    assert "Show older activity" not in resp.text
+
+
+# ---------------------------------------------------------------------------
+# Archive of completed requests
+# ---------------------------------------------------------------------------
+
+def _archive_all_completed() -> dict[str, int]:
+    # A clock a year ahead makes every completed request old enough
+    return archive(engine, timedelta(days=90), now=datetime.now(UTC) + timedelta(days=365))
+
+
+def test_archive_moves_completed_requests_and_activity():
+    _reset_database()
+    with engine.connect() as conn:
+        activities = conn.execute(text("SELECT count(*) FROM requestactivity WHERE request_id = 2")).scalar_one()
+    assert _archive_all_completed() == {"requests": 1, "activities": activities}  # request 2
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT id FROM servicerequest_archive")).scalars().all() == [2]
+        assert conn.execute(text("SELECT count(*) FROM servicerequest WHERE id = 2")).scalar_one() == 0
+        assert conn.execute(text("SELECT count(*) FROM requestactivity WHERE request_id = 2")).scalar_one() == 0
+        archived = conn.execute(text("SELECT count(*) FROM requestactivity_archive WHERE request_id = 2"))
+        assert archived.scalar_one() == activities
+        assert counters.check(conn) == {}
+    assert _archive_all_completed() == {"requests": 0, "activities": 0}
+
+
+def test_archive_respects_age_and_batches():
+    _reset_database()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE servicerequest SET status = 'completed' WHERE id IN (1, 3, 4)"))
+        counters.rebuild(conn)
+        activities = conn.execute(text("SELECT count(*) FROM requestactivity WHERE request_id < 5")).scalar_one()
+    assert archive(engine, timedelta(days=90))["requests"] == 0  # nothing is 90 days old yet
+    moved = archive(engine, timedelta(days=90), batch_size=1, now=datetime.now(UTC) + timedelta(days=365))
+    assert moved == {"requests": 4, "activities": activities}
+    with engine.connect() as conn:
+        assert counters.check(conn) == {}
+
+
+def test_archive_keeps_the_newest_request_live():
+    # SQLite reuses the largest rowid once it is deleted; the newest request must stay put.
+    _reset_database()
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE servicerequest SET status = 'completed' WHERE id = 5"))
+        counters.rebuild(conn)
+    _archive_all_completed()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT count(*) FROM servicerequest WHERE id = 5")).scalar_one() == 1
+
+
+def test_guest_history_includes_archived_requests():
+    _reset_database()
+    _archive_all_completed()
+    with TestClient(app) as client:
+        client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+        assert 'id="request-2"' not in client.get("/guest/requests").text
+        page = client.get("/guest/requests?history=1").text
+        assert 'id="request-1"' in page and 'id="request-2"' in page
+        assert "/guest/requests/poll?history=1" in page
+        assert 'id="request-2"' in client.get("/guest/requests/poll?history=1").text
+
+
+def test_staff_history_includes_archived_requests():
+    _reset_database()
+    _archive_all_completed()
+    with TestClient(app) as client:
+        _staff_login(client)
+        assert 'id="request-2"' not in client.get("/staff").text
+        page = client.get("/staff/requests/filter?history=1").text
+        assert 'id="request-2"' in page
+        assert "/staff/requests/count?history=1" in page
+        assert ">4 results<" in client.get("/staff/requests/count").text
+        assert ">5 results<" in client.get("/staff/requests/count?history=1").text
+        assert ">1 result<" in client.get("/staff/requests/count?history=1&status_filter=completed").text
+        assert 'id="request-2"' in client.get("/staff/requests/filter?history=1&search=emily").text
+
+
+def test_staff_history_substring_count_matches_listed_rows():
+    # With history the table searches with ILIKE, so "ark" (inside "Parker") matches mid-word.
+    _reset_database()
+    _archive_all_completed()
+    with TestClient(app) as client:
+        _staff_login(client)
+        listed = re.findall(r'id="request-(\d+)"', client.get("/staff/requests/filter?search=ark&history=1").text)
+        assert sorted(map(int, listed)) == [1, 2]
+        assert f">{len(listed)} results<" in client.get("/staff/requests/count?search=ark&history=1").text
+
+
+def test_staff_history_pages_merge_live_and_archive(monkeypatch):
+    _reset_database()
+    _archive_all_completed()
+    monkeypatch.setattr(staff_routes, "PAGE_SIZE", 2)
+    with TestClient(app) as client:
+        _staff_login(client)
+        page = client.get("/staff/requests/filter?history=1").text
+        seen = re.findall(r'id="request-(\d+)"', page)
+        while (more := re.search(r'hx-get="(/staff/requests/more\?[^"]+)"', page)) is not None:
+            page = client.get(more.group(1).replace("&amp;", "&")).text
+            seen += re.findall(r'id="request-(\d+)"', page)
+    assert sorted(map(int, seen)) == [1, 2, 3, 4, 5]
+    assert len(seen) == 5
+
+
+def test_archived_request_detail_is_read_only():
+    _reset_database()
+    _archive_all_completed()
+    with TestClient(app) as client:
+        _staff_login(client)
+        resp = client.get("/staff/requests/2")
+        assert resp.status_code == 200
+        assert "Archived" in resp.text
+        assert "Update Status" not in resp.text
+        assert "Activity Timeline" in resp.text
+
+
+# ---------------------------------------------------------------------------
+# Post-commit task queue
+# ---------------------------------------------------------------------------
+
+def test_task_queue_runs_jobs_in_workers():
+    async def scenario() -> list[str]:
+        queue = TaskQueue(workers=2, max_size=10)
+        done: list[str] = []
+
+        async def job(name: str) -> None:
+            await asyncio.sleep(0.01)
+            done.append(name)
+
+        await queue.start()
+        for name in "abc":
+            await queue.enqueue("test_job", job, name)
+        assert done == []  # enqueue returned without running anything
+        await queue.join()
+        await queue.stop()
+        return done
+
+    assert sorted(asyncio.run(scenario())) == ["a", "b", "c"]
+
+
+def test_task_queue_retries_with_backoff():
+    attempts: list[float] = []
+
+    def flaky() -> None:
+        attempts.append(time.monotonic())
+        if len(attempts) < 3:
+            raise RuntimeError("not yet")
+
+    async def scenario() -> None:
+        queue = TaskQueue(workers=1, max_size=10, max_attempts=3, backoff_seconds=0.01)
+        await queue.start()
+        await queue.enqueue("flaky", flaky)
+        await queue.join()
+        await queue.stop()
+
+    failed = TASK_RESULTS.value(job="flaky", result="failed")
+    asyncio.run(scenario())
+    assert len(attempts) == 3
+    assert attempts[2] - attempts[1] >= attempts[1] - attempts[0] >= 0.01  # backoff doubles
+    assert TASK_RESULTS.value(job="flaky", result="retried") >= 2
+    assert TASK_RESULTS.value(job="flaky", result="failed") == failed
+
+
+def test_task_queue_gives_up_after_max_attempts():
+    calls = []
+
+    async def scenario() -> None:
+        queue = TaskQueue(workers=1, max_size=10, max_attempts=2, backoff_seconds=0)
+        await queue.start()
+        await queue.enqueue("broken", lambda: calls.append(1) or 1 / 0)
+        await queue.stop()
+
+    failed = TASK_RESULTS.value(job="broken", result="failed")
+    asyncio.run(scenario())
+    assert len(calls) == 2
+    assert TASK_RESULTS.value(job="broken", result="failed") == failed + 1
+
+
+def test_task_queue_runs_inline_when_full_or_stopped():
+    async def scenario() -> list[str]:
+        queue = TaskQueue(workers=1, max_size=1)
+        done: list[str] = []
+        release = asyncio.Event()
+
+        async def blocker() -> None:
+            await release.wait()
+
+        await queue.enqueue("inline_job", done.append, "before start")
+        await queue.start()
+        await queue.enqueue("blocker", blocker)  # taken by the worker
+        await asyncio.sleep(0)
+        await queue.enqueue("blocker", blocker)  # fills the queue
+        await queue.enqueue("inline_job", done.append, "queue full")
+        release.set()
+        await queue.stop()
+        return done
+
+    assert asyncio.run(scenario()) == ["before start", "queue full"]
+
+
+def test_task_queue_drains_on_shutdown():
+    async def scenario() -> list[int]:
+        queue = TaskQueue(workers=1, max_size=100)
+        done: list[int] = []
+
+        async def job(i: int) -> None:
+            await asyncio.sleep(0)
+            done.append(i)
+
+        await queue.start()
+        for i in range(20):
+            await queue.enqueue("drain_job", job, i)
+        await queue.stop()
+        return done
+
+    assert asyncio.run(scenario()) == list(range(20))
+
+
+def test_status_update_publishes_through_the_queue(client):
+    ok = TASK_RESULTS.value(job="publish_row", result="ok")
+    _staff_login(client)
+    client.post("/staff/requests/3/status", data={"status": "assigned"})
+    _drain_tasks(client)
+    assert TASK_RESULTS.value(job="publish_row", result="ok") == ok + 1
+    metrics_text = client.get("/metrics").text
+    assert "gm_task_queue_depth 0" in metrics_text
+    assert 'gm_task_duration_seconds_count{job="publish_row"}' in metrics_text
+
+
+# ---------------------------------------------------------------------------
+# Connection pool profiles
+# ---------------------------------------------------------------------------
+
+def test_pool_profiles_per_backend():
+    config = Settings()
+    assert pool_profile("sqlite:///./x.db", config).name == "sqlite-file"
+    assert pool_profile("sqlite://", config).static
+    assert pool_profile("sqlite:///file:x?mode=memory&cache=shared&uri=true", config).name == "sqlite-memory"
+    postgres = pool_profile("postgresql://gm@db/gm", config)
+    assert (postgres.name, postgres.pre_ping, postgres.recycle) == ("postgresql", True, 1800)
+    tuned = pool_profile("postgresql://gm@db/gm", Settings(db_pool_size=3, db_pool_pre_ping=False))
+    assert (tuned.pool_size, tuned.max_overflow, tuned.pre_ping) == (3, 10, False)
+
+
+def test_pool_records_checkout_wait_and_timeouts(tmp_path):
+    config = Settings(db_pool_size=1, db_max_overflow=0, db_pool_timeout_seconds=0.05, debug=False)
+    small = make_engine(f"sqlite:///{tmp_path / 'pool.db'}", config=config)
+    waits = POOL_CHECKOUT_WAIT.count(engine="sync")
+    timeouts = POOL_CHECKOUT_TIMEOUTS.value(engine="sync")
+    with small.connect():
+        with pytest.raises(SQLAlchemyTimeoutError):
+            small.connect()
+    assert POOL_CHECKOUT_WAIT.count(engine="sync") >= waits + 2
+    assert POOL_CHECKOUT_TIMEOUTS.value(engine="sync") == timeouts + 1
+    small.dispose()
+
+
+# Logs in as a guest and as staff, submits and advances a request, and reports what it saw.
+_PROFILE_SMOKE = """
+import json
+from fastapi.testclient import TestClient
+from app.config import settings
+from app.database import pool_profile
+from app.main import app
+from app.metrics import render_metrics
+
+with TestClient(app) as client:
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    guest_list = client.get("/guest/requests").text
+    client.get("/logout")
+    client.post("/staff/login", data={"employee_id": "EMP-2026-002", "last_name": "Wilson"})
+    moved = client.post("/staff/requests/3/status", data={"status": "assigned"}, follow_redirects=False)
+    detail = client.get("/staff/requests/3").text
+    print(json.dumps({
+        "profile": pool_profile(settings.database_url).name,
+        "tea": "Tea" in guest_list,
+        "moved": moved.status_code,
+        "assigned": "new to assigned" in detail.lower(),
+        "waits": "gm_db_pool_checkout_wait_seconds_count" in render_metrics(),
+    }))
+"""
+
+
+@pytest.mark.parametrize("database_url,db_profile,expected", [
+    ("sqlite:///{tmp}/file.db", "development", "sqlite-file"),
+    ("sqlite:///{tmp}/file.db", "production", "sqlite-file"),
+    ("sqlite://", "development", "sqlite-memory"),
+])
+def test_app_runs_under_each_sqlite_pool_profile(tmp_path, database_url, db_profile, expected):
+    env = {
+        **os.environ,
+        "DATABASE_URL": database_url.format(tmp=tmp_path),
+        "DB_PROFILE": db_profile,
+        "DEBUG": "false",
+    }
+    out = subprocess.run(
+        [sys.executable, "-c", _PROFILE_SMOKE], env=env, cwd=Path(__file__).parent.parent,
+        capture_output=True, text=True, check=True, timeout=120,
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    assert result == {
+        "profile": expected, "tea": True, "moved": 303, "assigned": True, "waits": expected != "sqlite-memory",
+    }
+
+
+# ---------------------------------------------------------------------------
+# Change log and "since" polling
+# ---------------------------------------------------------------------------
+
+def _change_log() -> list[tuple]:
+    with engine.connect() as conn:
+        return [
+            tuple(row)
+            for row in conn.execute(text("SELECT seq, request_id, kind, old_status, status FROM requestchange ORDER BY seq"))
+        ]
+
+
+def _guest_login(client):
+    client.post("/login", data={"confirmation_code": "GM-2026-001", "last_name": "Parker"})
+
+
+def test_writes_append_to_change_log(client):
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    client.post("/logout")
+    _staff_login(client)
+    client.post("/staff/requests/3/status", data={"status": "assigned"})
+    client.post("/staff/requests/bulk-status", data={"status": "in_progress", "request_ids": ["3", "4"]})
+    assert _change_log() == [
+        (1, 6, "created", None, "new"),
+        (2, 3, "status", "new", "assigned"),
+        (3, 3, "status", "assigned", "in_progress"),
+        (4, 4, "status", "assigned", "in_progress"),
+    ]
+
+
+def test_rejected_status_change_logs_nothing(client):
+    _staff_login(client)
+    client.post("/staff/requests/3/status", data={"status": "completed"})
+    assert _change_log() == []
+
+
+def test_guest_poll_since_returns_only_changed_rows(client):
+    _guest_login(client)
+    page = client.get("/guest/requests")
+    assert "/guest/requests/poll?since=0" in page.text
+    client.post("/logout")
+    _staff_login(client)
+    client.post("/staff/requests/3/status", data={"status": "assigned"})  # guest 2's request
+    client.post("/staff/requests/1/status", data={"status": "completed"})
+    client.post("/logout")
+    _guest_login(client)
+    resp = client.get("/guest/requests/poll?since=0", headers={"HX-Request": "true"})
+    assert resp.headers["x-change-cursor"] == "2"
+    assert resp.headers["hx-reswap"] == "none"
+    assert '<tr hx-swap-oob="true" id="request-1"' in resp.text
+    assert "request-2" not in resp.text and "request-3" not in resp.text
+    assert 'hx-get="/guest/requests/poll?since=2"' in resp.text
+
+
+def test_guest_poll_since_inserts_new_requests_on_top(client):
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    client.post("/guest/requests", data={"category": "dining", "priority": "low", "description": "Cake"})
+    resp = client.get("/guest/requests/poll?since=0")
+    inserted = resp.text.split('hx-swap-oob="afterbegin:#request-rows"', 1)[1]
+    assert inserted.index("Cake") < inserted.index("Tea")
+    assert '<tr id="request-6" hx-swap-oob="delete">' in resp.text  # drops a copy pushed over SSE
+
+
+def test_guest_poll_since_unchanged_is_empty(client):
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    resp = client.get("/guest/requests/poll?since=1")
+    assert resp.headers["x-change-cursor"] == "1"
+    assert 'id="request-' not in resp.text
+
+
+def test_guest_poll_since_compacted_cursor_reloads_full_list(client):
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    client.post("/guest/requests", data={"category": "dining", "priority": "low", "description": "Cake"})
+    with engine.begin() as conn:
+        assert change_log.compact(conn, timedelta(0), now=datetime.now(UTC) + timedelta(seconds=1)) == 1
+    resp = client.get("/guest/requests/poll?since=0")
+    assert "hx-reswap" not in resp.headers
+    assert resp.headers["x-change-cursor"] == "2"
+    assert 'id="request-1"' in resp.text and "Cake" in resp.text  # every row, not a delta
+    assert 'hx-get="/guest/requests/poll?since=2"' in resp.text
+    assert client.get("/guest/requests/poll?since=1").headers.get("hx-reswap") == "none"
+    assert "hx-reswap" not in client.get("/guest/requests/poll?since=99").headers  # another database
+
+
+def test_staff_filter_since_follows_the_status_filter(client):
+    _staff_login(client)
+    page = client.get("/staff/requests/filter?status_filter=new")
+    assert 'hx-get="/staff/requests/filter?status_filter=new&amp;since=0"' in page.text
+    client.post("/staff/requests/3/status", data={"status": "assigned"})
+    client.post("/logout")
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    client.post("/logout")
+    _staff_login(client)
+    new = client.get("/staff/requests/filter?status_filter=new&since=0")
+    assert '<tr id="request-3" hx-swap-oob="delete">' in new.text  # left the filter
+    assert 'hx-swap-oob="afterbegin:#staff-request-rows"' in new.text and "Tea" in new.text
+    assigned = client.get("/staff/requests/filter?status_filter=assigned&since=0")
+    assert "afterbegin" in assigned.text and 'id="request-3"' in assigned.text  # joined the filter
+    assert "Tea" not in assigned.text
+    unfiltered = client.get("/staff/requests/filter?since=1")
+    assert '<tr hx-swap-oob="true" id="request-3"' not in unfiltered.text
+    assert "Tea" in unfiltered.text
+
+
+def test_staff_filter_since_with_history_matches_substrings(client):
+    # A history table searches with ILIKE, so its deltas must too: "ark" is inside "Parker".
+    _staff_login(client)
+    client.post("/staff/requests/1/status", data={"status": "completed"})
+    resp = client.get("/staff/requests/filter?search=ark&history=1&since=0")
+    assert '<tr hx-swap-oob="true" id="request-1"' in resp.text
+    assert 'id="request-3"' not in resp.text
+
+
+def test_archive_logs_removals(client):
+    _guest_login(client)
+    moved = _archive_all_completed()
+    assert moved["requests"] == 1
+    assert _change_log() == [(1, 2, "archived", "completed", None)]
+    resp = client.get("/guest/requests/poll?since=0")
+    assert '<tr id="request-2" hx-swap-oob="delete">' in resp.text
+    assert "request-2" not in client.get("/guest/requests/poll?since=0&history=1").text
+
+
+def test_compaction_keeps_newest_entry(client):
+    _guest_login(client)
+    for description in ("Tea", "Cake", "Jam"):
+        client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": description})
+    with engine.begin() as conn:
+        assert change_log.compact(conn, now=datetime.now(UTC) + timedelta(hours=12)) == 0  # inside retention
+        assert change_log.compact(conn, now=datetime.now(UTC) + timedelta(days=2)) == 2
+    assert [seq for seq, *_ in _change_log()] == [3]
+
+
+def test_scheduled_compaction_runs_on_task_queue(client, monkeypatch):
+    monkeypatch.setattr(settings, "change_log_retention_hours", 0.0)
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": "dining", "priority": "high", "description": "Tea"})
+    client.post("/guest/requests", data={"category": "dining", "priority": "low", "description": "Cake"})
+    runs = TASK_RESULTS.value(job="compact_changes", result="ok")
+
+    async def one_round():
+        schedule = asyncio.create_task(change_log.schedule_compaction(async_engine, interval=0.01))
+        while TASK_RESULTS.value(job="compact_changes", result="ok") == runs:
+            await asyncio.sleep(0.01)
+        schedule.cancel()
+        await task_queue.join()
+
+    client.portal.call(one_round)
+    assert [seq for seq, *_ in _change_log()] == [2]
+
+
+# ---------------------------------------------------------------------------
+# Staff live queue (WebSocket)
+# ---------------------------------------------------------------------------
+
+def _guest_creates(client, description: str, category: str = "dining") -> None:
+    _guest_login(client)
+    client.post("/guest/requests", data={"category": category, "priority": "high", "description": description})
+
+
+def test_live_queue_requires_staff(client):
+    with pytest.raises(WebSocketDisconnect) as refused:
+        with client.websocket_connect("/staff/live"):
+            pass
+    assert refused.value.code == 1008
+
+
+def test_dashboard_connects_live_queue(client):
+    _staff_login(client)
+    resp = client.get("/staff?status_filter=new")
+    assert 'ws-connect="/staff/live?status_filter=new"' in resp.text
+    assert "ws-send" in resp.text
+
+
+def test_live_queue_pushes_new_requests_matching_the_filter(client):
+    _staff_login(client)
+    with client.websocket_connect("/staff/live?category_filter=dining") as ws:
+        _guest_creates(client, "Fix the lamp", category="maintenance")  # not for this filter
+        _guest_creates(client, "Tea for two")
+        assert ws.receive_text() == '<tr id="request-7" hx-swap-oob="delete"></tr>'
+        insert = ws.receive_text()
+        assert 'hx-swap-oob="afterbegin:#staff-request-rows"' in insert
+        assert 'id="request-7"' in insert and "Tea for two" in insert and "Emily" in insert
+
+
+def test_live_queue_follows_status_changes_and_filter_updates(client):
+    _staff_login(client)
+    with client.websocket_connect("/staff/live?status_filter=new") as ws:
+        client.post("/staff/requests/3/status", data={"status": "assigned"})
+        assert ws.receive_text() == '<tr id="request-3" hx-swap-oob="delete"></tr>'  # left "new"
+        ws.send_text(json.dumps({"status_filter": "in_progress", "search": "", "HEADERS": {}}))
+        ws.send_text("not json")  # ignored
+        while LiveFilter(status="in_progress") not in live_queue.filters_for({"in_progress"}, "maintenance"):
+            time.sleep(0.01)  # wait for the server to apply the new filter
+        client.post("/staff/requests/3/status", data={"status": "in_progress"})
+        assert ws.receive_text() == '<tr id="request-3" hx-swap-oob="delete"></tr>'
+        assert ws.receive_text().startswith('<tbody hx-swap-oob="afterbegin:#staff-request-rows">\n<tr id="request-3"')
+        with client.websocket_connect("/staff/live") as unfiltered:
+            client.post("/staff/requests/bulk-status", data={"status": "completed", "request_ids": ["3"]})
+            assert unfiltered.receive_text().startswith('<tr hx-swap-oob="true" id="request-3"')
+        assert ws.receive_text() == '<tr id="request-3" hx-swap-oob="delete"></tr>'
+
+
+def test_live_queue_search_filter(client):
+    _staff_login(client)
+    with client.websocket_connect("/staff/live?search=tea") as ws:
+        _guest_creates(client, "Extra pillows")
+        _guest_creates(client, "Green tea")
+        ws.receive_text()
+        assert "Green tea" in ws.receive_text()
+
+
+def test_live_queue_history_search_matches_substrings(client):
+    _staff_login(client)
+    with client.websocket_connect("/staff/live?search=ark&history=1") as ws:
+        _guest_creates(client, "Extra pillows")  # guest 1 is Emily Parker
+        ws.receive_text()
+        assert "Extra pillows" in ws.receive_text()
+
+
+def test_live_queue_visits_only_matching_filter_groups():
+    queue = LiveQueue()
+    queue.connect(LiveFilter(status="new"))
+    queue.connect(LiveFilter(status="assigned", category="dining"))
+    queue.connect(LiveFilter(category="maintenance"))
+    queue.connect(LiveFilter(search="tea"))
+    assert set(queue.filters_for({"new"}, "dining")) == {LiveFilter(status="new"), LiveFilter(search="tea")}
+    assert len(queue.filters_for({"new", "assigned"}, "dining")) == 3
+    assert queue.connection_count() == 4
+
+
+def test_live_queue_overflow_reloads_table(monkeypatch):
+    monkeypatch.setattr(settings, "live_queue_size", 2)
+    queue = LiveQueue()
+    live_filter = LiveFilter(status="new", search="a b")
+    conn = queue.connect(live_filter)
+    queue.send(live_filter, ["one", "two"], "insert")
+    queue.send(live_filter, ["three"], "update")
+    assert conn.queue.qsize() == 1
+    assert 'hx-get="/staff/requests/filter?status_filter=new&amp;search=a+b"' in conn.queue.get_nowait()
+    queue.disconnect(conn)
+    assert queue.connection_count() == 0
+
+
+# ---------------------------------------------------------------------------
+# JSON API (/api/v1)
+# ---------------------------------------------------------------------------
+
+def test_api_requires_login_with_json_401(client):
+    resp = client.get("/api/v1/requests", follow_redirects=False)
+    assert resp.status_code == 401
+    assert resp.json() == {"detail": "Not logged in"}
+
+
+def test_api_field_selection(client):
+    _staff_login(client)
+    resp = client.get("/api/v1/requests/1?fields=id,status,room_number")
+    assert resp.headers["content-type"] == "application/json"
+    assert resp.json() == {"data": {"id": 1, "status": "in_progress", "room_number": "12-501"}}
+    full = client.get("/api/v1/requests/1").json()["data"]
+    assert full["guest_name"] == "Emily Parker" and full["created_at"].endswith("+00:00")
+    resp = client.get("/api/v1/requests?fields=id,confirmation_code")
+    assert resp.status_code == 400 and "confirmation_code" in resp.json()["detail"]
+    assert client.get("/api/v1/requests?status=bogus").status_code == 422
+
+
+def test_api_batch_fetch_keeps_order_and_lists_missing(client):
+    _staff_login(client)
+    resp = client.get("/api/v1/requests?ids=4,999,1,4&fields=id")
+    assert resp.json() == {"data": [{"id": 4}, {"id": 1}], "missing": [999]}
+    assert client.get("/api/v1/requests?ids=1,x").status_code == 400
+    ids = ",".join(str(i) for i in range(1, 202))
+    assert client.get(f"/api/v1/requests?ids={ids}").status_code == 400
+
+
+def test_api_cursor_pagination(client):
+    _staff_login(client)
+    seen, cursor = [], None
+    while True:
+        page = client.get("/api/v1/requests", params={"limit": 2, "fields": "id", "cursor": cursor}).json()
+        seen += [row["id"] for row in page["data"]]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            break
+    assert seen == [5, 4, 3, 2, 1]
+    new = client.get("/api/v1/requests?status=new&fields=id").json()
+    assert new == {"data": [{"id": 5}, {"id": 3}], "next_cursor": None}
+
+
+def test_api_guest_sees_only_own_records(client):
+    _guest_login(client)
+    assert [r["id"] for r in client.get("/api/v1/requests?fields=id").json()["data"]] == [2, 1]
+    assert client.get("/api/v1/requests?ids=1,3").json()["missing"] == [3]
+    assert client.get("/api/v1/requests/3").status_code == 404
+    assert client.get("/api/v1/requests/3/activity").json()["data"] == []
+    assert [a["action"] for a in client.get("/api/v1/requests/1/activity").json()["data"]] == ["in_progress", "created"]
+    me = client.get("/api/v1/guests/me").json()["data"]
+    assert me["last_name"] == "Parker" and "confirmation_code" not in me
+    assert client.get("/api/v1/guests?ids=1").status_code == 403
+
+
+def test_api_guest_me_for_deleted_guest_is_404(client):
+    _guest_login(client)
+    client.get("/api/v1/guests/me")  # principal now cached, so the dependency still resolves it
+    with Session(engine) as session:
+        session.exec(text("DELETE FROM guest WHERE id = 1"))
+        session.commit()
+    resp = client.get("/api/v1/guests/me")
+    assert resp.status_code == 404 and resp.json() == {"detail": "Guest not found"}
+
+
+def test_api_staff_guest_lookup(client):
+    _staff_login(client)
+    resp = client.get("/api/v1/guests?ids=2,1&fields=id,first_name")
+    assert resp.json() == {"data": [{"id": 2, "first_name": "David"}, {"id": 1, "first_name": "Emily"}], "missing": []}
+
+
+# ---------------------------------------------------------------------------
+# Load test helpers
+# ---------------------------------------------------------------------------
+
+def test_loadtest_percentiles_and_summary():
+    from benchmarks.loadtest import _percentile, summarize
+
+    ordered = [float(ms) for ms in range(1, 101)]
+    assert _percentile(ordered, 50) == 50.0
+    assert _percentile(ordered, 99) == 99.0
+    assert _percentile([7.0], 95) == 7.0 and _percentile([], 50) == 0.0
+    summary = summarize([30.0, 10.0, 20.0], seconds=2)
+    assert summary == {
+        "count": 3, "throughput_rps": 1.5, "mean_ms": 20.0,
+        "p50_ms": 20.0, "p95_ms": 30.0, "p99_ms": 30.0, "max_ms": 30.0,
+    }
+    assert summarize([], seconds=1)["mean_ms"] == 0.0
+
+
+def test_loadtest_filter_params_reach_the_staff_filter(client):
+    from benchmarks.loadtest import filter_params
+
+    # The keys the load test sends, with values that narrow the seed data to request 3.
+    params = dict(zip(filter_params(random.Random(1)), ("new", "maintenance", "")))
+    assert set(params) <= set(inspect.signature(staff_routes.staff_filter).parameters)
+    _staff_login(client)
+    html = client.get("/staff/requests/filter", params=params).text
+    assert 'id="request-3"' in html and 'id="request-5"' not in html